@@ -20,4 +20,14 @@ match os.getenv("CH_APP_MODE", "DEBUG").upper():
 
 CH_DISABLE_OPENAI = strtobool(os.getenv("CH_DISABLE_OPENAI", "false")) # set via CH_DISABLE_OPENAI environment variable (or in .env file)
 
-CH_DISABLE_FIREBASE = strtobool(os.getenv("CH_DISABLE_FIREBASE", "false")) # set via CH_DISABLE_FIREBASE environment variable (or in .env file)
\ No newline at end of file
+CH_DISABLE_FIREBASE = strtobool(os.getenv("CH_DISABLE_FIREBASE", "false")) # set via CH_DISABLE_FIREBASE environment variable (or in .env file)
+
+CH_FIREBASE_WRITE_BEHIND = strtobool(os.getenv("CH_FIREBASE_WRITE_BEHIND", "true")) # set via CH_FIREBASE_WRITE_BEHIND environment variable (or in .env file)
+
+CH_LLM_CACHE = os.getenv("CH_LLM_CACHE", "on").lower() # on, off, record or replay; set via CH_LLM_CACHE environment variable (or in .env file)
+
+CH_LLM_CACHE_PATH = os.getenv("CH_LLM_CACHE_PATH") # SQLite file that keeps LLM responses across restarts (memory only if unset)
+
+CH_INTENT_ROUTER = strtobool(os.getenv("CH_INTENT_ROUTER", "true")) # answer obvious modify requests locally; set via CH_INTENT_ROUTER environment variable (or in .env file)
+
+CH_LLM_HEDGE_DELAY = float(os.environ["CH_LLM_HEDGE_DELAY"]) if os.getenv("CH_LLM_HEDGE_DELAY") else None # seconds until the secondary model is asked as well (0 races both, unset disables hedging)
@@ -0,0 +1,36 @@
+"""Process-wide asyncio event loop for the Streamlit script threads.
+
+Script threads have no event loop of their own, and `asyncio.run` per call would close the loop that the
+async HTTP clients of the chat models keep their connections on. Coroutines are therefore run on one
+long-lived loop in a daemon thread that all sessions share.
+"""
+import asyncio
+import threading
+from typing import Any, Coroutine, Optional, TypeVar
+
+T = TypeVar("T")
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_lock = threading.Lock()
+
+
+def event_loop() -> asyncio.AbstractEventLoop:
+    global _loop
+    with _lock:
+        if _loop is None or _loop.is_closed():
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="chathap-asyncio", daemon=True).start()
+        return _loop
+
+
+def run_coroutine(coroutine: Coroutine[Any, Any, T], timeout: Optional[float] = None) -> T:
+    """Run `coroutine` on the shared loop and wait for its result (must not be called from that loop)."""
+    loop = event_loop()
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if running is loop:
+        coroutine.close()
+        raise RuntimeError("run_coroutine() would block the shared event loop, await the coroutine instead")
+    return asyncio.run_coroutine_threadsafe(coroutine, loop).result(timeout)
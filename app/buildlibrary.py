@@ -0,0 +1,156 @@
+"""Offline build of the packed vibration library from a directory of WAV files.
+
+    python -m app.buildlibrary <wav directory> data/VibViz_files.bin --tags data/VibLib-VibViz-processed.json
+
+Files are decoded in a process pool and resampled with a polyphase filter. Rebuilds are incremental:
+every resource records the SHA-256 of its source file, and unchanged files are copied from the
+existing library instead of being decoded again.
+"""
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import hashlib
+import json
+import logging
+import math
+import os
+import sys
+from typing import Optional
+import wave
+
+import numpy as np
+import numpy.typing as npt
+from scipy.signal import resample_poly
+
+from .globalVariable import SAMPLE_RATE
+from .viblib import VibLibrary, index_path_for, write_library
+
+logger = logging.getLogger("ChatHAP")
+
+_SAMPLE_FORMATS = {
+    1: (np.uint8, 128, 2**7),
+    2: (np.int16, 0, 2**15),
+    4: (np.int32, 0, 2**31),
+}
+
+
+def file_digest(path: str) -> str:
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(2**20), b""):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+def decode_wave(path: str, sample_rate: int) -> tuple[npt.NDArray[np.float32], int]:
+    """Read a WAV file, mix it down to mono in [-1, 1] and resample it to `sample_rate`.
+
+    Returns the samples and the original frame rate.
+    """
+    with wave.open(path, "rb") as wf:
+        frame_rate = wf.getframerate()
+        num_channels = wf.getnchannels()
+        sample_width = wf.getsampwidth()
+        frames = wf.readframes(wf.getnframes())
+
+    if sample_width not in _SAMPLE_FORMATS:
+        raise ValueError(f"Unsupported sample width {sample_width} in {path}")
+    dtype, zero, scale = _SAMPLE_FORMATS[sample_width]
+
+    data = (np.frombuffer(frames, dtype=dtype).astype(np.float64) - zero) / scale
+    if num_channels > 1:
+        data = data.reshape(-1, num_channels).mean(axis=1)
+
+    if frame_rate != sample_rate:
+        g = math.gcd(sample_rate, frame_rate)
+        data = resample_poly(data, sample_rate // g, frame_rate // g)
+
+    return data.astype(np.float32), frame_rate
+
+
+def _decode_job(args: tuple[str, str, int]) -> tuple[str, npt.NDArray[np.float32], int]:
+    name, path, sample_rate = args
+    data, frame_rate = decode_wave(path, sample_rate)
+    return name, data, frame_rate
+
+
+def _load_existing(bin_path: str, sample_rate: int) -> dict[str, dict]:
+    """Entries of an existing library that can be reused, with their samples copied into memory."""
+    if not os.path.exists(index_path_for(bin_path)):
+        return {}
+    try:
+        library = VibLibrary.open(bin_path)
+    except (OSError, ValueError, KeyError) as e:
+        logger.warning(f"Ignoring existing library {bin_path}: {e}")
+        return {}
+    if library.sample_rate != sample_rate:
+        return {}
+    # copy so the memory map is released before the library file is replaced
+    existing = {name: {**library.entry(name), "data": np.array(library[name])} for name in library}
+    del library
+    return existing
+
+
+def build_library(directory: str, bin_path: str, tags_path: Optional[str] = None, sample_rate: int = SAMPLE_RATE, workers: Optional[int] = None) -> dict[str, int]:
+    """Build or incrementally update the packed library from the WAV files in `directory`.
+
+    Returns counts of decoded, reused and removed resources.
+    """
+    sources = {
+        os.path.splitext(filename)[0]: os.path.join(directory, filename)
+        for filename in sorted(os.listdir(directory))
+        if filename.lower().endswith(".wav")
+    }
+    digests = {name: file_digest(path) for name, path in sources.items()}
+    existing = _load_existing(bin_path, sample_rate)
+
+    wave_files: dict[str, dict] = {}
+    jobs = []
+    for name, path in sources.items():
+        entry = existing.get(name)
+        if entry is not None and entry.get("sha256") == digests[name]:
+            wave_files[name] = entry
+        else:
+            jobs.append((name, path, sample_rate))
+
+    if jobs:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for name, data, frame_rate in pool.map(_decode_job, jobs):
+                wave_files[name] = {
+                    "data": data,
+                    "duration": len(data) / sample_rate,
+                    "frame_rate": sample_rate,
+                    "source_frame_rate": frame_rate,
+                    "source": os.path.basename(sources[name]),
+                    "sha256": digests[name],
+                }
+                logger.info(f"Decoded {name}: {frame_rate} Hz -> {sample_rate} Hz, {len(data)} frames")
+
+    extra_index = {}
+    if tags_path is not None:
+        with open(tags_path, "r") as json_file:
+            extra_index["tags"] = json.load(json_file)
+
+    # keep the library in source order so rebuilds are reproducible
+    write_library(bin_path, {name: wave_files[name] for name in sources}, sample_rate, extra_index)
+
+    stats = {
+        "decoded": len(jobs),
+        "reused": len(sources) - len(jobs),
+        "removed": len(set(existing) - set(sources)),
+    }
+    logger.info(f"Library build finished: {stats}")
+    return stats
+
+
+if __name__ == "__main__":
+    logging.basicConfig(stream=sys.stdout, level=logging.INFO)
+
+    parser = argparse.ArgumentParser(description="Build the packed ChatHAP vibration library from WAV files.")
+    parser.add_argument("directory", help="directory containing the library WAV files")
+    parser.add_argument("output", help="packed library file, e.g. data/VibViz_files.bin")
+    parser.add_argument("--tags", help="tag metadata JSON stored with the library")
+    parser.add_argument("--sample-rate", type=int, default=SAMPLE_RATE)
+    parser.add_argument("--workers", type=int, default=None, help="number of decoding processes")
+    args = parser.parse_args()
+
+    build_library(args.directory, args.output, args.tags, args.sample_rate, args.workers)
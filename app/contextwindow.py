@@ -0,0 +1,104 @@
+"""Token-budgeted view of the conversation sent to `chat_chatgpt`.
+
+The most recent turns are kept verbatim. Older turns are folded into a rolling summary, which is
+cached and only extended when the window has to move, so the prompt prefix stays stable between turns.
+The summary also says where the current vibration came from (generated, navigation or modify) and
+carries the last generation parameters, so that GenerationApproach edits keep working after the turn
+that produced them has been folded.
+"""
+import hashlib
+import json
+from typing import Callable, Optional, Sequence
+
+from langchain_core.messages import BaseMessage, SystemMessage
+
+from .genSignal import GenSignalInput
+from .globalVariable import CONTEXT_SUMMARY_TOKENS, CONTEXT_TOKEN_BUDGET
+from .tagprompt import count_tokens
+
+_MESSAGE_OVERHEAD = 4 # role and separator tokens per chat message
+_SUMMARY_LINE_CHARS = 160
+
+Summarizer = Callable[[str, Sequence[BaseMessage]], str]
+
+
+def message_tokens(messages: Sequence[BaseMessage], model: str = "gpt-4-turbo") -> int:
+    return sum(count_tokens(str(message.content), model) + _MESSAGE_OVERHEAD for message in messages)
+
+
+def summarize_turns(summary: str, messages: Sequence[BaseMessage]) -> str:
+    """Extend `summary` with one abbreviated line per folded message (no LLM call)."""
+    lines = [summary] if summary else []
+    for message in messages:
+        text = " ".join(str(message.content).split())
+        if len(text) > _SUMMARY_LINE_CHARS:
+            text = text[:_SUMMARY_LINE_CHARS - 3] + "..."
+        lines.append(f"- {'User' if message.type == 'human' else 'Assistant'}: {text}")
+    return "\n".join(lines)
+
+
+def _digest(messages: Sequence[BaseMessage]) -> str:
+    return hashlib.sha256(json.dumps([[m.type, str(m.content)] for m in messages]).encode("utf-8")).hexdigest()
+
+
+class ContextWindow:
+    """Keeps one session's prompt under `budget` tokens (keep one instance per session).
+
+    When the conversation exceeds the budget, whole turns are folded from the front until the verbatim
+    part fits into half of it, so the summary changes only every few turns.
+    """
+
+    def __init__(self, budget: int = CONTEXT_TOKEN_BUDGET, summary_budget: int = CONTEXT_SUMMARY_TOKENS, summarize: Summarizer = summarize_turns, model: str = "gpt-4-turbo"):
+        self.budget = budget
+        self.summary_budget = summary_budget
+        self.summarize = summarize
+        self.model = model
+        self.folded = 0 # messages folded into the summary
+        self.summary = ""
+        self._folded_digest = _digest([])
+
+    def build(self, conversation: Sequence[BaseMessage], generation_parameters: Optional[GenSignalInput] = None, current_vibration: Optional[str] = None) -> list[BaseMessage]:
+        """Messages to send: a summary of the folded turns (if any) followed by the recent turns.
+
+        `current_vibration` describes where the vibration the user currently feels came from, e.g. a
+        library resource; `generation_parameters` are those of the last generated vibration.
+        """
+        conversation = list(conversation)
+        if self.folded > len(conversation) or _digest(conversation[:self.folded]) != self._folded_digest:
+            # not the conversation this window has seen, start over
+            self.folded, self.summary = 0, ""
+
+        recent = conversation[self.folded:]
+        if message_tokens(self._summary(generation_parameters, current_vibration) + recent, self.model) > self.budget:
+            start = self._fold_until(conversation, self.budget // 2)
+            self.summary = self._trim(self.summarize(self.summary, conversation[self.folded:start]))
+            self.folded = start
+            self._folded_digest = _digest(conversation[:start])
+            recent = conversation[start:]
+        return self._summary(generation_parameters, current_vibration) + recent
+
+    def _fold_until(self, conversation: list[BaseMessage], target: int) -> int:
+        """Index of the first kept message, so that the kept part fits `target` and starts with a user turn."""
+        tokens = [message_tokens([message], self.model) for message in conversation]
+        start = self.folded
+        while start < len(conversation) - 1 and (sum(tokens[start:]) > target or conversation[start].type != "human"):
+            start += 1
+        while start > self.folded and conversation[start].type != "human": # always keep the latest request
+            start -= 1
+        return start
+
+    def _trim(self, summary: str) -> str:
+        lines = summary.split("\n")
+        while len(lines) > 1 and count_tokens("\n".join(lines), self.model) > self.summary_budget:
+            lines.pop(0) # the oldest turns go first
+        return "\n".join(lines)
+
+    def _summary(self, generation_parameters: Optional[GenSignalInput], current_vibration: Optional[str]) -> list[BaseMessage]:
+        if not self.folded:
+            return []
+        content = "Summary of the earlier conversation:\n" + self.summary
+        if current_vibration is not None:
+            content += "\nThe current vibration is " + current_vibration + "."
+        if generation_parameters is not None:
+            content += "\nThe last generated vibration used these parameters: " + generation_parameters.json()
+        return [SystemMessage(content=content)]
@@ -0,0 +1,35 @@
+import logging
+import wave
+from typing import IO, Iterable, Iterator, Union
+
+import numpy as np
+import numpy.typing as npt
+
+from .globalVariable import *
+
+logger = logging.getLogger("ChatHAP")
+
+
+def iter_chunks(signal: npt.NDArray, chunk_size: int = SIGNAL_CHUNK_SIZE) -> Iterator[npt.NDArray]:
+    """Split an in-memory signal into chunks, so it can go to the same consumers as `genSignal_stream`."""
+    signal = np.ravel(signal)
+    for start in range(0, len(signal), chunk_size):
+        yield signal[start:start + chunk_size]
+
+
+def write_wav(file: Union[str, IO[bytes]], chunks: Iterable[npt.NDArray], sample_rate: int = SAMPLE_RATE) -> int:
+    """Write signal chunks to a 16-bit mono WAV file, scaled so that GAIN maps to full scale.
+
+    Returns the number of frames written.
+    """
+    num_frames = 0
+    with wave.open(file, "wb") as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(sample_rate)
+        for chunk in chunks:
+            frames = np.int16(np.clip(chunk / GAIN, -1, 1) * 32767)
+            wav_file.writeframes(frames.tobytes())
+            num_frames += len(frames)
+    logger.debug(f"Wrote {num_frames} frames to WAV")
+    return num_frames
@@ -1,5 +1,6 @@
 import os
-from typing import Optional, Union
+from contextlib import contextmanager
+from typing import Iterator, Optional, Union
 import firebase_admin
 from firebase_admin import credentials, db
 import uuid
@@ -7,7 +8,7 @@ import zlib
 import base64
 import json
 import re
-from .appmode import CH_DISABLE_FIREBASE
+from .appmode import CH_DISABLE_FIREBASE, CH_FIREBASE_WRITE_BEHIND
 from .globalVariable import *
 from .utilities import *
 import streamlit as st
@@ -19,12 +20,60 @@ import numpy as np
 import numpy.typing as npt
 import random
 import json
+import threading
+from . import signalcodec
+from .preference import PreferenceMatrix
+from .timebase import TimeBase
+from .writebehind import WriteBehindQueue, coalesce, register_shutdown_flush
 
 logging.basicConfig(stream=sys.stdout, level=logging.INFO)
 logger = logging.getLogger("ChatHAP")
 
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 
+def _commit_writes(batch: dict):
+    db.reference('/').update(batch)
+
+# Writes leave the script thread and are committed in coalesced multi-path batches
+firebase_writer = WriteBehindQueue(_commit_writes)
+register_shutdown_flush(firebase_writer)
+
+class WriteBatch:
+    """All paths written by one logical operation, committed together as a single multi-path update."""
+
+    def __init__(self):
+        self.writes: dict = {}
+
+    def set(self, path: str, value):
+        coalesce(self.writes, path, value)
+
+    def update(self, path: str, values: dict):
+        for key, value in values.items():
+            coalesce(self.writes, f'{path}/{key}', value)
+
+    def commit(self):
+        if not self.writes:
+            return
+        if CH_FIREBASE_WRITE_BEHIND:
+            firebase_writer.put(self.writes)
+        else:
+            _commit_writes(self.writes)
+        self.writes = {}
+
+@contextmanager
+def write_batch(batch: Optional[WriteBatch] = None) -> Iterator[WriteBatch]:
+    """Join the caller's batch if given, otherwise open one that is committed on exit."""
+    if batch is not None:
+        yield batch
+        return
+    batch = WriteBatch()
+    yield batch
+    batch.commit()
+
+def flush_writes(timeout: Optional[float] = None) -> bool:
+    """Wait until queued writes reached the database, so that a following read sees them."""
+    return firebase_writer.flush(timeout)
+
 # Function to initialize the Firebase app if not already initialized
 def initialize_firebase_users():
     if CH_DISABLE_FIREBASE:
@@ -46,11 +95,13 @@ def initialize_firebase_users():
         firebase_admin.initialize_app(cred, {
             'databaseURL': 'https://chathap-20643-default-rtdb.firebaseio.com/'
         })
+    preference_matrix.ensure_current(db)
 
 def backup_data():
     if CH_DISABLE_FIREBASE:
         return
 
+    flush_writes()
     ref = db.reference('/')
     data_chunks = {}
     for key in ref.get(shallow=True).keys():  # type: ignore # Get top-level keys
@@ -74,7 +125,16 @@ def compress_data(data):
     compressed_data = zlib.compress(data_str.encode('utf-8'))
     return base64.b64encode(compressed_data).decode('utf-8')
 
+def compress_signal(name: str, signal: npt.NDArray[np.floating], sample_rate: float = SAMPLE_RATE, dtype: str = SIGNAL_UPLOAD_DTYPE) -> str:
+    """Encode a signal with the binary signal codec; `decompress_data` returns it as `{name: samples}`."""
+    payload = signalcodec.encode_signal(name, signal, round(sample_rate), dtype, SIGNAL_UPLOAD_COMPRESSION)
+    return signalcodec.to_text(payload)
+
 def decompress_data(data):
+    """Decode a value written by `compress_data` or `compress_signal` (samples come back as a float32 array)."""
+    if signalcodec.is_encoded_text(data):
+        decoded = signalcodec.decode_signal(signalcodec.from_text(data))
+        return {decoded.name: decoded.data}
     compressed_data = base64.b64decode(data.encode('utf-8'))
     data_str = zlib.decompress(compressed_data).decode('utf-8')
     return json.loads(data_str)
@@ -86,63 +146,112 @@ def add_data():
     user_id = generate_unique_user_id()
     start_time = get_time()
 
-    for DB in DB_write:
-        ref = db.reference(f'{DB}/{user_id}')
-        ref.set({
-            '01_start_time': start_time
-        })
-        print(f'User added with ID: {user_id}')
+    with write_batch() as batch:
+        for DB in DB_write:
+            batch.set(f'{DB}/{user_id}', {
+                '01_start_time': start_time
+            })
+    print(f'User added with ID: {user_id}')
 
     return user_id
 
 # Update data in Realtime Database
-def update_data(user_id, vib_num, content):
+def update_data(user_id, vib_num, content, batch: Optional[WriteBatch] = None):
     if CH_DISABLE_FIREBASE:
         return
 
-    for DB in DB_write:
-        ref = db.reference(f'{DB}/{user_id}/vibration/{vib_num}')
-        ref.update(content)
+    with write_batch(batch) as batch:
+        for DB in DB_write:
+            batch.update(f'{DB}/{user_id}/vibration/{vib_num}', content)
 
 # Update compressed data in Realtime Database
-def update_compressed_data(user_id, vib_num, key, content):
+def update_compressed_data(user_id, vib_num, key, content, batch: Optional[WriteBatch] = None):
     if CH_DISABLE_FIREBASE:
         return
 
-    for DB in DB_write:
-        ref = db.reference(f'{DB}/{user_id}/vibration/{vib_num}/{key}')
-        compressed_content = compress_data(content)
-        ref.set(compressed_content)
+    compressed_content = content if isinstance(content, str) else compress_data(content)
+    with write_batch(batch) as batch:
+        for DB in DB_write:
+            batch.set(f'{DB}/{user_id}/vibration/{vib_num}/{key}', compressed_content)
 
 # Update rating in Realtime Database
 def update_rating(user_id, vib_num, content):
     if CH_DISABLE_FIREBASE:
         return
 
-    for DB in DB_write:
-        ref = db.reference(f'{DB}/{user_id}/vibration/{vib_num}')
-        ref.update(content)
-
-# Update conversation in Realtime Database
+    with write_batch() as batch:
+        for DB in DB_write:
+            batch.update(f'{DB}/{user_id}/vibration/{vib_num}', content)
+
+# Next free index of each conversation log, keyed by '{DB}/{user_id}'
+_conversation_lengths: dict[str, int] = {}
+_conversation_lock = threading.Lock()
+
+def _next_conversation_index(DB, user_id) -> int:
+    """Reserve the index of the next message; only the first message of a conversation in this process reads the database."""
+    key = f'{DB}/{user_id}'
+    with _conversation_lock:
+        if key not in _conversation_lengths:
+            ref = db.reference(f'{DB}/{user_id}/conversation')
+            existing = ref.get(shallow=True)
+            if isinstance(existing, dict) and not all(str(k).isdigit() for k in existing):
+                # legacy conversation holding a single message instead of a list
+                ref.set([ref.get()])
+                existing = [True]
+            _conversation_lengths[key] = len(existing) if isinstance(existing, list) else max((int(k) + 1 for k in existing or {}), default=0)
+        index = _conversation_lengths[key]
+        _conversation_lengths[key] += 1
+    return index
+
+# Append a message to the conversation log in Realtime Database
 def update_conversation(user_id, new_content):
     if CH_DISABLE_FIREBASE:
         return
 
-    for DB in DB_write:
-        ref = db.reference(f'{DB}/{user_id}/conversation')
-        current_data = ref.get()
+    with write_batch() as batch:
+        for DB in DB_write:
+            index = _next_conversation_index(DB, user_id)
+            batch.set(f'{DB}/{user_id}/conversation/{index}', new_content)
+
+def conversation_messages(data) -> list:
+    """Order the entries of a stored conversation log (list, index-keyed dict or legacy single message)."""
+    if not data:
+        return []
+    if isinstance(data, list):
+        return [message for message in data if message is not None]
+    if isinstance(data, dict) and all(str(k).isdigit() for k in data):
+        return [data[k] for k in sorted(data, key=int)]
+    return [data]
+
+# Read the ordered conversation of a user from Realtime Database (by default where update_conversation writes it)
+def read_conversation(user_id, DB: Optional[str] = None) -> list:
+    if CH_DISABLE_FIREBASE:
+        return []
+    flush_writes()
+    return conversation_messages(db.reference(f'{DB or DB_write[0]}/{user_id}/conversation').get())
 
-        if current_data:
-            if isinstance(current_data, list):
-                current_data.append(new_content)
-            else:
-                current_data = [current_data, new_content]
-        else:
-            current_data = [new_content]
-        ref.set(current_data)
+def _vote_deltas(clicked_num, rating) -> tuple[int, int]:
+    """Changes of the (THUMBS_UP, THUMBS_DOWN) counters for a vote; changing an earlier vote moves it to the other counter."""
+    if clicked_num <= 1:
+        return (1, 0) if rating == 1 else (0, 1) if rating == -1 else (0, 0)
+    return (1, -1) if rating == 1 else (-1, 1) if rating == -1 else (0, 0)
+
+def _increment_votes(batch: WriteBatch, path: str, deltas: tuple[int, int]):
+    """Add `deltas` to the vote counters below `path` with server-side increments, so concurrent votes are never lost.
+
+    Both counters are always written, which also creates them at zero for a new path.
+    """
+    up, down = deltas
+    batch.set(f'{path}/THUMBS_UP', {".sv": {"increment": up}})
+    batch.set(f'{path}/THUMBS_DOWN', {".sv": {"increment": down}})
 
 # Update ratings to vibrations in Realtime Database
-def update_vibration_rating(user_id, vib_class, vib_num, clicked_num, temp_rating):
+def update_vibration_rating(user_id, vib_class, vib_num, clicked_num, temp_rating, record: Optional[dict] = None):
+    """Count a vote for vibration `vib_num`.
+
+    `record` is the content the vibration was persisted with (kept in the session), so the vote needs no
+    database read. Without it the record is read back, after waiting for queued writes.
+    """
     if CH_DISABLE_FIREBASE:
         return
 
@@ -155,22 +264,27 @@ def update_vibration_rating(user_id, vib_class, vib_num, clicked_num, temp_ratin
     else:
         logger.error(f"No data found for vibration approach class {vib_class}")
 
-    for DB in DB_write:
-        ref_read = db.reference(f'{DB}/{user_id}/vibration/{vib_num}')
-        current_data_read = ref_read.get()
+    if record is None:
+        flush_writes() # the vibration record may still be queued
+    with write_batch() as batch:
+        for DB in DB_write:
+            current_data_read = record if record is not None else db.reference(f'{DB}/{user_id}/vibration/{vib_num}').get()
 
-        # Check if the current data read is valid
-        if not current_data_read:
-            logger.error(f"No data found for user {user_id} and vibration {vib_num}")
-            return
+            # Check if the current data read is valid
+            if not current_data_read:
+                logger.error(f"No data found for user {user_id} and vibration {vib_num}")
+                return
 
-        resource = current_data_read.get('resource') # type: ignore
-        # rating = current_data_read.get('rating')
-        rating = temp_rating
-        feature_list = []
-        change_list = []
+            resource = current_data_read.get('resource') # type: ignore
+            # rating = current_data_read.get('rating')
+            rating = temp_rating
+            feature_list = []
+            change_list = []
+
+            if resource is None or rating is None:
+                logger.error(f"Resource or rating not found in the current data for user {user_id} and vibration {vib_num}")
+                return
 
-        if resource is not None and rating is not None:
             feature_str = current_data_read.get('feature') # type: ignore
             if feature_str is not None:
                 try:
@@ -195,239 +309,53 @@ def update_vibration_rating(user_id, vib_class, vib_num, clicked_num, temp_ratin
                     # logger.debug(f"Error converting string to list: {e}")
             else:
                 logger.debug(f"CHANGE not found in the current data for user {user_id} and vibration {vib_num}")
-        else:
-            logger.error(f"Resource or rating not found in the current data for user {user_id} and vibration {vib_num}")
-            return
-
-        if feature_str is not None:
-            ref_rating_update = db.reference(f'vibration_{DB}/{vib_class}/{resource}/navigation')
-            current_rating_update = ref_rating_update.get()
-
-            # Initialize rating if it doesn't exist
-            if not current_rating_update:
-                current_rating_update = {'THUMBS_UP': 0, 'THUMBS_DOWN': 0}
-
-            current_rating = current_rating_update
-
-            # Ensure current_rating is a dictionary
-            if not isinstance(current_rating, dict):
-                current_rating = {'THUMBS_UP': 0, 'THUMBS_DOWN': 0}
-
-            # Update the vibration rating based on the input rating
-            if clicked_num <= 1:
-                if rating == 1:
-                    current_rating['THUMBS_UP'] += 1
-                elif rating == -1:
-                    current_rating['THUMBS_DOWN'] += 1
-            else:
-                if rating == 1:
-                    current_rating['THUMBS_UP'] += 1
-                    current_rating['THUMBS_DOWN'] -= 1
-                elif rating == -1:
-                    current_rating['THUMBS_UP'] -= 1
-                    current_rating['THUMBS_DOWN'] += 1
-
-            ref_rating_update.update(current_rating)
-
-
-            ref_feature_update = db.reference(f'vote-feature_{DB}')
-            current_feature_update = ref_feature_update.get()
-
-            if not current_feature_update:
-                current_feature_update = {feature: {resource: {'THUMBS_UP': 0, 'THUMBS_DOWN': 0}} for feature in feature_list}
-
-            # Ensure current_feature_update is a dictionary of dictionaries
-            if not all(isinstance(value, dict) for value in current_feature_update.values()): # type: ignore
-                current_feature_update = {feature: {resource: {'THUMBS_UP': 0, 'THUMBS_DOWN': 0}} for feature in feature_list}
-
-            # Update the feature rating based on the input rating
-            for feature in feature_list:
-                if feature not in current_feature_update:
-                    current_feature_update[feature] = {resource: {'THUMBS_UP': 0, 'THUMBS_DOWN': 0}} # type: ignore
-
-                if resource not in current_feature_update[feature]: # type: ignore
-                    current_feature_update[feature][resource] = {'THUMBS_UP': 0, 'THUMBS_DOWN': 0} # type: ignore
-
-                if clicked_num <= 1:
-                    if rating == 1:
-                        current_feature_update[feature][resource]['THUMBS_UP'] += 1 # type: ignore
-                    elif rating == -1:
-                        current_feature_update[feature][resource]['THUMBS_DOWN'] += 1 # type: ignore
-                else:
-                    if rating == 1:
-                        current_feature_update[feature][resource]['THUMBS_UP'] += 1 # type: ignore
-                        current_feature_update[feature][resource]['THUMBS_DOWN'] -= 1 # type: ignore
-                    elif rating == -1:
-                        current_feature_update[feature][resource]['THUMBS_UP'] -= 1 # type: ignore
-                        current_feature_update[feature][resource]['THUMBS_DOWN'] += 1 # type: ignore
-
-            ref_feature_update.update(current_feature_update)
-
-        if change_str is not None:
-            ref_rating_update = db.reference(f'vibration_{DB}/{vib_class}/{resource}/parameter')
-            current_rating_update = ref_rating_update.get()
-
-            # Initialize rating if it doesn't exist
-            if not current_rating_update:
-                current_rating_update = {'THUMBS_UP': 0, 'THUMBS_DOWN': 0}
-
-            current_rating = current_rating_update
-
-            # Ensure current_rating is a dictionary
-            if not isinstance(current_rating, dict):
-                current_rating = {'THUMBS_UP': 0, 'THUMBS_DOWN': 0}
-
-            # Update the vibration rating based on the input rating
-            if clicked_num <= 1:
-                if rating == 1:
-                    current_rating['THUMBS_UP'] += 1
-                elif rating == -1:
-                    current_rating['THUMBS_DOWN'] += 1
-            else:
-                if rating == 1:
-                    current_rating['THUMBS_UP'] += 1
-                    current_rating['THUMBS_DOWN'] -= 1
-                elif rating == -1:
-                    current_rating['THUMBS_UP'] -= 1
-                    current_rating['THUMBS_DOWN'] += 1
-
-            ref_rating_update.update(current_rating)
-
-            if  change_list == []:
-                change_list = ['none', 'none', 'none']
 
-            try:
-                feature = change_list[0].strip("'")
-                change = change_list[1].strip("'")
-                direction = change_list[2].strip("'")
-            except:
-                logger.error(f"Resource or rating not found in the current data for change_list {change_list} and vibration {vib_num}")
-
-            direction_list = ['POSITIVE', 'NEGATIVE', 'NONE']
-
-            if change_list != ['none', 'none', 'none']:
-                ref_change_update = db.reference(f'vote-change_{DB}')
-                current_change_update = ref_change_update.get()
+            deltas = _vote_deltas(clicked_num, rating)
 
-                # Initialize change if it doesn't exist
-                if not current_change_update:
-                    current_change_update = {feature: {change: {dir: {'THUMBS_UP': 0, 'THUMBS_DOWN': 0} for dir in direction_list}}}
+            # only the counters of this vote are touched, the cost does not depend on the size of the vote trees
+            if feature_str is not None:
+                _increment_votes(batch, f'vibration_{DB}/{vib_class}/{resource}/navigation', deltas)
+                for feature in feature_list:
+                    _increment_votes(batch, f'vote-feature_{DB}/{feature}/{resource}', deltas)
 
-                # Ensure current_change_update is a dictionary of dictionaries
-                if not all(isinstance(value, dict) for value in current_change_update.values()): # type: ignore
-                    current_change_update = {feature: {change: {dir: {'THUMBS_UP': 0, 'THUMBS_DOWN': 0} for dir in direction_list}}}
+            if change_str is not None:
+                _increment_votes(batch, f'vibration_{DB}/{vib_class}/{resource}/parameter', deltas)
 
-                # Update the change rating based on the input rating
-                if feature not in current_change_update:
-                    current_change_update[feature] = {change: {dir: {'THUMBS_UP': 0, 'THUMBS_DOWN': 0} for dir in direction_list}} # type: ignore
+                if change_list == []:
+                    change_list = ['none', 'none', 'none']
 
-                if change not in current_change_update[feature]: # type: ignore
-                    current_change_update[feature][change] = {dir: {'THUMBS_UP': 0, 'THUMBS_DOWN': 0} for dir in direction_list} # type: ignore
+                try:
+                    feature = change_list[0].strip("'")
+                    change = change_list[1].strip("'")
+                    direction = change_list[2].strip("'")
+                except:
+                    logger.error(f"Resource or rating not found in the current data for change_list {change_list} and vibration {vib_num}")
+                    continue
 
-                if direction not in current_change_update[feature][change]: # type: ignore
-                    current_change_update[feature][change][direction] = {'THUMBS_UP': 0, 'THUMBS_DOWN': 0} # type: ignore
+                direction_list = ['POSITIVE', 'NEGATIVE', 'NONE']
 
-                if clicked_num <= 1:
-                    if rating == 1:
-                        current_change_update[feature][change][direction]['THUMBS_UP'] += 1 # type: ignore
-                    elif rating == -1:
-                        current_change_update[feature][change][direction]['THUMBS_DOWN'] += 1 # type: ignore
-                else:
-                    if rating == 1:
-                        current_change_update[feature][change][direction]['THUMBS_UP'] += 1 # type: ignore
-                        current_change_update[feature][change][direction]['THUMBS_DOWN'] -= 1 # type: ignore
-                    elif rating == -1:
-                        current_change_update[feature][change][direction]['THUMBS_UP'] -= 1 # type: ignore
-                        current_change_update[feature][change][direction]['THUMBS_DOWN'] += 1 # type: ignore
+                if change_list != ['none', 'none', 'none']:
+                    # every direction of a change exists, the ones not voted on stay unchanged
+                    for dir in dict.fromkeys(direction_list + [direction]):
+                        _increment_votes(batch, f'vote-change_{DB}/{feature}/{change}/{dir}', deltas if dir == direction else (0, 0))
 
-                ref_change_update.update(current_change_update)
 
+preference_matrix = PreferenceMatrix(f'vote-feature_{DB_read}', PREFERENCE_REFRESH_SECONDS)
 
 # Read data from Realtime Database
+def prepare_navigation():
+    """Load (or refresh) the vote copy that navigation reads, e.g. while the chat model is still answering."""
+    if CH_DISABLE_FIREBASE:
+        return
+    preference_matrix.ensure_current(db)
+
 def read_nav_rating(resourceLists: list[str], featureLists: list[str], importanceLists_i: Optional[list[float]] = None, preference: bool = True, num_clip: int = 5, min_clip: float = 0.01):
     if CH_DISABLE_FIREBASE:
         return random.choice(resourceLists)
 
-    ref = db.reference(f'vote-feature_{DB_read}')
-    current_data = ref.get()
-
-    # Initialize current_data if it's None
-    if current_data is None:
-        current_data = {}
-        for feature in featureLists:
-            valid_feature = replace_invalid_chars(feature)
-            current_data[valid_feature] = {}
-            for resource in resourceLists:
-                valid_resource = replace_invalid_chars(resource)
-                current_data[valid_feature][valid_resource] = {'THUMBS_UP': 0, 'THUMBS_DOWN': 0}
-        ref.set(current_data)  # Update the database with the initialized structure
-
-
-    resource_data = {}
-
-    # Initialize feature_weights if not provided
-    if importanceLists_i is None:
-        # Equal weights if not specified
-        importanceLists = {feature: 1 for feature in featureLists}
-    else:
-        importanceLists = dict(zip(featureLists, importanceLists_i))
-
-    # Initialize resource data for all features
-    for feature in featureLists:
-        if feature not in resource_data:
-            resource_data[feature] = {}
-        for resource in resourceLists:
-            if resource not in resource_data[feature]:
-                resource_data[feature][resource] = {
-                    'THUMBS_UP': 0,
-                    'THUMBS_DOWN': 0,
-                    'P_org': 0,
-                    'P_clip': 0,
-                    'P_soft': 0
-                }
-
-    for feature in featureLists:
-        valid_feature = replace_invalid_chars(feature)
-        if valid_feature not in current_data:
-            logger.error(f"Feature {feature} not found in current data")
-            continue
-
-        for resource in resourceLists:
-            valid_resource = replace_invalid_chars(resource)
-            if valid_resource not in current_data[valid_feature]: # type: ignore
-                logger.error(f"Resource {resource} not found under feature {feature}")
-                continue
-
-            resource_data[feature][resource]['THUMBS_UP'] = current_data[valid_feature][valid_resource]['THUMBS_UP'] # type: ignore
-            resource_data[feature][resource]['THUMBS_DOWN'] = current_data[valid_feature][valid_resource]['THUMBS_DOWN'] # type: ignore
-            total_votes = current_data[valid_feature][valid_resource]['THUMBS_UP'] + current_data[valid_feature][valid_resource]['THUMBS_DOWN'] # type: ignore
-            resource_data[feature][resource]['P_org'] = current_data[valid_feature][valid_resource]['THUMBS_UP'] / total_votes if total_votes > 0 else 0 # type: ignore
-            resource_data[feature][resource]['P_clip'] = 1.0 if total_votes < num_clip else resource_data[feature][resource]['P_org']
-            resource_data[feature][resource]['P_clip'] = min_clip if current_data[valid_feature][valid_resource]['THUMBS_DOWN'] == 0 and total_votes > 0 else resource_data[feature][resource]['P_org'] # type: ignore
-
-        # Calculate the soft probabilities
-        total_softs = sum(np.exp(resource_data[feature][resource]['P_clip']) for resource in resourceLists)
-        if total_softs > 0:
-            for resource in resourceLists:
-                resource_data[feature][resource]['P_soft'] = np.exp(resource_data[feature][resource]['P_clip']) / total_softs
-        else:
-            for resource in resourceLists:
-                resource_data[feature][resource]['P_soft'] = 0
-
-    logger.debug(f"resource_data: {resource_data}")
-
-    # Calculate weighted sum for each resource
-    resource_scores = {resource: 0 for resource in resourceLists}
-    for feature in featureLists:
-        for resource in resourceLists:
-            resource_scores[resource] += importanceLists[feature] * resource_data[feature][resource]['P_soft']
-
-    # Normalize scores to create a probability distribution
-    total_score = sum(resource_scores.values())
-    if total_score > 0:
-        resource_probabilities = {resource: score / total_score for resource, score in resource_scores.items()}
-    else:
-        resource_probabilities = {resource: 1 / len(resourceLists) for resource in resourceLists}
+    # votes come from the process-wide copy, which a listener keeps current
+    preference_matrix.ensure_current(db)
+    resource_probabilities = preference_matrix.resource_probabilities(resourceLists, featureLists, importanceLists_i, min_clip)
 
     # Select a resource based on the probabilities
     resources = list(resource_probabilities.keys())
@@ -449,59 +377,45 @@ def read_nav_rating(resourceLists: list[str], featureLists: list[str], importanc
 
     return selected_resource
 
-def update_signal_data(user_id, content: dict, signal: npt.NDArray[np.float64], t: npt.NDArray[np.float64], key_counter: int):
-    content_s = {"signal": signal.tolist()}
-    content_t = {"t": t.tolist()}
+def update_signal_data(user_id, content: dict, signal: npt.NDArray[np.floating], t: TimeBase, key_counter: int):
+    if CH_DISABLE_FIREBASE:
+        return
+
+    # the time axis is stored as its descriptor, `TimeBase(**time_base).expand()` rebuilds it
+    content_s = compress_signal("signal", signal, t.sample_rate)
     if user_id:
-        update_data(user_id, f'vibration_{key_counter}', content)
-        update_compressed_data(user_id, f'vibration_{key_counter}', "signal", content_s)
-        update_compressed_data(user_id, f'vibration_{key_counter}', "t", content_t)
+        with write_batch() as batch:
+            update_data(user_id, f'vibration_{key_counter}', {"rating": 0, **content, "time_base": t.to_dict()}, batch) # votes update the rating later
+            update_compressed_data(user_id, f'vibration_{key_counter}', "signal", content_s, batch)
     else:
         logger.error("user_id is not defined in session state")
 
-def submit_signal_data(user_id, content: dict, signal: npt.NDArray[np.float64], t: npt.NDArray[np.float64], key_counter: int):
+def submit_signal_data(user_id, content: dict, signal: npt.NDArray[np.floating], t: TimeBase, key_counter: int):
     if CH_DISABLE_FIREBASE:
         return
 
-    for DB in DB_write:
-        content_s = {"signal": signal.tolist()}
-        content_t = {"t": t.tolist()}
-        if user_id:
-            ref = db.reference(f'{DB}/{user_id}/submission/vibration_{key_counter}')
-            ref.update(content)
-
-            ref_content_s = db.reference(f'{DB}/{user_id}/submission/vibration_{key_counter}/signal')
-            compressed_content_s = compress_data(content_s)
-            ref_content_s.set(compressed_content_s)
-
-            ref_content_t = db.reference(f'{DB}/{user_id}/submission/vibration_{key_counter}/t')
-            compressed_content_t = compress_data(content_t)
-            ref_content_t.set(compressed_content_t)
+    if not user_id:
+        logger.error("user_id is not defined in session state")
+        return
 
-        else:
-            logger.error("user_id is not defined in session state")
+    compressed_content_s = compress_signal("signal", signal, t.sample_rate)
+    with write_batch() as batch:
+        for DB in DB_write:
+            batch.update(f'{DB}/{user_id}/submission/vibration_{key_counter}', {**content, "time_base": t.to_dict()})
+            batch.set(f'{DB}/{user_id}/submission/vibration_{key_counter}/signal', compressed_content_s)
 
 def update_noResponse_data(user_id: str, content: dict, key_counter: int):
     if CH_DISABLE_FIREBASE:
         return
 
-    for DB in DB_write:
-        if user_id:
-            ref = db.reference(f'{DB}/{user_id}/noResponse/vibration_{key_counter}')
-            if content:
-                ref.update(content)
-            else:
-                logger.error("Content is empty and cannot be updated")
-        else:
-            logger.error("user_id is not defined in session state")
-
-def sanitize_key(key):
-    """Sanitize the key to ensure it is valid for Firebase."""
-    return re.sub(r'[^a-zA-Z0-9_]', '_', key)
-
-def replace_invalid_chars(name):
-    # Replace invalid characters with underscores
-    return name.replace('.', '_').replace('$', '_').replace('#', '_').replace('[', '_').replace(']', '_').replace('/', '_')
+    if not user_id:
+        logger.error("user_id is not defined in session state")
+    elif not content:
+        logger.error("Content is empty and cannot be updated")
+    else:
+        with write_batch() as batch:
+            for DB in DB_write:
+                batch.update(f'{DB}/{user_id}/noResponse/vibration_{key_counter}', content)
 
 
 
@@ -509,6 +423,7 @@ def replace_invalid_chars(name):
 def read_data():
     if CH_DISABLE_FIREBASE:
         return
+    flush_writes()
     ref = db.reference(f'{DB_read}')
     snapshot = ref.get()
     print(snapshot)
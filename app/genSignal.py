@@ -1,5 +1,8 @@
 from enum import Enum
+from typing import Iterator
+import math
 import numpy as np
+import numpy.typing as npt
 import logging
 from langchain_core.pydantic_v1 import BaseModel, Field
 from langchain_core.tools import tool
@@ -8,6 +11,8 @@ from dotenv import load_dotenv
 load_dotenv()
 
 from .globalVariable import *
+from .lrucache import ByteLRUCache
+from .timebase import TimeBase
 
 
 logger = logging.getLogger("ChatHAP")
@@ -32,9 +37,144 @@ class GenSignalInput(BaseModel):
 
 
 
+def _each_envelope(A_E_option: AmplitudeEnvelopeType, pulse_length: int, k: npt.NDArray[np.int64]) -> npt.NDArray[np.float64]:
+    """Envelope of each pulse at positions `k` (0 <= k < pulse_length).
+
+    Closed form of the `np.arange` ramps, including their rounding of the ramp length.
+    """
+    match A_E_option:
+        case AmplitudeEnvelopeType.INCREASE:
+            step = 1/pulse_length
+            return np.where(k < math.ceil(1 / step), k * step, 1.0)
+        case AmplitudeEnvelopeType.DECREASE:
+            step = 1/pulse_length
+            delta = (1 - step) - 1
+            return np.where(k < math.ceil(1 / step), 1 + k * delta, 0.0)
+        case AmplitudeEnvelopeType.INCREASE_DECREASE:
+            step = 1/(pulse_length/2)
+            delta = (1 - step) - 1
+            ramp_length = math.ceil(1 / step)
+            return np.where(k < ramp_length, k * step, np.where(k < 2*ramp_length, 1 + (k - ramp_length) * delta, 0.0))
+        case _:
+            return np.ones(len(k))
+
+
+class _SignalBatch:
+    """Parameters of several signals, rendered together into one 2-D array.
+
+    The carrier is computed for all signals at once; envelopes are applied per signal from
+    sample indices, so any range of samples can be rendered without building the whole signal.
+    """
+
+    def __init__(self, gsis: list[GenSignalInput]):
+        def column(values, dtype=np.float64):
+            return np.array(values, dtype=dtype).reshape(-1, 1)
+
+        self.gsis = gsis
+        self.A = column([gsi.A for gsi in gsis])
+        self.dur = [float(gsi.dur) for gsi in gsis]
+        self.rhythm = [int(gsi.rhythm) for gsi in gsis]
+        self.length = [int(gsi.dur*SAMPLE_RATE) for gsi in gsis]
+        # time step of np.linspace(0, dur, length, endpoint=False)
+        self.dt = column([dur / max(length, 1) for dur, length in zip(self.dur, self.length)])
+
+        freq_c = column([gsi.freq_c for gsi in gsis])
+        if np.any((freq_c < MIN_FREQ_C) | (freq_c > MAX_FREQ_C)):
+            logger.warning("frequency parameter out of range")
+        self.freq_c = np.clip(freq_c, MIN_FREQ_C, MAX_FREQ_C)
+        self.freq_e = np.minimum(self.freq_c, np.maximum(0, column([gsi.freq_e for gsi in gsis])))
+
+    def __len__(self):
+        return len(self.gsis)
+
+    def render(self, start: int, stop: int, out: npt.NDArray[np.floating]) -> None:
+        """Write samples `start:stop` of every signal into `out` (shape `(len(self), stop - start)`).
+
+        Samples are always computed in float64 and only stored in the dtype of `out`.
+        """
+        if out.dtype == np.float64:
+            self._render_float64(start, stop, out)
+            return
+
+        scratch = np.empty((len(self), min(SIGNAL_CHUNK_SIZE, stop - start)))
+        for block_start in range(start, stop, SIGNAL_CHUNK_SIZE):
+            block_stop = min(block_start + SIGNAL_CHUNK_SIZE, stop)
+            block = scratch[:, :block_stop - block_start]
+            self._render_float64(block_start, block_stop, block)
+            out[:, block_start - start:block_stop - start] = block
+
+    def _render_float64(self, start: int, stop: int, out: npt.NDArray[np.float64]) -> None:
+        n = np.arange(start, stop)
+
+        np.multiply(self.dt, n, out=out) # t
+        out *= 2 * np.pi * self.freq_c
+        np.sin(out, out=out)
+        out *= GAIN * self.A
+        for i in np.flatnonzero(self.freq_e[:, 0]):
+            out[i] *= np.sin(2 * np.pi * self.freq_e[i, 0] * (n * self.dt[i, 0]))
+
+        for i in range(len(self)):
+            valid = max(0, min(stop, self.length[i]) - start)
+            out[i, valid:] = 0 # zero padding of shorter signals
+            if valid > 0:
+                self._apply_whole_envelope(i, n[:valid], out[i, :valid])
+                self._apply_rhythm_envelope(i, n[:valid], out[i, :valid])
+
+    def _apply_whole_envelope(self, i: int, n: npt.NDArray[np.int64], row: npt.NDArray[np.float64]) -> None:
+        dur, dt = self.dur[i], self.dt[i, 0]
+        match self.gsis[i].A_W_option:
+            case AmplitudeEnvelopeType.INCREASE:
+                row *= (n * dt) / dur
+            case AmplitudeEnvelopeType.DECREASE:
+                row *= 1 - ((n * dt) / dur)
+            case AmplitudeEnvelopeType.INCREASE_DECREASE:
+                half = self.length[i] // 2
+                a = min(max(half - n[0], 0), len(n))
+                b = min(max(2*half - n[0], 0), len(n))
+                row[:a] *= (n[:a] * dt) / (dur / 2)
+                row[a:b] *= 1 - ((n[a:b] - half) * dt) / (dur / 2)
+                row[b:] = 0
+            case _:
+                pass
+
+    def _apply_rhythm_envelope(self, i: int, n: npt.NDArray[np.int64], row: npt.NDArray[np.float64]) -> None:
+        rhythm = self.rhythm[i]
+        if rhythm == 1:
+            return
+
+        # The number of pulses: each pulse is followed by a rest of the same length
+        pulse_length = self.length[i] // (rhythm*2)
+        if pulse_length == 0:
+            row[:] = 0
+            return
+        period = 2*pulse_length
+        active = min(max(rhythm*period - n[0], 0), len(n))
+        row[active:] = 0
+        if active == 0:
+            return
+
+        A_E_option = self.gsis[i].A_E_option
+        if active >= period:
+            # repeat one pulse + rest period, starting at the right phase
+            pulse_train = np.zeros(period)
+            pulse_train[:pulse_length] = _each_envelope(A_E_option, pulse_length, np.arange(pulse_length))
+            row[:active] *= np.resize(np.roll(pulse_train, -(n[0] % period)), active)
+        else:
+            k = n[:active] % period
+            in_pulse = k < pulse_length
+            envelope = np.zeros(active)
+            envelope[in_pulse] = _each_envelope(A_E_option, pulse_length, k[in_pulse])
+            row[:active] *= envelope
+
+
+def _is_complete(gsi: GenSignalInput) -> bool:
+    return all(v is not None for v in (gsi.A, gsi.A_W_option, gsi.A_E_option, gsi.freq_c, gsi.freq_e, gsi.dur, gsi.rhythm))
+
+
 # @tool("genSignal", args_schema=GenSignalInput, return_direct=True)
 def genSignal_direct(
-        gsi: GenSignalInput
+        gsi: GenSignalInput,
+        dtype: npt.DTypeLike = SIGNAL_DTYPE,
         # A: float = 0.5,
         # A_W_option: AmplitudeEnvelopeType = AmplitudeEnvelopeType.CONTINUOUS,
         # A_E_option: AmplitudeEnvelopeType = AmplitudeEnvelopeType.CONTINUOUS,
@@ -43,96 +183,90 @@ def genSignal_direct(
         # rhythm = 1
     ):
     """Generate a vibration signal with the given parameters."""
-    A = gsi.A
-    A_W_option = gsi.A_W_option
-    A_E_option = gsi.A_E_option
-    freq_c = gsi.freq_c
-    freq_e = gsi.freq_e
-    dur = gsi.dur
-    rhythm = gsi.rhythm
-    if A != None and A_W_option != None and A_E_option != None and freq_c != None and freq_e != None and dur != None and rhythm != None:
-        rhythm = int(rhythm)
-        A_env = 1
+    if _is_complete(gsi):
+        dur = gsi.dur
         entire_length = int(dur*SAMPLE_RATE)
-        t = np.linspace(0, dur, entire_length, endpoint=False)
-        R_env = np.array([])
-        pulse_length = 0
-
-        # Entire Envelope
-        match A_W_option:
-            case AmplitudeEnvelopeType.CONTINUOUS:
-                A_env = 1
-            case AmplitudeEnvelopeType.INCREASE:
-                A_env = t / dur
-            case AmplitudeEnvelopeType.DECREASE:
-                A_env = 1 - (t / dur)
-            case AmplitudeEnvelopeType.INCREASE_DECREASE:
-                A_env = np.concatenate((t[:int(entire_length/2)] / (dur / 2), 1 - t[:int(entire_length/2)] / (dur / 2)))
-                if len(A_env) != entire_length:
-                    A_env = np.concatenate((A_env, np.zeros(entire_length - len(A_env))))
-            case _:
-                A_env = 1
-                # raise ValueError(f"Unhandled AmplitudeEnvelopeType: {A_W_option}")
+        t = TimeBase(SAMPLE_RATE, entire_length)
 
-        # Entire Frequency (Carrier Frequency)
-        if freq_c < MIN_FREQ_C or freq_c > MAX_FREQ_C:
-            logger.warning("frequency parameter out of range")
-            freq_c = min(MAX_FREQ_C, max(MIN_FREQ_C, freq_c))
-
-        # The number of pulses
-        if rhythm == 1:
-            pulse_list = np.ones(entire_length)
-            R_env = np.concatenate((R_env, pulse_list))
-        elif rhythm != 1:
-            pulse_length = int(entire_length/(rhythm*2))
-            rest_length = int(entire_length/(rhythm*2))
-
-            # Each Envelope
-            match A_E_option:
-                case AmplitudeEnvelopeType.CONTINUOUS:
-                    A_E_env = np.ones(pulse_length)
-                case AmplitudeEnvelopeType.INCREASE:
-                    A_E_env = np.arange(0, 1, 1/pulse_length)
-                    if len(A_E_env) != pulse_length:
-                        A_E_env = np.concatenate((A_E_env, np.ones(pulse_length - len(A_E_env))))
-                case AmplitudeEnvelopeType.DECREASE:
-                    A_E_env = np.arange(1, 0, -1/pulse_length)
-                    if len(A_E_env) <= pulse_length:
-                        A_E_env = np.concatenate((A_E_env, np.zeros(pulse_length - len(A_E_env))))
-                    else:
-                        A_E_env = A_E_env[:pulse_length]
-                case AmplitudeEnvelopeType.INCREASE_DECREASE:
-                    increasing_seq = np.arange(0, 1, 1/(pulse_length/2))
-                    decreasing_seq = np.arange(1, 0, -1/(pulse_length/2))
-                    A_E_env = np.concatenate((increasing_seq, decreasing_seq))
-                    if len(A_E_env) <= pulse_length:
-                        A_E_env = np.concatenate((A_E_env, np.zeros(pulse_length - len(A_E_env))))
-                    else:
-                        A_E_env = A_E_env[:pulse_length]
-                case _:
-                    A_E_env = np.ones(pulse_length)
-
-            pulse_list = A_E_env
-            rest_list = np.zeros(rest_length)
-
-            for i in range(rhythm):
-                R_env = np.concatenate((R_env, pulse_list, rest_list))
-
-            if len(R_env) != entire_length:
-                R_env = np.concatenate((R_env, np.zeros(entire_length-len(R_env))))
-
-        if freq_e == 0:
-            Signal = GAIN * A * A_env * R_env * np.sin(2* np.pi * freq_c * t)
-        else:
-            freq_e = min(freq_c, max(0, freq_e))
-            Signal = GAIN * A * A_env * R_env * np.sin(2* np.pi * freq_c * t) * np.sin(2* np.pi * freq_e * t) 
-
-        data = []
-        data.append(Signal)
-        data = np.array(data)
+        data = np.empty((1, entire_length), dtype=dtype)
+        _SignalBatch([gsi]).render(0, entire_length, data)
 
         return data, t, dur
 
     else:
         logger.warning("No list. Cannot create vibration.")
-        return np.array([[]]), np.array([]), 0
\ No newline at end of file
+        return np.array([[]], dtype=dtype), TimeBase(SAMPLE_RATE, 0), 0
+
+
+def genSignal_stream(gsi: GenSignalInput, chunk_size: int = SIGNAL_CHUNK_SIZE, dtype: npt.DTypeLike = SIGNAL_DTYPE) -> Iterator[npt.NDArray[np.floating]]:
+    """Generate a vibration signal as consecutive chunks of at most `chunk_size` samples.
+
+    Envelopes and carrier are computed per chunk from absolute sample indices, so the chunks join
+    without phase jumps and peak memory does not depend on the duration.
+    Use `signal_length` for the total number of samples.
+    """
+    if not _is_complete(gsi):
+        logger.warning("No list. Cannot create vibration.")
+        return
+
+    batch = _SignalBatch([gsi])
+    entire_length = batch.length[0]
+    buffer = np.empty((1, min(chunk_size, entire_length)))
+    for start in range(0, entire_length, chunk_size):
+        stop = min(start + chunk_size, entire_length)
+        chunk = buffer[:, :stop - start]
+        batch.render(start, stop, chunk)
+        yield chunk[0].astype(dtype)
+
+
+def signal_length(gsi: GenSignalInput) -> int:
+    """Number of samples of the signal generated for `gsi`."""
+    return int(gsi.dur*SAMPLE_RATE)
+
+
+signal_cache: ByteLRUCache[tuple[npt.NDArray[np.floating], TimeBase, float]] = ByteLRUCache(SIGNAL_CACHE_BYTES)
+
+def signal_cache_key(gsi: GenSignalInput) -> tuple:
+    """Canonical form of the generation parameters: equal keys produce identical signals."""
+    freq_c = min(MAX_FREQ_C, max(MIN_FREQ_C, float(gsi.freq_c)))
+    return (
+        float(gsi.A),
+        AmplitudeEnvelopeType(gsi.A_W_option).value,
+        AmplitudeEnvelopeType(gsi.A_E_option).value,
+        freq_c,
+        min(freq_c, max(0.0, float(gsi.freq_e))),
+        float(gsi.dur),
+        int(gsi.rhythm),
+    )
+
+def genSignal_cached(gsi: GenSignalInput):
+    """Same as `genSignal_direct`, but memoized across reruns and sessions.
+
+    The returned arrays are shared and therefore read-only.
+    """
+    if not _is_complete(gsi):
+        return genSignal_direct(gsi)
+
+    def create():
+        data, t, dur = genSignal_direct(gsi)
+        data.setflags(write=False)
+        return data, t, dur
+
+    return signal_cache.get_or_create(signal_cache_key(gsi), create)
+
+
+def genSignal_batch(gsis: list[GenSignalInput], dtype: npt.DTypeLike = SIGNAL_DTYPE) -> tuple[npt.NDArray[np.floating], npt.NDArray[np.int64], list[float]]:
+    """Generate many vibration signals at once.
+
+    Returns a preallocated 2-D array with one zero-padded signal per row, the length of each signal and their durations.
+    """
+    incomplete = [i for i, gsi in enumerate(gsis) if not _is_complete(gsi)]
+    if incomplete:
+        raise ValueError(f"Incomplete generation parameters at positions {incomplete}")
+
+    batch = _SignalBatch(gsis)
+    lengths = np.array(batch.length, dtype=np.int64)
+    data = np.empty((len(gsis), int(lengths.max(initial=0))), dtype=dtype)
+    batch.render(0, data.shape[1], data)
+
+    return data, lengths, [gsi.dur for gsi in gsis]
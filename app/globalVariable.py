@@ -6,6 +6,23 @@ MAX_RHYTHM = 20
 
 GAIN = 2.705 # 4G at 200Hz (vibration actuator)
 
+LIBRARY_CACHE_BYTES = 64 * 2**20 # decoded library waveforms kept in memory (per process)
+SIGNAL_CACHE_BYTES = 128 * 2**20 # generated signals shared by all sessions (per process)
+SIGNAL_CHUNK_SIZE = 8192 # samples per chunk when streaming signals
+SIGNAL_DTYPE = "float32" # dtype of signals from generation to upload ("float64" for full precision)
+SIGNAL_UPLOAD_DTYPE = "float32" # sample encoding of uploaded signals ("int16" halves the payload)
+SIGNAL_UPLOAD_COMPRESSION = "zlib" # compression of uploaded signals ("zstd" needs the zstandard package)
+PREFERENCE_REFRESH_SECONDS = 60 # reload interval of the vote copy when no database listener is available
+NAV_TOP_K = 40 # library entries the local tag index suggests to the LLM per navigation query (the whole library is always sent, 0 suggests none)
+NAV_TAG_VOCABULARY = False # number repeated tags in the navigation prompt (fewer tokens, but the model has to look them up)
+LLM_CACHE_ENTRIES = 512 # parsed LLM responses kept in memory (per process)
+LLM_CACHE_ROWS = 10000 # LLM responses kept in the SQLite cache file
+LLM_CACHE_TTL = 7 * 24 * 3600 # seconds until a cached LLM response expires
+LLM_MAX_CONCURRENCY = 8 # model calls in flight at once (per process, lowered automatically when rate limited)
+LLM_RATE_LIMIT_RETRIES = 3 # retries of a rate limited model call
+CONTEXT_TOKEN_BUDGET = 2000 # conversation tokens sent per chat turn; older turns are folded into a summary
+CONTEXT_SUMMARY_TOKENS = 400 # upper bound of that summary
+
 # TEST:
 UserPreference = True
 CLIP = 0
@@ -0,0 +1,106 @@
+"""Hedged LLM calls: race a secondary chain against the primary one, first valid response wins.
+
+The secondary request is only sent if the primary has not produced a valid response after `delay`
+seconds (0 races both from the start). The slower request is cancelled. Latencies and winners are
+recorded, so the tail latency with and without hedging can be compared.
+"""
+import asyncio
+from collections import Counter, deque
+import logging
+import threading
+import time
+from typing import Any, Optional
+
+import numpy as np
+from langchain_core.runnables import RunnableLambda, RunnableSerializable
+
+from .asyncloop import run_coroutine
+
+logger = logging.getLogger("ChatHAP")
+
+
+class LatencyStats:
+    """Latencies of the most recent calls and which chain answered them."""
+
+    def __init__(self, window: int = 1000, report_every: int = 50):
+        self.report_every = report_every
+        self.latencies: deque[float] = deque(maxlen=window)
+        self.winners: Counter[str] = Counter()
+        self.hedged = 0
+        self.failures = 0
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float, winner: str, hedged: bool) -> None:
+        with self._lock:
+            self.latencies.append(seconds)
+            self.winners[winner] += 1
+            self.hedged += hedged
+            calls = sum(self.winners.values())
+        if self.report_every and calls % self.report_every == 0:
+            logger.info(self.report())
+
+    def percentiles(self, *q: float) -> list[float]:
+        with self._lock:
+            if not self.latencies:
+                return [0.0] * len(q)
+            return np.percentile(np.fromiter(self.latencies, dtype=np.float64), q).tolist()
+
+    def report(self) -> str:
+        p50, p95, p99 = self.percentiles(50, 95, 99)
+        return (f"LLM latency p50 {p50:.2f}s, p95 {p95:.2f}s, p99 {p99:.2f}s over {len(self.latencies)} calls; "
+                f"secondary sent {self.hedged} times, answered by {dict(self.winners)}, {self.failures} failed")
+
+
+async def hedged_ainvoke(primary: RunnableSerializable, secondary: RunnableSerializable, inputs: Any, model: type, delay: float,
+                         stats: Optional[LatencyStats] = None, names: tuple[str, str] = ("primary", "secondary")) -> Any:
+    """First response of `model` type from either chain; the secondary starts after `delay` seconds."""
+    start = time.perf_counter()
+    tasks = {asyncio.ensure_future(primary.ainvoke(inputs)): names[0]}
+    pending = set(tasks)
+    errors: list[BaseException] = []
+
+    def first_valid(done: set) -> Optional[asyncio.Task]:
+        for task in done:
+            if task.exception() is None and isinstance(task.result(), model):
+                if stats is not None:
+                    stats.record(time.perf_counter() - start, tasks[task], len(tasks) > 1)
+                return task
+            logger.warning(f"{tasks[task]} did not return a valid {model.__name__}: {task.exception() or task.result()!r}")
+            errors.append(task.exception() or TypeError(f"{tasks[task]} returned {task.result()!r}"))
+        return None
+
+    try:
+        if delay > 0:
+            done, pending = await asyncio.wait(pending, timeout=delay)
+            if (winner := first_valid(done)) is not None:
+                return winner.result()
+
+        secondary_task = asyncio.ensure_future(secondary.ainvoke(inputs))
+        tasks[secondary_task] = names[1]
+        pending.add(secondary_task)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            if (winner := first_valid(done)) is not None:
+                return winner.result()
+    finally:
+        for task in pending:
+            task.cancel() # the slower request
+        if pending:
+            await asyncio.wait(pending)
+
+    if stats is not None:
+        stats.failures += 1
+    raise errors[0]
+
+
+def hedged_runnable(primary: RunnableSerializable, secondary: RunnableSerializable, model: type, delay: float,
+                    stats: Optional[LatencyStats] = None, names: tuple[str, str] = ("primary", "secondary")) -> RunnableLambda:
+    """Runnable racing the two chains, usable with both `invoke` and `ainvoke`."""
+
+    async def ainvoke(inputs):
+        return await hedged_ainvoke(primary, secondary, inputs, model, delay, stats, names)
+
+    def invoke(inputs):
+        return run_coroutine(ainvoke(inputs))
+
+    return RunnableLambda(invoke, afunc=ainvoke)
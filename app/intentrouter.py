@@ -0,0 +1,145 @@
+"""Local fast path for obvious ModifyApproach commands.
+
+Short, single-intent requests such as "make the vibration stronger" or "loop it 4 times" are answered
+with the same factors the base prompt teaches the model, without an LLM round trip. Anything that is
+not matched with confidence falls through to the LLM.
+"""
+from dataclasses import dataclass
+import logging
+import re
+import threading
+import time
+from typing import Callable, Optional
+
+from .appmode import CH_INTENT_ROUTER
+from .langinterface import LLMResponse, ModifyApproach
+
+logger = logging.getLogger("ChatHAP")
+
+_NUMBERS = {"two": 2, "twice": 2, "three": 3, "thrice": 3, "four": 4, "five": 5, "six": 6, "eight": 8, "ten": 10}
+_FRACTIONS = {"half": 0.5, "third": 1 / 3, "quarter": 0.25}
+_MAX_WORDS = 14
+_MAX_FACTOR = 10 # larger loop or stretch factors are left to the LLM
+
+# anything that asks for more than a plain modification goes to the LLM
+_FALL_THROUGH = re.compile(r"\b(and|but|then|also|hz|hertz|frequency|pulses?|rhythm|envelope|like|new|another|find|generate|create|design)\b|[,;]|\d*\.\d")
+# negations ("don't make it stronger"), undo requests, questions, feedback and comparisons between vibrations
+_NOT_A_COMMAND = re.compile(r"\b(not|don't|do not|no|never|stop|undo|instead|why|what|which|was|is it|one|ones|than)\b|n't\b|\?"
+                            r"|\b(last|previous) (change|edit)\b|\b(first|second|third|other|previous|last) (vibration|signal)\b")
+# every rule has to match the whole request: an imperative (or a complaint like "it's too weak") about the current
+# vibration, with no number or scope word the rule does not capture itself
+_COMMAND = r"(?:(?:please|can you|could you|now)\s+)*"
+_COMPLAINT = r"(?:(?:it's|it is|this is|that's|that is|the (?:vibration|tempo|intensity) is)\s+)?"
+_IT = r"(?:it|this|the vibration|the signal)"
+_OF_IT = r"(?: of " + _IT + r")?"
+_A_BIT = r"(?: a (?:bit|little))?"
+_END = r"(?:\s+please)?[.!]*"
+
+_NUMBER = r"(\d+|" + "|".join(_NUMBERS) + r")"
+
+
+def _number(token: str) -> Optional[float]:
+    """The factor for a whole number token, None if it is not in (0, _MAX_FACTOR]."""
+    value = float(_NUMBERS.get(token, token)) # type: ignore
+    return value if 0 < value <= _MAX_FACTOR else None
+
+
+@dataclass(frozen=True)
+class _Rule:
+    pattern: re.Pattern
+    field: str
+    value: Callable[[re.Match], Optional[float]]
+    message: str
+
+
+def _rule(pattern: str, field: str, value, message: str) -> _Rule:
+    return _Rule(re.compile(_COMMAND + r"(?:" + pattern + r")" + _END), field, value if callable(value) else (lambda _, v=value: v), message)
+
+
+# factors follow the examples in the base prompt
+_RULES = [
+    _rule(r"(?:reverse|flip)(?: " + _IT + r")?|(?:play|make) it backwards?", "reverse_signal", True, "I reversed the vibration."),
+    _rule(r"(?:loop|repeat)(?: " + _IT + r")? " + _NUMBER + r" ?(?:times|x)", "truncate_or_extend_signal_factor", lambda m: _number(m.group(1)), "I looped the vibration {value:g} times."),
+    _rule(r"(?:loop|repeat)(?: " + _IT + r")? (twice|thrice)", "truncate_or_extend_signal_factor", lambda m: _number(m.group(1)), "I looped the vibration {value:g} times."),
+    _rule(r"(?:loop|repeat)(?: " + _IT + r")?", "truncate_or_extend_signal_factor", 2.0, "I looped the vibration."),
+    _rule(r"(?:keep|play|use|take) (?:only )?the first (half|third|quarter)" + _OF_IT, "truncate_or_extend_signal_factor", lambda m: _FRACTIONS[m.group(1)], "I kept only the first {value:.0%} of the vibration."),
+    _rule(r"(?:cut|remove|drop|truncate) (?:off )?the last (half|third|quarter)" + _OF_IT, "truncate_or_extend_signal_factor", lambda m: 1 - _FRACTIONS[m.group(1)], "I cut the vibration to its first {value:.0%}."),
+    _rule(r"extend the duration" + _OF_IT + " " + _NUMBER + r" times", "time_stretch_factor", lambda m: _number(m.group(1)), "I stretched the vibration {value:g} times longer."),
+    _rule(r"(?:reduce|shorten) the duration" + _OF_IT + r" a (?:bit|little)", "time_stretch_factor", 0.8, "I shortened the vibration a bit."),
+    _rule(_COMPLAINT + r"too (?:intense|strong)", "change_amplitude_factor", 0.4, "I made the vibration much weaker."),
+    _rule(_COMPLAINT + r"too weak", "change_amplitude_factor", 1.8, "I made the vibration much stronger."),
+    _rule(r"(?:reduce|lower|decrease) (?:" + _IT + r"|the (?:intensity|amplitude|strength)) a (?:bit|little)|make " + _IT + r" (?:weaker|softer|gentler)" + _A_BIT, "change_amplitude_factor", 0.6, "I made the vibration weaker."),
+    _rule(r"make " + _IT + r" (?:stronger|more intense)" + _A_BIT, "change_amplitude_factor", 1.5, "I made the vibration stronger."),
+    _rule(_COMPLAINT + r"too fast", "time_stretch_factor", 1.5, "I slowed the vibration down."),
+    _rule(r"make " + _IT + r" slower" + _A_BIT + r"|slow(?: " + _IT + r")? down" + _A_BIT, "time_stretch_factor", 1.3, "I slowed the vibration down."),
+    _rule(r"make " + _IT + r" faster" + _A_BIT + r"|speed(?: " + _IT + r")? up" + _A_BIT + "|" + _COMPLAINT + r"too slow", "time_stretch_factor", 0.7, "I sped the vibration up."),
+]
+
+
+def route_modify(text: str) -> Optional[LLMResponse]:
+    """A ModifyApproach response for an obvious modification request, None if the LLM should decide."""
+    text = " ".join(text.lower().replace("’", "'").split())
+    if len(text.split()) > _MAX_WORDS or _FALL_THROUGH.search(text) or _NOT_A_COMMAND.search(text):
+        return None
+
+    for rule in _RULES:
+        match = rule.pattern.fullmatch(text)
+        if match is None:
+            continue
+        value = rule.value(match)
+        if value is None:
+            return None
+        approach = ModifyApproach(approach_type="ModifyApproach", **{rule.field: value})
+        return LLMResponse(response_msg=rule.message.format(value=value), approach=approach)
+    return None
+
+
+class IntentRouter:
+    """Answers obvious modification requests locally and keeps hit-rate and latency statistics."""
+
+    def __init__(self, enabled: bool = True, report_every: int = 20):
+        self.enabled = enabled
+        self.report_every = report_every
+        self.hits = 0
+        self.misses = 0
+        self.llm_seconds = 0.0
+        self.router_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def respond(self, text: str, has_signal: bool, fallback: Callable[[], LLMResponse]) -> LLMResponse:
+        """Route `text` locally if possible (only when there is a vibration to modify), otherwise call `fallback`."""
+        start = time.perf_counter()
+        response = route_modify(text) if self.enabled and has_signal else None
+        routed = time.perf_counter()
+        with self._lock:
+            self.router_seconds += routed - start
+
+        if response is not None:
+            with self._lock:
+                self.hits += 1
+        else:
+            response = fallback()
+            with self._lock:
+                self.misses += 1
+                self.llm_seconds += time.perf_counter() - routed
+
+        if self.report_every and (self.hits + self.misses) % self.report_every == 0:
+            logger.info(self.report())
+        return response
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    @property
+    def saved_seconds(self) -> float:
+        """LLM time not spent, estimated from the average latency of the calls that did go to the LLM."""
+        return self.hits * self.llm_seconds / self.misses if self.misses else 0.0
+
+    def report(self) -> str:
+        return (f"Intent router: {self.hits}/{self.hits + self.misses} requests answered locally ({self.hit_rate:.0%}), "
+                f"~{self.saved_seconds:.1f}s of LLM latency saved, {self.router_seconds * 1e3:.2f}ms spent routing")
+
+
+intent_router = IntentRouter(CH_INTENT_ROUTER)
@@ -1,5 +1,6 @@
 from dataclasses import dataclass
 from enum import Enum
+import hashlib
 import json
 import logging
 import os
@@ -21,7 +22,13 @@ from langchain_google_genai import ChatGoogleGenerativeAI
 
 
 from app.genSignal import GAIN, AmplitudeEnvelopeType, GenSignalInput
-from app.appmode import CH_DISABLE_OPENAI
+from app.appmode import CH_DISABLE_OPENAI, CH_LLM_CACHE, CH_LLM_CACHE_PATH, CH_LLM_HEDGE_DELAY
+from app.globalVariable import LLM_CACHE_ENTRIES, LLM_CACHE_ROWS, LLM_CACHE_TTL, LLM_MAX_CONCURRENCY, LLM_RATE_LIMIT_RETRIES
+from app.asyncloop import run_coroutine
+from app.hedging import LatencyStats, hedged_runnable
+from app.llmcache import LLMResponseCache, cache_key, normalize_messages
+from app.llmgateway import LLMGateway, Priority
+from app.repair import StructuredOutputRepair, correction_prompt
 
 from langchain_core.runnables import RunnableSerializable
 
@@ -63,8 +70,12 @@ default_llm_model = gpt4_model
 class LLMChains:
     base_chain: RunnableSerializable
     nav_chain: RunnableSerializable
+    model_name: str = "" # part of the response cache key
 default_chains: LLMChains = LLMChains(None, None) # type: ignore
 
+llm_cache = LLMResponseCache(CH_LLM_CACHE, CH_LLM_CACHE_PATH, LLM_CACHE_ENTRIES, LLM_CACHE_ROWS, LLM_CACHE_TTL)
+llm_gateway = LLMGateway(LLM_MAX_CONCURRENCY, max_retries=LLM_RATE_LIMIT_RETRIES)
+
 class GenChangeDirection(Enum):
     """Directions for changing generation parameters."""
     NONE = "NONE"
@@ -203,15 +214,8 @@ base_prompt = ChatPromptTemplate.from_messages(
 	]
 )
 
-def chat_chatgpt(conversation: Sequence[BaseMessage], llmchains: LLMChains = default_chains) -> LLMResponse:
-    try:
-        response = llmchains.base_chain.invoke({
-            "conversation": conversation
-        })
-    except ValidationError as e:
-        logger.error(f"Validation error: {e}")
-        raise
-    return response  # type: ignore
+def chat_chatgpt(conversation: Sequence[BaseMessage], llmchains: Optional[LLMChains] = None, priority: Priority = Priority.INTERACTIVE) -> LLMResponse:
+    return run_coroutine(achat_chatgpt(conversation, llmchains, priority))
 
     # # Count tokens
     # encoding = tiktoken.encoding_for_model("gpt-3.5-turbo")
@@ -219,6 +223,27 @@ def chat_chatgpt(conversation: Sequence[BaseMessage], llmchains: LLMChains = def
     # logger.debug(f"Number of tokens in msg: {tags_token_count}")
 
 
+async def achat_chatgpt(conversation: Sequence[BaseMessage], llmchains: Optional[LLMChains] = None, priority: Priority = Priority.INTERACTIVE) -> LLMResponse:
+    """`chat_chatgpt` for the event loop; the model is called through the shared gateway."""
+    llmchains = llmchains or default_chains
+    key = _chat_cache_key(conversation, llmchains)
+
+    async def call() -> LLMResponse:
+        try:
+            response = await llm_gateway.submit(key, lambda: llmchains.base_chain.ainvoke({
+                "conversation": conversation
+            }), priority)
+        except ValidationError as e:
+            logger.error(f"Validation error: {e}")
+            raise
+        return response  # type: ignore
+
+    return await llm_cache.aget_or_call(key, LLMResponse, call)
+
+def _chat_cache_key(conversation: Sequence[BaseMessage], llmchains: LLMChains) -> str:
+    return cache_key(llmchains.model_name, base_prompt, normalize_messages(conversation))
+
+
 
 class NavResponseResource(BaseModel):
     """Resource selected from the TAG_LIST with reasons."""
@@ -251,30 +276,90 @@ nav_prompt = ChatPromptTemplate.from_messages(
             """
         ),
         ("system", "TAG_LIST: {tag_list}"),
-        ("human", "{input_query}"),
+        ("human", "{candidates}{input_query}"),
         # ("placeholder", "{conversation}")
     ]
 )
 
-def nav_chatgpt(input_query: str, tag_list: str, llmchains: LLMChains = default_chains) -> LLMNavResponse:
-    response = llmchains.nav_chain.invoke({
-        "input_query": input_query,
-        "tag_list": tag_list
-    })
+def nav_prompt_prefix(tag_list: str) -> list[BaseMessage]:
+    """Messages of the navigation prompt that precede the query: the static instructions, then the library block.
+
+    The prefix only depends on the tag list, which is always the whole library in file order, so provider-side
+    prompt caching can reuse it across queries. Per-query candidates go into the query message (`nav_candidates`).
+    """
+    return nav_prompt.format_messages(input_query="", candidates="", tag_list=tag_list)[:-1]
+
+def nav_candidates(ids: Sequence[int]) -> str:
+    """Start of the query message pointing the model at the TAG_LIST ids a local search found ("" for none)."""
+    if not ids:
+        return ""
+    return "Resources that most likely match (TAG_LIST ids): " + ",".join(str(i) for i in ids) + "\n\n"
+
+def prompt_prefix_hash(messages: Sequence[BaseMessage]) -> str:
+    sha = hashlib.sha256()
+    for message in messages:
+        sha.update(f"{message.type}\0{message.content}\0".encode("utf-8"))
+    return sha.hexdigest()
+
+def nav_chatgpt(input_query: str, tag_list: str, llmchains: Optional[LLMChains] = None, priority: Priority = Priority.INTERACTIVE, candidates: str = "") -> LLMNavResponse:
+    return run_coroutine(anav_chatgpt(input_query, tag_list, llmchains, priority, candidates))
+
+async def anav_chatgpt(input_query: str, tag_list: str, llmchains: Optional[LLMChains] = None, priority: Priority = Priority.INTERACTIVE, candidates: str = "") -> LLMNavResponse:
+    """`nav_chatgpt` for the event loop; identical queries in flight at the same time are sent once."""
+    llmchains = llmchains or default_chains
+    key = _nav_cache_key(input_query, tag_list, candidates, llmchains)
 
-    return response # type: ignore
+    async def call() -> LLMNavResponse:
+        response = await llm_gateway.submit(key, lambda: llmchains.nav_chain.ainvoke({
+            "input_query": input_query,
+            "candidates": candidates,
+            "tag_list": tag_list
+        }), priority)
+        return response # type: ignore
 
+    return await llm_cache.aget_or_call(key, LLMNavResponse, call)
+
+def _nav_cache_key(input_query: str, tag_list: str, candidates: str, llmchains: LLMChains) -> str:
+    return cache_key(llmchains.model_name, nav_prompt, {"input_query": " ".join(input_query.split()), "candidates": candidates, "tag_list": tag_list})
+
+
+def structured_chain(prompt: ChatPromptTemplate, llm, model: type[BaseModel]) -> RunnableSerializable:
+    """`prompt | llm.with_structured_output(model)`, repairing invalid outputs instead of raising (see repair.py)."""
+    repair = StructuredOutputRepair(model, correction_prompt | llm.with_structured_output(model, include_raw=True))
+    return prompt | llm.with_structured_output(model, include_raw=True) | repair.runnable()
 
 default_chains = LLMChains(
-    base_chain = base_prompt | default_llm_model.with_structured_output(LLMResponse),
-    nav_chain = nav_prompt | default_llm_model.with_structured_output(LLMNavResponse),
+    base_chain = structured_chain(base_prompt, default_llm_model, LLMResponse),
+    nav_chain = structured_chain(nav_prompt, default_llm_model, LLMNavResponse),
+    model_name = default_llm_model.model_name,
+)
+
+claude_chains = LLMChains(
+    base_chain = structured_chain(base_prompt, claude_model, LLMResponse),
+    nav_chain = structured_chain(nav_prompt, claude_model, LLMNavResponse),
+    model_name = claude_model.model,
 )
 
+llm_latency = LatencyStats()
+
+def hedged_chains(primary: LLMChains, secondary: LLMChains, delay: float, stats: Optional[LatencyStats] = None) -> LLMChains:
+    """Chains that also ask `secondary` if `primary` has no valid response after `delay` seconds, see hedging.py."""
+    stats = stats or llm_latency
+    names = (primary.model_name, secondary.model_name)
+    return LLMChains(
+        base_chain = hedged_runnable(primary.base_chain, secondary.base_chain, LLMResponse, delay, stats, names),
+        nav_chain = hedged_runnable(primary.nav_chain, secondary.nav_chain, LLMNavResponse, delay, stats, names),
+        model_name = "+".join(names),
+    )
+
+if CH_LLM_HEDGE_DELAY is not None:
+    default_chains = hedged_chains(default_chains, claude_chains, CH_LLM_HEDGE_DELAY)
+
 
 def llmtests(llmchains: LLMChains = default_chains):
     start_time = time.time()
     test_conversation: list[BaseMessage] = [ HumanMessage(content="Please generate a signal with 3 pulses and a duration of 2 seconds."), ]
-    response = chat_chatgpt(test_conversation, llmchains=llmchains)
+    response = chat_chatgpt(test_conversation, llmchains=llmchains, priority=Priority.BACKGROUND)
     assert response.approach is not None and response.approach.approach_type == "GenerationApproach" and response.approach.generation_parameters.rhythm == 3 and response.approach.generation_parameters.dur == 2, response
 
 
@@ -285,19 +370,19 @@ def llmtests(llmchains: LLMChains = default_chains):
     #     (I-b) Set a frequency is at 100Hz.
     #     (I-c) Change the frequency to 200Hz.
     test_conversation = [ HumanMessage(content="Please generate A 4-second vibration with continuous amplitude. The whole amplitude is increasing and then decreasing."), ]
-    response = chat_chatgpt(test_conversation, llmchains=llmchains)
+    response = chat_chatgpt(test_conversation, llmchains=llmchains, priority=Priority.BACKGROUND)
     assert response.approach is not None and response.approach.approach_type == "GenerationApproach" and response.approach.generation_parameters.dur == 4 and response.approach.generation_parameters.A_E_option == AmplitudeEnvelopeType.CONTINUOUS and response.approach.generation_parameters.A_W_option == AmplitudeEnvelopeType.INCREASE_DECREASE, response
 
     if response.response_msg:
         test_conversation.append(AIMessage(content=response.response_msg))
     test_conversation.append(HumanMessage(content="Please set the frequency to 100Hz."))
-    response = chat_chatgpt(test_conversation, llmchains=llmchains)
+    response = chat_chatgpt(test_conversation, llmchains=llmchains, priority=Priority.BACKGROUND)
     assert response.approach is not None and response.approach.approach_type == "GenerationApproach" and response.approach.generation_parameters.freq_c == 100 and response.approach.generation_parameters.dur == 4 and response.approach.generation_parameters.A_E_option == AmplitudeEnvelopeType.CONTINUOUS and response.approach.generation_parameters.A_W_option == AmplitudeEnvelopeType.INCREASE_DECREASE, response
 
     if response.response_msg:
         test_conversation.append(AIMessage(content=response.response_msg))
     test_conversation.append(HumanMessage(content="Please change the frequency to 200Hz."))
-    response = chat_chatgpt(test_conversation, llmchains=llmchains)
+    response = chat_chatgpt(test_conversation, llmchains=llmchains, priority=Priority.BACKGROUND)
     assert response.approach is not None and response.approach.approach_type == "GenerationApproach" and response.approach.generation_parameters.freq_c == 200 and response.approach.generation_parameters.dur == 4 and response.approach.generation_parameters.A_E_option == AmplitudeEnvelopeType.CONTINUOUS and response.approach.generation_parameters.A_W_option == AmplitudeEnvelopeType.INCREASE_DECREASE, response
 
 
@@ -305,52 +390,48 @@ def llmtests(llmchains: LLMChains = default_chains):
     # (2-b) Make the vibration feel stronger.
     # (2-c) Make the vibration's tempo faster.
     test_conversation = [ HumanMessage(content="Please generate a 2-second vibration with 4 pulses. The pulses' envelope should be ramp-up."), ]
-    response = chat_chatgpt(test_conversation, llmchains=llmchains)
+    response = chat_chatgpt(test_conversation, llmchains=llmchains, priority=Priority.BACKGROUND)
     assert response.approach is not None and response.approach.approach_type == "GenerationApproach" and response.approach.generation_parameters.dur == 2 and response.approach.generation_parameters.rhythm == 4 and response.approach.generation_parameters.A_E_option == AmplitudeEnvelopeType.INCREASE, response
 
     if response.response_msg:
         test_conversation.append(AIMessage(content=response.response_msg))
     test_conversation.append(HumanMessage(content="Please make the vibration feel stronger."))
-    response = chat_chatgpt(test_conversation, llmchains=llmchains)
+    response = chat_chatgpt(test_conversation, llmchains=llmchains, priority=Priority.BACKGROUND)
     assert response.approach is not None and response.approach.approach_type == "ModifyApproach" and response.approach.change_amplitude_factor is not None and response.approach.change_amplitude_factor > 1, response
 
     if response.response_msg:
         test_conversation.append(AIMessage(content=response.response_msg))
     test_conversation.append(HumanMessage(content="Please make the vibration's tempo faster."))
-    response = chat_chatgpt(test_conversation, llmchains=llmchains)
+    response = chat_chatgpt(test_conversation, llmchains=llmchains, priority=Priority.BACKGROUND)
     assert response.approach is not None and response.approach.approach_type == "ModifyApproach" and response.approach.time_stretch_factor is not None and response.approach.time_stretch_factor < 1, response
 
     # (3-a) Create a vibration that mimics the sensation of walking.
     # (3-b) Loop the vibration 2 times.
     # (3-c) Truncate the last third of the vibration.
     test_conversation = [ HumanMessage(content="Please create a vibration that mimics the sensation of walking."), ]
-    response = chat_chatgpt(test_conversation, llmchains=llmchains)
+    response = chat_chatgpt(test_conversation, llmchains=llmchains, priority=Priority.BACKGROUND)
     assert response.approach is not None and response.approach.approach_type == "NavigationApproach" and len(response.approach.natural_language_search_query) > 6, response
 
     if response.response_msg:
         test_conversation.append(AIMessage(content=response.response_msg))
     test_conversation.append(HumanMessage(content="Loop the vibration 2 times."))
-    response = chat_chatgpt(test_conversation, llmchains=llmchains)
+    response = chat_chatgpt(test_conversation, llmchains=llmchains, priority=Priority.BACKGROUND)
     assert response.approach is not None and response.approach.approach_type == "ModifyApproach" and response.approach.truncate_or_extend_signal_factor == 2, response
 
     if response.response_msg:
         test_conversation.append(AIMessage(content=response.response_msg))
     test_conversation.append(HumanMessage(content="Truncate the last third of the vibration."))
-    response = chat_chatgpt(test_conversation, llmchains=llmchains)
+    response = chat_chatgpt(test_conversation, llmchains=llmchains, priority=Priority.BACKGROUND)
     assert response.approach is not None and response.approach.approach_type == "ModifyApproach" and response.approach.truncate_or_extend_signal_factor is not None and abs(response.approach.truncate_or_extend_signal_factor - 0.66) < 0.015, response
 
     end_time = time.time()
 
-    bm = llmchains.base_chain.middle[0].bound # type: ignore
-    print(f"Tests passed for {bm.model_name if isinstance(bm, ChatOpenAI) else bm.model} in {end_time - start_time:.2f} seconds.")
+    print(f"Tests passed for {llmchains.model_name} in {end_time - start_time:.2f} seconds.")
 
 
 if __name__ == "__main__":
     # Test LLM output for GenerationApproach style prompt
-    claude_chains = LLMChains(
-        base_chain = base_prompt | claude_model.with_structured_output(LLMResponse),
-        nav_chain = nav_prompt | claude_model.with_structured_output(LLMNavResponse),
-    )
+    llm_cache.mode = "off" # measure the models, not the cache
     print("Starting tests...")
     for i in range(5):
         llmtests(default_chains) # gpt4_model
@@ -0,0 +1,161 @@
+"""Response cache for the structured LLM calls.
+
+Parsed responses are kept in an in-memory LRU and, optionally, in an SQLite file that survives restarts
+and is shared by all processes on the host. Keys are derived from the model name, a hash of the prompt
+template and the normalized prompt inputs.
+
+Modes: "on" (read and write), "off", "record" (always call the model and store the result) and
+"replay" (never call the model; a miss raises `LLMCacheMiss`), so benchmarks and tests can run offline.
+"""
+import asyncio
+from collections import OrderedDict
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from typing import Any, Awaitable, Callable, Optional, Sequence, TypeVar
+
+from langchain_core.messages import BaseMessage
+from langchain_core.pydantic_v1 import BaseModel
+
+logger = logging.getLogger("ChatHAP")
+
+M = TypeVar("M", bound=BaseModel)
+
+CACHE_MODES = ("on", "off", "record", "replay")
+
+
+class LLMCacheMiss(LookupError):
+    """Raised in replay mode for a request that was never recorded."""
+
+
+def _normalize_text(text: str) -> str:
+    return " ".join(text.split())
+
+
+def normalize_messages(messages: Sequence[BaseMessage]) -> list[list[str]]:
+    """Messages as (type, content) pairs with whitespace collapsed, so formatting noise does not miss the cache."""
+    return [[message.type, _normalize_text(message.content if isinstance(message.content, str) else json.dumps(message.content))] for message in messages]
+
+
+def template_hash(template: Any) -> str:
+    """Hash of a prompt template, so changing the prompt invalidates its cached responses."""
+    return hashlib.sha256(repr(template).encode("utf-8")).hexdigest()
+
+
+def cache_key(model_name: str, template: Any, inputs: Any) -> str:
+    payload = json.dumps([model_name, template_hash(template), inputs], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache:
+    """Two-tier (memory LRU + optional SQLite) cache of parsed LLM responses with a TTL and size limits."""
+
+    def __init__(self, mode: str = "on", path: Optional[str] = None, max_entries: int = 512, max_rows: int = 10000, ttl: float = 7 * 24 * 3600):
+        if mode not in CACHE_MODES:
+            raise ValueError(f"Invalid LLM cache mode {mode!r}, expected one of {CACHE_MODES}")
+        self.mode = mode
+        self.max_entries = max_entries
+        self.max_rows = max_rows
+        self.ttl = ttl
+        self._memory: OrderedDict[str, tuple[float, BaseModel]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        self._db: Optional[sqlite3.Connection] = None
+        if path is not None and mode != "off":
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, type TEXT, value TEXT, created REAL)")
+            self._db.commit()
+
+    def _expired(self, created: float) -> bool:
+        return self.ttl > 0 and time.time() - created > self.ttl
+
+    def get(self, key: str, model: type[M]) -> Optional[M]:
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and isinstance(entry[1], model) and not self._expired(entry[0]):
+                self._memory.move_to_end(key)
+                return entry[1].copy(deep=True) # type: ignore
+            if entry is not None:
+                del self._memory[key]
+
+            if self._db is not None:
+                row = self._db.execute("SELECT type, value, created FROM responses WHERE key = ?", (key,)).fetchone()
+                if row is not None and row[0] == model.__name__ and not self._expired(row[2]):
+                    value = model.parse_raw(row[1])
+                    self._remember(key, row[2], value.copy(deep=True))
+                    return value
+        return None
+
+    def put(self, key: str, value: BaseModel) -> None:
+        created = time.time()
+        with self._lock:
+            self._remember(key, created, value.copy(deep=True)) # callers may modify their response
+            if self._db is not None:
+                self._db.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)", (key, type(value).__name__, value.json(), created))
+                self._prune()
+                self._db.commit()
+
+    def _remember(self, key: str, created: float, value: BaseModel) -> None:
+        self._memory[key] = (created, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _prune(self) -> None:
+        assert self._db is not None
+        if self.ttl > 0:
+            self._db.execute("DELETE FROM responses WHERE created < ?", (time.time() - self.ttl,))
+        self._db.execute("DELETE FROM responses WHERE key NOT IN (SELECT key FROM responses ORDER BY created DESC LIMIT ?)", (self.max_rows,))
+
+    def get_or_call(self, key: str, model: type[M], call: Callable[[], M]) -> M:
+        """Cached response for `key`, calling the model on a miss (depending on the mode)."""
+        if self.mode == "off":
+            return call()
+        if self.mode != "record":
+            cached = self.get(key, model)
+            if cached is not None:
+                self.hits += 1
+                return cached
+        self.misses += 1
+        if self.mode == "replay":
+            raise LLMCacheMiss(f"No recorded {model.__name__} for cache key {key}")
+
+        value = call()
+        if isinstance(value, model):
+            self.put(key, value)
+        return value
+
+    async def aget_or_call(self, key: str, model: type[M], call: Callable[[], Awaitable[M]]) -> M:
+        """`get_or_call` for an async model call; SQLite reads and writes run in a worker thread, not on the event loop."""
+        if self.mode == "off":
+            return await call()
+        if self.mode != "record":
+            cached = await self._off_loop(self.get, key, model)
+            if cached is not None:
+                self.hits += 1
+                return cached
+        self.misses += 1
+        if self.mode == "replay":
+            raise LLMCacheMiss(f"No recorded {model.__name__} for cache key {key}")
+
+        value = await call()
+        if isinstance(value, model):
+            await self._off_loop(self.put, key, value)
+        return value
+
+    async def _off_loop(self, function: Callable[..., Any], *args: Any) -> Any:
+        if self._db is None: # memory only, no disk access
+            return function(*args)
+        return await asyncio.to_thread(function, *args)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM responses")
+                self._db.commit()
@@ -0,0 +1,174 @@
+"""Process-wide gateway in front of the LLM chains.
+
+All sessions share one concurrency limit. Requests wait in a priority queue (interactive turns ahead of
+background evaluation), identical requests that are in flight at the same time are sent once
+(singleflight), and the limit adapts to rate limiting: it is halved on a 429 response and grows by
+about one per round of successful calls (AIMD). Runs on the shared event loop, see asyncloop.py.
+"""
+import asyncio
+from collections import deque
+from dataclasses import dataclass, field
+from enum import IntEnum
+import heapq
+import itertools
+import logging
+import random
+import time
+from typing import Any, Awaitable, Callable, Optional, TypeVar
+
+import numpy as np
+from langchain_core.pydantic_v1 import BaseModel
+
+logger = logging.getLogger("ChatHAP")
+
+T = TypeVar("T")
+
+
+class Priority(IntEnum):
+    INTERACTIVE = 0 # a user is waiting for the turn
+    BACKGROUND = 1 # evaluation runs, warm-up, ...
+
+
+def is_rate_limited(error: BaseException) -> bool:
+    """Whether `error` is a provider's 429 response (OpenAI and Anthropic clients raise `RateLimitError`)."""
+    status = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    return status == 429 or type(error).__name__ == "RateLimitError"
+
+
+class GatewayStats:
+    """Queue depth, wait times and how often requests were coalesced or rate limited."""
+
+    def __init__(self, window: int = 1000):
+        self.requests = 0
+        self.coalesced = 0
+        self.rate_limited = 0
+        self.max_queue_depth = 0
+        self.waits: deque[float] = deque(maxlen=window)
+
+    def wait_percentiles(self, *q: float) -> list[float]:
+        if not self.waits:
+            return [0.0] * len(q)
+        return np.percentile(np.fromiter(self.waits, dtype=np.float64), q).tolist()
+
+
+@dataclass
+class _Flight:
+    task: asyncio.Future
+    waiters: int = 0
+
+
+@dataclass(order=True)
+class _Waiter:
+    priority: int
+    seq: int
+    future: asyncio.Future = field(compare=False)
+
+
+class LLMGateway:
+    """Concurrency-limited, coalescing entry point for model calls (`submit`)."""
+
+    def __init__(self, max_concurrency: int = 8, min_concurrency: int = 1, max_retries: int = 3, backoff: float = 1.0, report_every: int = 100):
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.report_every = report_every
+        self.limit = float(max_concurrency)
+        self.in_flight = 0
+        self.stats = GatewayStats()
+        self._queue: list[_Waiter] = []
+        self._seq = itertools.count()
+        self._flights: dict[str, _Flight] = {}
+
+    @property
+    def queue_depth(self) -> int:
+        return sum(not waiter.future.done() for waiter in self._queue)
+
+    async def submit(self, key: Optional[str], call: Callable[[], Awaitable[T]], priority: Priority = Priority.INTERACTIVE) -> T:
+        """Result of `call()`, sharing one in-flight call among all requests with the same `key` (None never coalesces)."""
+        self.stats.requests += 1
+        if self.report_every and self.stats.requests % self.report_every == 0:
+            logger.info(self.report())
+
+        flight = self._flights.get(key) if key is not None else None
+        if flight is not None:
+            self.stats.coalesced += 1
+            result = await self._join(flight)
+            return result.copy(deep=True) if isinstance(result, BaseModel) else result # callers may modify their response
+
+        flight = _Flight(asyncio.ensure_future(self._run(call, priority)))
+        if key is not None:
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda _: self._flights.pop(key) if self._flights.get(key) is flight else None)
+        return await self._join(flight)
+
+    async def _join(self, flight: _Flight) -> Any:
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                flight.task.cancel() # nobody waits for the result anymore
+
+    async def _run(self, call: Callable[[], Awaitable[T]], priority: Priority) -> T:
+        for attempt in itertools.count():
+            await self._acquire(priority)
+            try:
+                result = await call()
+            except Exception as e:
+                if not is_rate_limited(e):
+                    raise
+                self._decrease()
+                if attempt >= self.max_retries:
+                    raise
+                logger.warning(f"Rate limited, concurrency limit now {self.limit:.1f}, retrying ({attempt + 1}/{self.max_retries})")
+            else:
+                self._increase()
+                return result
+            finally:
+                self._release()
+            await asyncio.sleep(self.backoff * 2**attempt * random.uniform(0.5, 1.5))
+        raise AssertionError("unreachable")
+
+    # --- admission ---
+
+    async def _acquire(self, priority: Priority) -> None:
+        start = time.perf_counter()
+        if self.in_flight < int(self.limit) and not self.queue_depth:
+            self.in_flight += 1
+        else:
+            waiter = _Waiter(priority, next(self._seq), asyncio.get_running_loop().create_future())
+            heapq.heappush(self._queue, waiter)
+            self.stats.max_queue_depth = max(self.stats.max_queue_depth, self.queue_depth)
+            try:
+                await waiter.future # the slot is handed over by _dispatch
+            except asyncio.CancelledError:
+                if waiter.future.done() and not waiter.future.cancelled():
+                    self._release() # cancelled right after getting a slot
+                raise
+        self.stats.waits.append(time.perf_counter() - start)
+
+    def _release(self) -> None:
+        self.in_flight -= 1
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        while self._queue and self.in_flight < int(self.limit):
+            waiter = heapq.heappop(self._queue)
+            if not waiter.future.done():
+                self.in_flight += 1
+                waiter.future.set_result(None)
+
+    def _increase(self) -> None:
+        self.limit = min(self.max_concurrency, self.limit + 1 / self.limit)
+        self._dispatch()
+
+    def _decrease(self) -> None:
+        self.stats.rate_limited += 1
+        self.limit = max(self.min_concurrency, self.limit / 2)
+
+    def report(self) -> str:
+        p50, p95 = self.stats.wait_percentiles(50, 95)
+        return (f"LLM gateway: {self.in_flight} in flight (limit {self.limit:.1f}), queue depth {self.queue_depth} (max {self.stats.max_queue_depth}), "
+                f"wait p50 {p50 * 1e3:.0f}ms p95 {p95 * 1e3:.0f}ms, {self.stats.coalesced}/{self.stats.requests} coalesced, {self.stats.rate_limited} rate limited")
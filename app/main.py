@@ -1,4 +1,5 @@
 from enum import Enum
+from functools import partial
 import io
 from pathlib import Path
 import sys
@@ -20,6 +21,7 @@ from dotenv import load_dotenv
 import logging
 import json
 import wave
+from typing import Iterable
 from langchain_openai import ChatOpenAI
 from langchain_core.messages import HumanMessage, SystemMessage, AIMessage, BaseMessage
 import tiktoken
@@ -43,10 +45,15 @@ sys.path.append(os.path.dirname(SCRIPT_DIR))
 
 
 from .appmode import AppMode, CH_APP_MODE, CH_DISABLE_OPENAI
-from .genSignal import GenSignalInput, genSignal_direct, SAMPLE_RATE, GAIN
+from .genSignal import GenSignalInput, genSignal_cached, SAMPLE_RATE, GAIN
+from .exportSignal import iter_chunks, write_wav
 from .vizSignal import visSignal_st
-from .langinterface import GenerationApproach, NavigationApproach, ModifyApproach, chat_chatgpt
-from .navsignal import navSignal, modifySignal
+from .timebase import TimeBase
+from .langinterface import GenerationApproach, NavigationApproach, ModifyApproach
+from .intentrouter import intent_router
+from .contextwindow import ContextWindow
+from .navsignal import anavSignal, modifySignal
+from .turnengine import TurnEngine
 from .globalVariable import *
 from .firebase_users import *
 from .sidebar import sidebar
@@ -88,13 +95,38 @@ def activateDAQ(data, dur):
                     task.out_stream,
                     auto_start=True # type: ignore
                 )
-                test_writer.write_many_sample(data)
+                test_writer.write_many_sample(np.ascontiguousarray(data, dtype=np.float64)) # nidaqmx only accepts float64
                 task.wait_until_done(timeout=1000)
             ###################################
             logger.debug("Vibration was successfully played.")
     else:
         logger.warning("Data is empty. Cannot play vibration.")
 
+def activateDAQ_stream(chunks: Iterable[NDArray[np.float64]], num_samples: int):
+    """Play a signal chunk by chunk, e.g. from genSignal_stream, without materializing it."""
+    if num_samples > 0:
+        if CH_APP_MODE == AppMode.DEBUG:
+            logger.debug("skipping vibration playback (CH_APP_MODE==AppMode.DEBUG).")
+        else:
+            with nidaqmx.Task() as task:
+                ch = task.ao_channels.add_ao_voltage_chan("Dev2/ao0")
+                task.timing.cfg_samp_clk_timing(SAMPLE_RATE, sample_mode=nidaqmx.constants.AcquisitionType.FINITE, samps_per_chan=num_samples)
+                task.out_stream.regen_mode = nidaqmx.constants.RegenerationMode.DONT_ALLOW_REGENERATION
+                stream_writer = nidaqmx.stream_writers.AnalogSingleChannelWriter(
+                    task.out_stream,
+                    auto_start=False # type: ignore
+                )
+                started = False
+                for chunk in chunks:
+                    stream_writer.write_many_sample(np.ascontiguousarray(chunk, dtype=np.float64), timeout=1000)
+                    if not started:
+                        task.start()
+                        started = True
+                task.wait_until_done(timeout=1000)
+            logger.debug("Vibration was successfully played.")
+    else:
+        logger.warning("Data is empty. Cannot play vibration.")
+
 
 
 initialize_firebase_users()
@@ -133,12 +165,28 @@ class Vote(Enum):
     THUMBS_UP = "👍"
     THUMBS_DOWN = "👎"
 
+def vote_rating(vote: str) -> int:
+    if vote == Vote.THUMBS_UP.value:
+        return 1
+    elif vote == Vote.THUMBS_DOWN.value:
+        return -1
+    else:
+        return 0
+
+def vibration_provenance(msg) -> str:
+    """Where the vibration of a parameter, feature or modify message came from, for the conversation summary."""
+    if msg["role"] == "parameter":
+        return "the last generated vibration"
+    if msg["role"] == "feature":
+        return f"the library vibration {msg['resource']}, found by navigation"
+    return f"the previous vibration modified with {msg['approach'].json(exclude_none=True)}"
+
 handleMessage = "Please explain more details of vibrations in different ways."
 conversation_history = []
 parameter_history = []
 feature_history = []
 current_signal: list[np.ndarray] = []
-current_t: list[np.ndarray] = []
+current_t: list[TimeBase] = []
 current_resource = []
 
 # delete_data("4ab79e56-33cf-485e-ba4a-eae836ccd6fa")
@@ -164,9 +212,7 @@ for i, msg in enumerate(st.session_state["messages"]):
         if msg["role"] == "parameter":
             generation_parameters: GenSignalInput = msg["content"]
             parameter_history.append({"role": "parameter", "content": generation_parameters, "time": str(datetime.now())})
-            signal, t, duration = genSignal_direct(generation_parameters) # type: ignore
-
-            t = np.array([t])
+            signal, t, duration = genSignal_cached(generation_parameters) # type: ignore
 
             # csv_signal_params = pd.DataFrame({"Amplitude": [parameter_list[0]], "Amplitude Variation1": [parameter_list[1]], "Amplitude Variation2": [parameter_list[2]], "Frequency": [parameter_list[3]], "Duration": [parameter_list[4]], "The number of pulses": [parameter_list[5]]})
             csv_signal_params = pd.DataFrame({
@@ -185,8 +231,8 @@ for i, msg in enumerate(st.session_state["messages"]):
 
         # Approach: NAVIAGATION
         if msg["role"] == "feature":
-            signal = np.array([np.array(msg["signal"])])
-            t = np.array([np.array(msg["t"])])
+            signal = np.asarray(msg["signal"])[np.newaxis]
+            t = msg["t"]
 
             duration = msg["duration"]
 
@@ -198,8 +244,8 @@ for i, msg in enumerate(st.session_state["messages"]):
 
         # Approach: MODIFY
         if msg["role"] == "modify":
-            signal = np.array([np.array(msg["signal"])])
-            t = np.array([np.array(msg["t"])])
+            signal = np.asarray(msg["signal"])[np.newaxis]
+            t = msg["t"]
 
             duration = msg["duration"]
 
@@ -216,10 +262,20 @@ for i, msg in enumerate(st.session_state["messages"]):
         with bc1:
             key_button = f"Button{st.session_state.key_counter}"
             if st.button("  Play   Vibration", key = key_button+"_play", use_container_width=True):
-                activateDAQ(signal, duration)
+                if msg["role"] == "parameter": # already synthesized (genSignal_cached), stream the cached array
+                    activateDAQ_stream(iter_chunks(signal), signal.size)
+                else:
+                    activateDAQ(signal, duration)
 
                 st.write("Vibration activated.")
 
+        with bc2:
+            # the WAV is only encoded when asked for, not on every rerun
+            if st.button("Export WAV", key=key_button+"_export", use_container_width=True):
+                wav = io.BytesIO()
+                write_wav(wav, iter_chunks(signal))
+                st.download_button("Download WAV", wav.getvalue(), f"vibration_{st.session_state.key_counter}.wav", mime="audio/wav", key=key_button+"_wav", use_container_width=True)
+
 
         # with bc2:
         #     if st.download_button("Download Parameters", csv_signal_params, f"vibration_{st.session_state.key_counter}.csv", use_container_width=True):
@@ -265,23 +321,16 @@ for i, msg in enumerate(st.session_state["messages"]):
                 st.session_state.vote_clicked += 1
                 logger.debug(f"Clicked: {st.session_state.vote_clicked}")
                 st.session_state.processing = True
+                # persist only the rating that changed, instead of rewriting every rating on each rerun
+                update_rating(st.session_state["user_id"], f'vibration_{key_counter}', {"rating": vote_rating(msg["vote"])})
 
             st.radio("Rate this vibration", options, key=key_button+"_rate", horizontal=True, index=radio_index, on_change=on_change_vote, args=(msg, key_button, st.session_state.key_counter, st.session_state.vote_clicked))
 
-            temp_rating = 0
-            if curr_vote == "👍":
-                temp_rating = 1
-            elif curr_vote == "👎":
-                temp_rating = -1
-            else:
-                temp_rating = 0
-
-            content_rating = {"rating": temp_rating}
-            update_rating(st.session_state["user_id"], f'vibration_{st.session_state.key_counter}', content_rating)
+            temp_rating = vote_rating(curr_vote)
 
             if i == len(st.session_state["messages"]) - 1 and st.session_state["processing"] == True:
                 with st.spinner("Updating Rating..."):
-                    update_vibration_rating(st.session_state["user_id"], msg["role"], f'vibration_{st.session_state.key_counter}', st.session_state.vote_clicked, temp_rating)
+                    update_vibration_rating(st.session_state["user_id"], msg["role"], f'vibration_{st.session_state.key_counter}', st.session_state.vote_clicked, temp_rating, msg.get("record"))
                     st.session_state["processing"] = False
 
         with bc5:
@@ -325,7 +374,12 @@ if prompt := st.chat_input():
             conversation_history_langchain.append(SystemMessage(content=message["content"]))
 
     with st.spinner("Thinking..."):
-        msg = chat_chatgpt(conversation_history_langchain)
+        context_window: ContextWindow = st.session_state.setdefault("context_window", ContextWindow())
+        turn_engine: TurnEngine = st.session_state.setdefault("turn_engine", TurnEngine())
+        last_parameters = parameter_history[-1]["content"] if parameter_history else None
+        vibrations = [m for m in st.session_state.messages if m["role"] in ("parameter", "feature", "modify")]
+        current_vibration = vibration_provenance(vibrations[-1]) if vibrations else None
+        msg = intent_router.respond(prompt, len(current_signal) > 0, lambda: turn_engine.run(turn_engine.respond(context_window.build(conversation_history_langchain, last_parameters, current_vibration))))
 
         msg_content = msg.response_msg
 
@@ -385,21 +439,19 @@ if prompt := st.chat_input():
                 change_list_string = []
 
             # Create vibrations
-            signal, t, duration = genSignal_direct(gen_params)
+            signal, t, duration = genSignal_cached(gen_params)
             parameter_history.append({"role": "parameter", "content": gen_params, "time": str(datetime.now())})
 
             parameter_list = [gen_params.A, gen_params.A_W_option, gen_params.A_E_option, gen_params.freq_c, gen_params.freq_e, gen_params.dur, gen_params.rhythm]
             parameter_list_string = '-'.join(map(lambda x: str(x).replace('.', '_'), parameter_list))
             content = {"approach": "parameter", "change": f"{change_list_string}", "resource": parameter_list_string, "time": current_time}
 
-            update_signal_data(user_id, content, signal, t, st.session_state.key_counter)
-
-            # Visualization
-            plot = visSignal_st(signal, t)
+            # Visualization (rendered while the signal is persisted)
+            plot = turn_engine.run(turn_engine.render_and_persist(partial(visSignal_st, signal, t), partial(update_signal_data, user_id, content, signal, t, st.session_state.key_counter)))
             if plot:
                 caption = f"Plot{st.session_state.plot_counter}"
                 st.session_state.messages.append({"role": "image", "content": plot, "caption": caption})
-                st.session_state.messages.append({"role": "parameter", "content": gen_params})
+                st.session_state.messages.append({"role": "parameter", "content": gen_params, "record": content})
             else:
                 logger.warning("No parameter list found in response")
 
@@ -407,7 +459,7 @@ if prompt := st.chat_input():
             logger.debug("Approach: NAVIGATION")
 
             signal_list: list[np.ndarray] = []
-            t_list: list[np.ndarray] = []
+            t_list: list[TimeBase] = []
             duration_list: list[float] = []
             resourceLists: list[str] = []
             featureLists: list[str] = []
@@ -418,7 +470,7 @@ if prompt := st.chat_input():
             with st.spinner("Querying signal database..."):
                 # signal_list, t_list, duration_list, resourceLists, featureLists, nav_reason = navSignal(msg.approach)
                 try:
-                    result = navSignal(msg.approach)
+                    result = turn_engine.run(anavSignal(msg.approach))
                     if result is None:
                         logger.error("navSignal returned None, no resources were found.")
                         st.session_state.messages.append({"role": "assistant", "content": handleMessage})
@@ -450,15 +502,13 @@ if prompt := st.chat_input():
 
                 feature_importance_pairs = [{"feature": feature, "importance": importance} for feature, importance in zip(featureLists, importanceLists)]
                 content = {"approach": "navigation", "feature": featureLists, "feature_importance": feature_importance_pairs, "resource": resourceLists[i], "duration": duration_list[i], "time": current_time}
-                update_signal_data(user_id, content, signal_list[i], t_list[i], st.session_state.key_counter)
-
-                # Visualization
-                plot = visSignal_st(np.array([signal_list[i]]), t_list[i])
+                # Visualization (rendered while the signal is persisted)
+                plot = turn_engine.run(turn_engine.render_and_persist(partial(visSignal_st, np.array([signal_list[i]]), t_list[i]), partial(update_signal_data, user_id, content, signal_list[i], t_list[i], st.session_state.key_counter)))
                 if plot:
                     caption = f"Plot{st.session_state.plot_counter}"
                     st.session_state.messages.append({"role": "assistant", "content": nav_reason})
                     st.session_state.messages.append({"role": "image", "content": plot, "resource": caption})
-                    st.session_state.messages.append({"role": "feature", "featureList": featureLists, "resource": resourceLists[i], "signal": signal_list[i], "t": t_list[i], "duration": duration_list[i]})
+                    st.session_state.messages.append({"role": "feature", "featureList": featureLists, "resource": resourceLists[i], "signal": signal_list[i], "t": t_list[i], "duration": duration_list[i], "record": content})
 
                     if user_id:
                         update_conversation(user_id, {"role": "assistant", "content": nav_reason, "vibration": f'vibration_{st.session_state.key_counter}', "time": current_time})
@@ -466,17 +516,15 @@ if prompt := st.chat_input():
                         logger.error("user_id is not defined in session state")
         elif isinstance(msg.approach, ModifyApproach):
             if len(current_signal) > 0:
-                signal, t, duration = modifySignal(msg.approach, current_signal[-1][0], current_t[-1][0])
+                signal, t, duration = modifySignal(msg.approach, current_signal[-1][0], current_t[-1])
 
                 content = {**msg.approach.dict(), "approach": "modify", "time": current_time}
-                update_signal_data(user_id, content, signal, t, st.session_state.key_counter)
-
-                # Visualization
-                plot = visSignal_st(np.array([signal]), t)
+                # Visualization (rendered while the signal is persisted)
+                plot = turn_engine.run(turn_engine.render_and_persist(partial(visSignal_st, np.array([signal]), t), partial(update_signal_data, user_id, content, signal, t, st.session_state.key_counter)))
                 if plot:
                     caption = f"Plot{st.session_state.plot_counter}"
                     st.session_state.messages.append({"role": "image", "content": plot, "caption": caption})
-                    st.session_state.messages.append({"role": "modify", "signal": signal, "t": t, "duration": duration, "approach": msg.approach})
+                    st.session_state.messages.append({"role": "modify", "signal": signal, "t": t, "duration": duration, "approach": msg.approach, "record": content})
                 else:
                     logger.warning("Failed to modify signal.")
 
@@ -1,14 +1,18 @@
+import asyncio
 import json
 import logging
-import random
 import math
 
 import numpy as np
 import numpy.typing as npt
 from scipy.signal import resample
 
-from .langinterface import NavigationApproach, ModifyApproach, nav_chatgpt, BaseMessage
+from .langinterface import LLMNavResponse, NavigationApproach, ModifyApproach, anav_chatgpt, nav_candidates, nav_chatgpt, nav_prompt_prefix, prompt_prefix_hash, BaseMessage
 from .genSignal import GAIN, GenSignalInput
+from .timebase import TimeBase
+from .tagindex import TagIndex
+from .tagprompt import CompactTagList
+from .viblib import LazyVibLibrary
 from .firebase_users import *
 from .globalVariable import *
 
@@ -19,24 +23,42 @@ with open("./data/VibViz_tags.json", "r") as json_file:
 tag_examples = json.dumps(tag_examples)
 
 with open("./data/VibLib-VibViz-processed.json", "r") as json_file:
-    tag_files = json.load(json_file)
-    random.shuffle(tag_files)
+    tag_files = json.load(json_file) # kept in file order, so the navigation prompt prefix is stable
 
-with open("./data/VibViz_files.json", "r") as json_file:
-    signal_files = json.load(json_file)
+tag_index = TagIndex(tag_files)
+# the whole library in file order: the navigation prompt prefix is the same for every query and can be cached
+tag_lists = CompactTagList(tag_files, tag_ids=NAV_TAG_VOCABULARY)
+logger.debug(f"Navigation prompt prefix: {prompt_prefix_hash(nav_prompt_prefix(tag_lists.text))}")
 
-def navSignal(nav_approach: NavigationApproach) -> tuple[list[npt.NDArray[np.float64]], list[npt.NDArray[np.float64]], list[float], list[str], list[str], list[float], str]:
-    random.shuffle(tag_files)
-    tag_lists = tag_files
-    response = nav_chatgpt(nav_approach.natural_language_search_query, tag_lists)
+signal_files = LazyVibLibrary("./data/VibViz_files.bin", legacy_json_path="./data/VibViz_files.json", max_bytes=LIBRARY_CACHE_BYTES, dtype=SIGNAL_DTYPE)
 
+NavResult = tuple[list[npt.NDArray[np.floating]], list[TimeBase], list[float], list[str], list[str], list[float], str]
+
+def navSignal(nav_approach: NavigationApproach) -> NavResult:
+    query = nav_approach.natural_language_search_query
+    response = nav_chatgpt(query, tag_lists.text, candidates=_nav_candidates(query))
+    return _nav_select(response, tag_lists)
+
+async def anavSignal(nav_approach: NavigationApproach) -> NavResult:
+    """`navSignal` awaiting the navigation model; the selection (votes, library reads) runs in a worker thread."""
+    query = nav_approach.natural_language_search_query
+    response = await anav_chatgpt(query, tag_lists.text, candidates=_nav_candidates(query))
+    return await asyncio.to_thread(_nav_select, response, tag_lists)
+
+def _nav_candidates(query: str) -> str:
+    """The ids of the NAV_TOP_K entries the local tag index matches best, in library order (none for 0)."""
+    if NAV_TOP_K <= 0:
+        return ""
+    return nav_candidates(sorted(tag_index.search(query, NAV_TOP_K)))
+
+def _nav_select(response: LLMNavResponse, tag_lists: CompactTagList) -> NavResult:
     logging.debug(f"Response: {response}")
 
     if not response.resources or not response.features:
         logger.error("No resources or features available in the response.")
         return None # type: ignore
 
-    resourceLists = [r.resource for r in response.resources]
+    resourceLists = [tag_lists.resource(r.resource) for r in response.resources]
     reasonLists = [r.reason for r in response.resources]
     featureLists = [f.feature for f in response.features]
     importanceLists = [f.importance for f in response.features]
@@ -52,19 +74,18 @@ def navSignal(nav_approach: NavigationApproach) -> tuple[list[npt.NDArray[np.flo
     logger.debug(f"resource_index: {resource_index}")
     corresponding_reason = reasonLists[resource_index]
 
-    signal_list = 0.5 * GAIN * np.array(signal_files[selected_resource]["data"])
-    t_list = np.linspace(0, signal_files[selected_resource]["duration"], int(signal_files[selected_resource]["num_frames"]), endpoint=False)
-    duration_list = signal_files[selected_resource]["duration"]
+    signal_list = 0.5 * GAIN * signal_files[selected_resource]
+    t_list = TimeBase.spanning(signal_files.duration(selected_resource), signal_files.num_frames(selected_resource))
+    duration_list = signal_files.duration(selected_resource)
 
     logging.debug(f"Signal length: {len(signal_list)}, t length: {len(t_list)}, duration: {duration_list}")
 
     return [signal_list], [t_list], [duration_list], resourceLists, featureLists, importanceLists, corresponding_reason
 
-def modifySignal(msg_modify: ModifyApproach, signal: npt.NDArray[np.float64], t: npt.NDArray[np.float64]) -> tuple[npt.NDArray[np.float64], npt.NDArray[np.float64], float]:
+def modifySignal(msg_modify: ModifyApproach, signal: npt.NDArray[np.floating], t: TimeBase) -> tuple[npt.NDArray[np.floating], TimeBase, float]:
     logger.debug(f"msg_modify: {msg_modify}")
 
     new_signal: np.ndarray = np.array([])
-    new_t: np.ndarray = np.array([])
 
     new_signal = signal
     new_t = t
@@ -73,23 +94,25 @@ def modifySignal(msg_modify: ModifyApproach, signal: npt.NDArray[np.float64], t:
         new_signal = np.array(new_signal) * msg_modify.change_amplitude_factor
     if msg_modify.time_stretch_factor:
         new_length = int(len(new_signal) * msg_modify.time_stretch_factor)
-        new_duration = new_t[-1] * msg_modify.time_stretch_factor
+        new_duration = new_t.end * msg_modify.time_stretch_factor
         new_signal = resample(new_signal, new_length) # type: ignore
-        new_t = np.linspace(0, new_duration, new_length, endpoint=False)
+        new_t = TimeBase.spanning(new_duration, new_length)
     if msg_modify.truncate_or_extend_signal_factor:
         if msg_modify.truncate_or_extend_signal_factor > 1.0: # Extend by looping
             new_length = int(len(new_t) * msg_modify.truncate_or_extend_signal_factor)
             new_signal = np.tile(new_signal, int(math.ceil(msg_modify.truncate_or_extend_signal_factor)))[0:new_length]
-            new_duration = new_t[-1] * msg_modify.truncate_or_extend_signal_factor
-            new_t = np.linspace(0, new_duration, new_length, endpoint=False) # type: ignore
+            new_duration = new_t.end * msg_modify.truncate_or_extend_signal_factor
+            new_t = TimeBase.spanning(new_duration, new_length)
         else: # Truncate
             new_length = int(len(new_t) * msg_modify.truncate_or_extend_signal_factor)
             new_signal = new_signal[:new_length]
-            new_t = new_t[:new_length]
+            new_t = new_t.head(new_length)
     if msg_modify.reverse_signal:
         new_signal = np.flip(new_signal)
 
     if np.abs(np.max(new_signal)) > GAIN:
         new_signal = new_signal * GAIN / np.abs(np.max(new_signal))
 
-    return new_signal, new_t, new_t[-1]
\ No newline at end of file
+    new_signal = np.asarray(new_signal, dtype=SIGNAL_DTYPE)
+
+    return new_signal, new_t, float(new_t.end)
\ No newline at end of file
@@ -0,0 +1,183 @@
+import logging
+import threading
+import time
+from typing import Any, Optional
+
+import numpy as np
+import numpy.typing as npt
+
+from .utilities import replace_invalid_chars
+
+logger = logging.getLogger("ChatHAP")
+
+_COUNTERS = ("THUMBS_UP", "THUMBS_DOWN")
+
+
+def preference_scores(up: npt.NDArray, down: npt.NDArray, feature_present: npt.NDArray[np.bool_], weights: npt.NDArray, min_clip: float) -> npt.NDArray[np.float64]:
+    """Weighted preference score of every resource (column) over the queried features (rows).
+
+    Per feature the vote ratio THUMBS_UP / total is clipped to `min_clip` for resources without any
+    down votes, and turned into a softmax over the resources. Features without votes score zero.
+    """
+    total = up + down
+    p_org = np.divide(up, total, out=np.zeros(total.shape), where=total > 0)
+    p_clip = np.where((down == 0) & (total > 0), min_clip, p_org)
+    p_soft = np.exp(p_clip)
+    p_soft /= p_soft.sum(axis=1, keepdims=True)
+    p_soft[~feature_present] = 0
+    return weights @ p_soft
+
+
+class PreferenceMatrix:
+    """Process-wide copy of a `vote-feature_{DB}` tree as feature × resource vote count matrices.
+
+    Rows and columns are indexed by the stored (already sanitized) keys. The copy is kept current
+    with a database listener; without one it is reloaded every `refresh_interval` seconds.
+    """
+
+    def __init__(self, path: str, refresh_interval: float = 60.0):
+        self.path = path
+        self.refresh_interval = refresh_interval
+        self._reset()
+        self._lock = threading.RLock()
+        self._ensure_lock = threading.Lock() # concurrent first callers wait for one load
+        self._loaded = threading.Event()
+        self._listener = None
+        self._last_refresh = 0.0
+
+    # --- keeping the copy current ---
+
+    def start(self, db, timeout: float = 10.0) -> None:
+        """Subscribe to changes below `path` and wait for the initial snapshot."""
+        reference = db.reference(self.path)
+        if self._listener is None:
+            try:
+                self._listener = reference.listen(self._on_event)
+            except Exception:
+                logger.warning(f"Cannot listen to {self.path}, refreshing every {self.refresh_interval}s instead", exc_info=True)
+        if not self._loaded.wait(timeout if self._listener is not None else 0):
+            self.refresh(reference)
+
+    def ensure_current(self, db) -> None:
+        with self._ensure_lock:
+            if not self._loaded.is_set():
+                self.start(db)
+            elif self._listener is None and time.monotonic() - self._last_refresh > self.refresh_interval:
+                self.refresh(db.reference(self.path))
+
+    def refresh(self, reference) -> None:
+        self.load(reference.get())
+
+    def close(self) -> None:
+        if self._listener is not None:
+            self._listener.close()
+            self._listener = None
+
+    def _on_event(self, event) -> None:
+        try:
+            self.apply(event.event_type, event.path, event.data)
+        except Exception:
+            logger.exception(f"Failed to apply {event.event_type} event at {self.path}{event.path}")
+
+    def load(self, data: Optional[dict]) -> None:
+        """Replace the copy with a full snapshot of the tree."""
+        with self._lock:
+            self._reset()
+            self._put([], data)
+            self._last_refresh = time.monotonic()
+        self._loaded.set()
+
+    def apply(self, event_type: str, path: str, data: Any) -> None:
+        """Apply a listener event (`put` replaces the node at `path`, `patch` replaces its given children)."""
+        keys = [key for key in path.split("/") if key]
+        if not keys and event_type == "put":
+            self.load(data)
+            return
+        with self._lock:
+            if event_type == "patch":
+                for child, value in (data or {}).items():
+                    self._put(keys + [key for key in child.split("/") if key], value)
+            else:
+                self._put(keys, data)
+
+    def _put(self, keys: list[str], value: Any) -> None:
+        if not keys:
+            for feature, resources in (value or {}).items():
+                self._put([feature], resources)
+        elif len(keys) == 1:
+            row = self._feature_index(keys[0])
+            self.up[row] = 0
+            self.down[row] = 0
+            self.feature_present[row] = isinstance(value, dict)
+            for resource, counts in (value or {}).items():
+                self._put(keys + [resource], counts)
+        elif len(keys) == 2:
+            counts = value if isinstance(value, dict) else {}
+            for counter in _COUNTERS:
+                self._put(keys + [counter], counts.get(counter, 0))
+        elif len(keys) == 3 and keys[2] in _COUNTERS:
+            row, col = self._feature_index(keys[0]), self._resource_index(keys[1])
+            self.feature_present[row] = True
+            counts = self.up if keys[2] == "THUMBS_UP" else self.down
+            counts[row, col] = value or 0
+
+    def _reset(self) -> None:
+        self.features: dict[str, int] = {}
+        self.resources: dict[str, int] = {}
+        # one spare row and column, so unknown keys (index -1) can be looked up and masked out
+        self.up = np.zeros((1, 1), dtype=np.int64)
+        self.down = np.zeros((1, 1), dtype=np.int64)
+        self.feature_present = np.zeros(1, dtype=bool)
+
+    def _feature_index(self, feature: str) -> int:
+        if feature not in self.features:
+            self.features[feature] = len(self.features)
+            self._grow()
+        return self.features[feature]
+
+    def _resource_index(self, resource: str) -> int:
+        if resource not in self.resources:
+            self.resources[resource] = len(self.resources)
+            self._grow()
+        return self.resources[resource]
+
+    def _grow(self) -> None:
+        rows, cols = len(self.features) + 1, len(self.resources) + 1
+        if rows > self.up.shape[0] or cols > self.up.shape[1]:
+            # grow geometrically so that adding keys one by one stays cheap
+            shape = (max(rows, 2 * self.up.shape[0]), max(cols, 2 * self.up.shape[1]))
+            pad = ((0, shape[0] - self.up.shape[0]), (0, shape[1] - self.up.shape[1]))
+            self.up = np.pad(self.up, pad)
+            self.down = np.pad(self.down, pad)
+            self.feature_present = np.pad(self.feature_present, (0, shape[0] - len(self.feature_present)))
+
+    # --- scoring ---
+
+    def counts(self, featureLists: list[str], resourceLists: list[str]) -> tuple[npt.NDArray, npt.NDArray, npt.NDArray[np.bool_]]:
+        """Vote counts of the given features × resources, and which features have votes at all."""
+        with self._lock:
+            rows = np.array([self.features.get(replace_invalid_chars(f), -1) for f in featureLists], dtype=np.int64)
+            cols = np.array([self.resources.get(replace_invalid_chars(r), -1) for r in resourceLists], dtype=np.int64)
+            known = (rows[:, None] >= 0) & (cols[None, :] >= 0)
+            up = np.where(known, self.up[rows[:, None], cols[None, :]], 0)
+            down = np.where(known, self.down[rows[:, None], cols[None, :]], 0)
+            present = (rows >= 0) & self.feature_present[rows]
+        return up, down, present
+
+    def resource_probabilities(self, resourceLists: list[str], featureLists: list[str], importanceLists: Optional[list[float]] = None, min_clip: float = 0.01) -> dict[str, float]:
+        """Selection probability of every resource given the queried features and their importances."""
+        importance = dict(zip(featureLists, importanceLists)) if importanceLists is not None else {}
+        weights = np.array([importance.get(f, 1) for f in featureLists], dtype=np.float64)
+        up, down, present = self.counts(featureLists, resourceLists)
+
+        scores: dict[str, float] = dict.fromkeys(resourceLists, 0.0)
+        if featureLists and resourceLists:
+            for resource, score in zip(resourceLists, preference_scores(up, down, present, weights, min_clip)):
+                scores[resource] += score
+
+        total_score = sum(scores.values())
+        if not scores:
+            return {}
+        if total_score > 0:
+            return {resource: score / total_score for resource, score in scores.items()}
+        return {resource: 1 / len(scores) for resource in scores}
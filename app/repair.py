@@ -0,0 +1,234 @@
+"""Repair of structured model outputs that fail validation.
+
+The chains ask for the raw model output next to the parsed one. If parsing failed, the arguments are
+first coerced locally: numbers are clamped into their `ge`/`le` bounds, a missing or misspelled
+discriminator is filled in and enum values are matched fuzzily. Only if that does not validate, the
+model is sent a short correction prompt with just the invalid output and the error, not the whole
+conversation again.
+"""
+import difflib
+from enum import Enum
+import json
+import logging
+import re
+import threading
+from typing import Any, Literal, Optional, get_args, get_origin
+
+from langchain_core.exceptions import OutputParserException
+from langchain_core.messages import AIMessage
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.pydantic_v1 import BaseModel, ValidationError
+from langchain_core.runnables import Runnable, RunnableLambda
+
+logger = logging.getLogger("ChatHAP")
+
+correction_prompt = ChatPromptTemplate.from_messages(
+    [
+        ("system", "Your previous answer did not match the required schema. Answer again with the same content, changing only what the error requires."),
+        ("human", "Previous answer:\n{output}\n\nError:\n{error}"),
+    ]
+)
+
+
+def _key(text: str) -> str:
+    return re.sub(r"[^a-z0-9]", "", text.lower())
+
+
+def match_choice(value: str, choices: list[str]) -> Optional[str]:
+    """The choice `value` most likely means (ignoring case and punctuation), None if none is close."""
+    keys = {_key(choice): choice for choice in choices}
+    key = _key(value)
+    if key in keys:
+        return keys[key]
+    prefixed = [choice for k, choice in keys.items() if key and k.startswith(key)]
+    if len(prefixed) == 1: # "Modify" -> "ModifyApproach"
+        return prefixed[0]
+    close = difflib.get_close_matches(key, list(keys), n=1, cutoff=0.6)
+    return keys[close[0]] if close else None
+
+
+def coerce(data: Any, model: type[BaseModel]) -> Any:
+    """`data` with the local repairs applied to the fields of `model` (recursively)."""
+    if not isinstance(data, dict):
+        return data
+    data = dict(data)
+    for name, field in model.__fields__.items():
+        if data.get(name) is not None:
+            data[name] = _coerce_field(data[name], field)
+    return data
+
+
+def _coerce_field(value: Any, field) -> Any:
+    if isinstance(value, list) and field.sub_fields and field.discriminator_key is None:
+        return [_coerce_field(item, field.sub_fields[0]) for item in value]
+    if field.discriminator_key is not None and field.sub_fields_mapping:
+        return _coerce_union(value, field)
+
+    kind = field.type_
+    if get_origin(kind) is Literal and isinstance(value, str):
+        return match_choice(value, [str(arg) for arg in get_args(kind)]) or value
+    if not isinstance(kind, type):
+        return value
+    if issubclass(kind, BaseModel):
+        return coerce(value, kind)
+    if issubclass(kind, Enum) and isinstance(value, str):
+        members = {member.value: member.value for member in kind} | {member.name: member.value for member in kind}
+        choice = match_choice(value, list(members))
+        return members[choice] if choice is not None else value
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        if field.field_info.ge is not None:
+            value = max(value, field.field_info.ge)
+        if field.field_info.le is not None:
+            value = min(value, field.field_info.le)
+        if issubclass(kind, int):
+            value = int(round(value))
+    return value
+
+
+def _coerce_union(value: Any, field) -> Any:
+    if not isinstance(value, dict):
+        return value
+    key, mapping = field.discriminator_key, field.sub_fields_mapping
+    tag = value.get(key)
+    if isinstance(tag, str):
+        tag = match_choice(tag, list(mapping))
+    if tag is None: # infer the discriminator from the other fields
+        overlap = {name: len(set(value) & (set(sub.type_.__fields__) - {key})) for name, sub in mapping.items()}
+        best = max(overlap, key=overlap.get) # type: ignore
+        tag = best if overlap[best] > 0 else None
+    if tag is None:
+        return value
+    return coerce({**value, key: tag}, mapping[tag].type_)
+
+
+def _loads(text: str) -> Any:
+    text = text.strip().removeprefix("```json").removeprefix("```").removesuffix("```")
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        start, end = text.find("{"), text.rfind("}")
+        if 0 <= start < end:
+            return json.loads(text[start:end + 1])
+        raise
+
+
+def raw_arguments(raw: Any) -> Any:
+    """The structured arguments in a raw model message (tool call arguments or JSON content)."""
+    if isinstance(raw, AIMessage):
+        if raw.tool_calls:
+            return raw.tool_calls[0]["args"]
+        for call in raw.invalid_tool_calls:
+            if call.get("args"):
+                return _loads(call["args"])
+        if isinstance(raw.content, list): # e.g. Anthropic tool use blocks
+            for block in raw.content:
+                if isinstance(block, dict) and block.get("type") == "tool_use":
+                    return block.get("input")
+        raw = raw.content
+    if isinstance(raw, str):
+        return _loads(raw)
+    return raw
+
+
+class RepairStats:
+    """How many structured responses failed validation and how they were repaired."""
+
+    def __init__(self, report_every: int = 50):
+        self.report_every = report_every
+        self.responses = 0
+        self.invalid = 0
+        self.repaired = 0 # locally, without another model call
+        self.retried = 0 # correction prompts sent
+        self.failed = 0
+        self._lock = threading.Lock()
+
+    def count(self, **counters: int) -> None:
+        with self._lock:
+            for name, n in counters.items():
+                setattr(self, name, getattr(self, name) + n)
+            responses = self.responses
+        if "responses" in counters and self.report_every and responses % self.report_every == 0:
+            logger.info(self.report())
+
+    @property
+    def failure_rate(self) -> float:
+        return self.invalid / self.responses if self.responses else 0.0
+
+    @property
+    def retry_rate(self) -> float:
+        return self.retried / self.responses if self.responses else 0.0
+
+    def report(self) -> str:
+        return (f"Structured output: {self.invalid}/{self.responses} invalid ({self.failure_rate:.1%}), "
+                f"{self.repaired} repaired locally, {self.retried} correction prompts ({self.retry_rate:.1%}), {self.failed} failed")
+
+
+repair_stats = RepairStats()
+
+
+class StructuredOutputRepair:
+    """Last step of a chain built with `with_structured_output(model, include_raw=True)`.
+
+    `corrector` is a runnable taking `output` and `error` that returns the same raw/parsed dict,
+    usually `correction_prompt | llm.with_structured_output(model, include_raw=True)`.
+    """
+
+    def __init__(self, model: type[BaseModel], corrector: Optional[Runnable] = None, stats: Optional[RepairStats] = None):
+        self.model = model
+        self.corrector = corrector
+        self.stats = stats or repair_stats
+
+    def runnable(self) -> RunnableLambda:
+        return RunnableLambda(self.repair, afunc=self.arepair)
+
+    def repair(self, output: dict) -> BaseModel:
+        result, correction = self._local(output, first=True)
+        if result is not None:
+            return result
+        corrected = self.corrector.invoke(correction) # type: ignore
+        return self._corrected(output, corrected)
+
+    async def arepair(self, output: dict) -> BaseModel:
+        result, correction = self._local(output, first=True)
+        if result is not None:
+            return result
+        corrected = await self.corrector.ainvoke(correction) # type: ignore
+        return self._corrected(output, corrected)
+
+    def _local(self, output: dict, first: bool) -> tuple[Optional[BaseModel], dict]:
+        """The validated response if parsing or local coercion succeeds, otherwise the correction prompt inputs."""
+        if first:
+            self.stats.count(responses=1)
+        parsed, error = output.get("parsed"), output.get("parsing_error")
+        if isinstance(parsed, self.model) and error is None:
+            return parsed, {}
+        if first:
+            self.stats.count(invalid=1)
+
+        arguments = None
+        try:
+            arguments = raw_arguments(output.get("raw"))
+            result = self.model.parse_obj(coerce(arguments, self.model))
+        except (ValidationError, ValueError, TypeError) as e:
+            logger.warning(f"Cannot repair {self.model.__name__} locally: {e}")
+            if first and self.corrector is None:
+                self._fail(error or e)
+            text = json.dumps(arguments) if arguments is not None else str(output.get("raw"))
+            return None, {"output": text, "error": str(error or e)}
+
+        if first:
+            self.stats.count(repaired=1)
+        return result, {}
+
+    def _corrected(self, output: dict, corrected: dict) -> BaseModel:
+        self.stats.count(retried=1)
+        result, _ = self._local(corrected, first=False)
+        if result is None:
+            self._fail(output.get("parsing_error"))
+        return result # type: ignore
+
+    def _fail(self, error: Optional[BaseException]):
+        self.stats.count(failed=1)
+        if isinstance(error, (ValidationError, OutputParserException)):
+            raise error
+        raise OutputParserException(f"Invalid {self.model.__name__}: {error}")
@@ -0,0 +1,117 @@
+"""Versioned binary encoding of signals for uploads.
+
+A payload is a fixed header, the UTF-8 name of the array and the compressed raw samples:
+
+    magic "CHSG" | version u8 | dtype u8 | compression u8 | name length u8 | sample rate u32 | length u64 | scale f32
+
+`int16` payloads store samples divided by `scale` (the peak magnitude), `float32` payloads store them as is.
+Payloads are bytes; base64 is only applied at the edge by `to_text`.
+"""
+import base64
+import struct
+import zlib
+from typing import NamedTuple
+
+import numpy as np
+import numpy.typing as npt
+
+try:
+    import zstandard
+except ImportError: # optional, zlib is always available
+    zstandard = None
+
+MAGIC = b"CHSG"
+VERSION = 1
+_HEADER = struct.Struct("<4sBBBBIQf")
+
+_DTYPES = {"int16": (1, np.dtype("<i2")), "float32": (2, np.dtype("<f4"))}
+_DTYPE_NAMES = {code: name for name, (code, _) in _DTYPES.items()}
+_COMPRESSIONS = {"none": 0, "zlib": 1, "zstd": 2}
+_COMPRESSION_NAMES = {code: name for name, code in _COMPRESSIONS.items()}
+
+# base64 text of every payload starts with the encoded magic
+TEXT_PREFIX = base64.b64encode(MAGIC)[:5].decode("ascii")
+
+
+class DecodedSignal(NamedTuple):
+    name: str
+    data: npt.NDArray[np.float32]
+    sample_rate: int
+
+
+def _compress(raw: bytes, compression: str) -> bytes:
+    if compression == "zlib":
+        return zlib.compress(raw)
+    if compression == "zstd":
+        if zstandard is None:
+            raise ValueError("zstd compression requires the 'zstandard' package")
+        return zstandard.ZstdCompressor().compress(raw)
+    return raw
+
+
+def _decompress(body: bytes, compression: str) -> bytes:
+    if compression == "zlib":
+        return zlib.decompress(body)
+    if compression == "zstd":
+        if zstandard is None:
+            raise ValueError("zstd payload requires the 'zstandard' package")
+        return zstandard.ZstdDecompressor().decompress(body)
+    return body
+
+
+def encode_signal(name: str, signal: npt.ArrayLike, sample_rate: int, dtype: str = "float32", compression: str = "zlib") -> bytes:
+    if dtype not in _DTYPES:
+        raise ValueError(f"Unsupported signal encoding dtype {dtype!r}, expected one of {list(_DTYPES)}")
+    if compression not in _COMPRESSIONS:
+        raise ValueError(f"Unsupported compression {compression!r}, expected one of {list(_COMPRESSIONS)}")
+    name_bytes = name.encode("utf-8")
+    if len(name_bytes) > 255:
+        raise ValueError("Signal name must be at most 255 bytes")
+
+    data = np.ravel(signal)
+    code, np_dtype = _DTYPES[dtype]
+    scale = 1.0
+    if dtype == "int16":
+        scale = float(np.max(np.abs(data))) if len(data) else 0.0
+        samples = np.round(data / scale * 32767).astype(np_dtype) if scale > 0 else np.zeros(len(data), np_dtype)
+    else:
+        samples = data.astype(np_dtype)
+
+    header = _HEADER.pack(MAGIC, VERSION, code, _COMPRESSIONS[compression], len(name_bytes), sample_rate, len(samples), scale)
+    return header + name_bytes + _compress(samples.tobytes(), compression)
+
+
+def decode_signal(payload: bytes) -> DecodedSignal:
+    if len(payload) < _HEADER.size:
+        raise ValueError("Signal payload is truncated")
+    magic, version, code, compression, name_length, sample_rate, length, scale = _HEADER.unpack_from(payload)
+    if magic != MAGIC:
+        raise ValueError("Not an encoded signal")
+    if version > VERSION:
+        raise ValueError(f"Signal payload version {version} is newer than supported version {VERSION}")
+    if code not in _DTYPE_NAMES or compression not in _COMPRESSION_NAMES:
+        raise ValueError(f"Unknown dtype {code} or compression {compression} in signal payload")
+
+    offset = _HEADER.size + name_length
+    name = payload[_HEADER.size:offset].decode("utf-8")
+    dtype_name = _DTYPE_NAMES[code]
+    raw = _decompress(payload[offset:], _COMPRESSION_NAMES[compression])
+    samples = np.frombuffer(raw, dtype=_DTYPES[dtype_name][1], count=length)
+
+    if dtype_name == "int16":
+        data = samples.astype(np.float32) * np.float32(scale / 32767)
+    else:
+        data = samples.astype(np.float32)
+    return DecodedSignal(name, data, sample_rate)
+
+
+def to_text(payload: bytes) -> str:
+    return base64.b64encode(payload).decode("ascii")
+
+
+def from_text(text: str) -> bytes:
+    return base64.b64decode(text.encode("ascii"))
+
+
+def is_encoded_text(text: str) -> bool:
+    return text.startswith(TEXT_PREFIX)
@@ -0,0 +1,100 @@
+import re
+from typing import Any, Iterator
+
+import numpy as np
+import numpy.typing as npt
+
+ID_KEYS = ("resource", "name", "id", "file", "filename")
+_SUFFIXES = ("ing", "ed", "ly", "es", "s")
+
+
+def tokenize(text: str) -> list[str]:
+    """Lowercase word tokens with a light suffix stripping, so that e.g. "tapping" and "taps" both match "tap"."""
+    tokens = []
+    for token in re.findall(r"[a-z0-9]+", text.lower()):
+        for suffix in _SUFFIXES:
+            if len(token) > len(suffix) + 2 and token.endswith(suffix):
+                token = token[:-len(suffix)]
+                break
+        if len(token) > 2 and token[-1] == token[-2]: # tapp -> tap
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+def resource_name(entry: Any) -> str:
+    """Resource name of a tag entry (the first id-like field, or the entry itself if it is a string)."""
+    if isinstance(entry, dict):
+        for key in ID_KEYS:
+            if isinstance(entry.get(key), str):
+                return entry[key]
+        return next((value for value in entry.values() if isinstance(value, str)), "")
+    return str(entry)
+
+
+def _words(value: Any) -> Iterator[str]:
+    if isinstance(value, dict):
+        for key, child in value.items():
+            if key not in ID_KEYS:
+                yield str(key)
+                yield from _words(child)
+    elif isinstance(value, (list, tuple)):
+        for child in value:
+            yield from _words(child)
+    elif isinstance(value, str):
+        yield value
+
+
+class TagIndex:
+    """BM25 index over the entries of the library tag list, built once per process.
+
+    `top_k` picks the candidate entries for a navigation query, so that only those are sent to the LLM.
+    """
+
+    def __init__(self, entries: list, k1: float = 1.5, b: float = 0.75):
+        self.entries = list(entries)
+        self.names = [resource_name(entry) for entry in self.entries]
+        documents = [tokenize(" ".join(_words(entry))) for entry in self.entries]
+
+        self.vocabulary: dict[str, int] = {}
+        for document in documents:
+            for token in document:
+                self.vocabulary.setdefault(token, len(self.vocabulary))
+
+        tf = np.zeros((len(documents), len(self.vocabulary)), dtype=np.float32)
+        for row, document in enumerate(documents):
+            for token in document:
+                tf[row, self.vocabulary[token]] += 1
+
+        lengths = tf.sum(axis=1, keepdims=True)
+        average_length = max(float(lengths.mean()), 1.0) if len(documents) else 1.0
+        df = np.count_nonzero(tf, axis=0)
+        idf = np.log(1 + (len(documents) - df + 0.5) / (df + 0.5))
+        # BM25 weight of every (document, term) pair, so a query only sums columns
+        self.weights: npt.NDArray[np.float32] = (idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * lengths / average_length))).astype(np.float32)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def scores(self, query: str) -> npt.NDArray[np.float32]:
+        columns = [self.vocabulary[token] for token in tokenize(query) if token in self.vocabulary]
+        if not columns:
+            return np.zeros(len(self.entries), dtype=np.float32)
+        return self.weights[:, columns].sum(axis=1)
+
+    def search(self, query: str, k: int) -> list[int]:
+        """Indices of the `k` best matching entries, best first (ties keep the library order)."""
+        scores = self.scores(query)
+        return np.argsort(-scores, kind="stable")[:k].tolist()
+
+    def top_k(self, query: str, k: int) -> list:
+        return [self.entries[i] for i in self.search(query, k)]
+
+    def candidates(self, query: str, k: int) -> list:
+        """The `k` best matching entries in library order (all entries for `k` <= 0).
+
+        Keeping the library order makes the prompt identical whenever the same candidates are selected.
+        """
+        if k <= 0:
+            return list(self.entries)
+        return [self.entries[i] for i in sorted(self.search(query, k))]
@@ -0,0 +1,87 @@
+"""Compact serialization of library tag entries for the navigation prompt.
+
+Instead of `json.dumps(entries)` every entry becomes one line: a short integer id followed by its tag
+fields in a fixed column order that is named once in a header. With `tag_ids=True` tags that occur more
+than once are replaced by numbers from a shared vocabulary. `CompactTagList.resource` maps the ids the
+model answers with back to resource names.
+"""
+from collections import Counter
+from functools import lru_cache
+import logging
+from typing import Any, Optional
+
+import tiktoken
+
+from .tagindex import ID_KEYS, resource_name
+
+logger = logging.getLogger("ChatHAP")
+
+
+def _field_tags(value: Any) -> list[str]:
+    if isinstance(value, dict):
+        return [f"{key} {' '.join(_field_tags(child))}".strip() for key, child in value.items()]
+    if isinstance(value, (list, tuple)):
+        return [tag for child in value for tag in _field_tags(child)]
+    if value is None:
+        return []
+    return [" ".join(str(value).split())] # no line breaks inside a field
+
+
+class CompactTagList:
+    """Prompt text for a list of tag entries and the reverse map from its ids to resource names."""
+
+    def __init__(self, entries: list, tag_ids: bool = False):
+        self.names = [resource_name(entry) for entry in entries]
+        self.columns = list(dict.fromkeys(key for entry in entries if isinstance(entry, dict) for key in entry if key not in ID_KEYS))
+        if not all(isinstance(entry, dict) for entry in entries):
+            self.columns.append("tags") # plain entries are listed as a whole
+        rows = [
+            [_field_tags(entry.get(column)) for column in self.columns] if isinstance(entry, dict)
+            else [[] for _ in self.columns[:-1]] + [_field_tags(entry)]
+            for entry in entries
+        ]
+
+        self.vocabulary: dict[str, int] = {}
+        if tag_ids:
+            counts = Counter(tag for row in rows for field in row for tag in field)
+            for tag, count in counts.most_common():
+                if count > 1:
+                    self.vocabulary[tag] = len(self.vocabulary)
+
+        lines = [
+            "Each line is one resource: its id, then " + ", ".join(self.columns) + ", separated by |. "
+            "Tags within a field are separated by commas. Answer with the id as the resource."
+        ]
+        if self.vocabulary:
+            lines.append("Numbers in fields stand for these tags: " + "; ".join(f"{i}={tag}" for tag, i in self.vocabulary.items()))
+        for i, row in enumerate(rows):
+            fields = [",".join(str(self.vocabulary.get(tag, tag)) for tag in field) for field in row]
+            lines.append("|".join([str(i)] + fields).rstrip("|"))
+        self.text = "\n".join(lines)
+
+    def __str__(self) -> str:
+        return self.text
+
+    def resource(self, selection: str) -> str:
+        """Resource name for an id the model selected (names are passed through unchanged)."""
+        selection = str(selection).strip()
+        if selection.isdigit() and int(selection) < len(self.names):
+            return self.names[int(selection)]
+        return selection
+
+
+@lru_cache(maxsize=None)
+def _encoding(model: str) -> Optional[tiktoken.Encoding]:
+    try:
+        return tiktoken.encoding_for_model(model)
+    except Exception: # unknown model, or the encoding cannot be downloaded
+        logger.warning(f"No tiktoken encoding for {model}, estimating token counts", exc_info=True)
+        return None
+
+
+def count_tokens(text: str, model: str = "gpt-4-turbo") -> int:
+    """Token count of `text` for `model` (about 4 characters per token if the encoding is unavailable)."""
+    encoding = _encoding(model)
+    if encoding is None:
+        return (len(text) + 3) // 4
+    return len(encoding.encode(text))
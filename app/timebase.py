@@ -0,0 +1,49 @@
+from dataclasses import dataclass, replace
+from typing import Union
+
+import numpy as np
+import numpy.typing as npt
+
+from .globalVariable import SAMPLE_RATE, SIGNAL_DTYPE
+
+
+@dataclass(frozen=True)
+class TimeBase:
+    """Time axis of a sampled signal: sample `i` is at `start + i / sample_rate`.
+
+    Signals carry this instead of an explicit `t` array; `expand` builds the array where a consumer needs one.
+    """
+    sample_rate: float
+    length: int
+    start: float = 0.0
+
+    @classmethod
+    def spanning(cls, duration: float, length: int, start: float = 0.0) -> "TimeBase":
+        """Time base of `np.linspace(start, start + duration, length, endpoint=False)`."""
+        return cls(length / duration if duration > 0 and length > 0 else SAMPLE_RATE, length, start)
+
+    def __len__(self) -> int:
+        return self.length
+
+    @property
+    def duration(self) -> float:
+        return self.length / self.sample_rate
+
+    @property
+    def end(self) -> float:
+        """Time of the last sample."""
+        return self.start + (self.length - 1) / self.sample_rate
+
+    def head(self, length: int) -> "TimeBase":
+        return replace(self, length=max(0, min(length, self.length)))
+
+    def expand(self, dtype: npt.DTypeLike = SIGNAL_DTYPE) -> npt.NDArray[np.floating]:
+        return (self.start + np.arange(self.length) / self.sample_rate).astype(dtype)
+
+    def to_dict(self) -> dict:
+        return {"sample_rate": self.sample_rate, "length": self.length, "start": self.start}
+
+
+def time_axis(t: Union[TimeBase, npt.ArrayLike]) -> npt.NDArray[np.floating]:
+    """Explicit time array of a time base (arrays are passed through)."""
+    return t.expand() if isinstance(t, TimeBase) else np.asarray(t)
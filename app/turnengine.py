@@ -0,0 +1,67 @@
+"""Asynchronous pipeline for one chat turn.
+
+Work that does not depend on each other runs concurrently on the shared event loop (see asyncloop.py):
+the vote copy that navigation needs is loaded while the chat model is still answering, and the plot
+is rendered while the vibration is persisted. The turn only waits for what the user sees: persisting
+is left running on the loop, and its errors are logged.
+"""
+import asyncio
+from functools import partial
+import logging
+from typing import Any, Callable, Coroutine, Optional, Sequence, TypeVar
+
+from langchain_core.messages import BaseMessage
+
+from .asyncloop import run_coroutine
+from .firebase_users import prepare_navigation
+from .langinterface import LLMChains, LLMResponse, achat_chatgpt
+
+logger = logging.getLogger("ChatHAP")
+
+T = TypeVar("T")
+
+
+class TurnEngine:
+    """Runs the steps of a turn on the shared event loop; `run` is the blocking entry point for the script thread.
+
+    Keep one instance per session (in `st.session_state`), so sessions do not share the vote loading state.
+    """
+
+    def __init__(self, llmchains: Optional[LLMChains] = None, prepare: Callable[[], None] = prepare_navigation):
+        self.llmchains = llmchains
+        self.prepare = prepare
+        self._prepared: Optional[asyncio.Future] = None
+        self._persisting: set[asyncio.Future] = set() # referenced until done, so they are not garbage collected
+
+    def run(self, coroutine: Coroutine[Any, Any, T]) -> T:
+        return run_coroutine(coroutine)
+
+    async def respond(self, conversation: Sequence[BaseMessage]) -> LLMResponse:
+        """The chat model's response; meanwhile the votes for a possible navigation are loaded."""
+        if self._prepared is None or self._prepared.done():
+            self._prepared = asyncio.ensure_future(asyncio.to_thread(self.prepare))
+            self._prepared.add_done_callback(partial(_log_failure, "Preparing navigation failed"))
+        return await achat_chatgpt(conversation, self.llmchains)
+
+    async def prepared(self) -> None:
+        """Wait for the vote loading started by `respond` (navigation also waits for it on its own)."""
+        if self._prepared is not None:
+            await asyncio.shield(self._prepared)
+
+    async def render_and_persist(self, render: Callable[[], T], persist: Callable[[], Any]) -> T:
+        """Start persisting the signal, then return the rendered plot without waiting for the persisting to finish."""
+        persisting = asyncio.ensure_future(asyncio.to_thread(persist))
+        self._persisting.add(persisting)
+        persisting.add_done_callback(self._persisting.discard)
+        persisting.add_done_callback(partial(_log_failure, "Persisting the signal failed"))
+        return await asyncio.to_thread(render)
+
+    async def persisted(self) -> None:
+        """Wait for the signals whose persisting `render_and_persist` started."""
+        if self._persisting:
+            await asyncio.wait(set(self._persisting))
+
+
+def _log_failure(message: str, future: asyncio.Future) -> None:
+    if not future.cancelled() and future.exception() is not None:
+        logger.error(message, exc_info=future.exception())
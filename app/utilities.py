@@ -1,5 +1,6 @@
 from typing import NoReturn
 from datetime import datetime
+import re
 
 def strtobool(val) -> bool:
     """Convert a string representation of truth to true (1) or false (0).
@@ -15,6 +16,14 @@ def strtobool(val) -> bool:
     else:
         raise ValueError("invalid truth value %r" % (val,))
 
+def sanitize_key(key):
+    """Sanitize the key to ensure it is valid for Firebase."""
+    return re.sub(r'[^a-zA-Z0-9_]', '_', key)
+
+def replace_invalid_chars(name):
+    # Replace invalid characters with underscores
+    return name.replace('.', '_').replace('$', '_').replace('#', '_').replace('[', '_').replace(']', '_').replace('/', '_')
+
 # Get the current time
 def get_time():
     timestamp_str = datetime.now().isoformat()
@@ -0,0 +1,191 @@
+import json
+import logging
+import os
+import threading
+from typing import Iterator, Mapping, Optional
+
+import numpy as np
+import numpy.typing as npt
+
+from .lrucache import ByteLRUCache
+
+logger = logging.getLogger("ChatHAP")
+
+LIBRARY_VERSION = 1
+LIBRARY_DTYPE = np.dtype("<f4")
+
+
+def index_path_for(bin_path: str) -> str:
+    """Return the path of the index file that belongs to a packed library file."""
+    return os.path.splitext(bin_path)[0] + ".index.json"
+
+
+class VibLibrary:
+    """Read-only view of a packed vibration library.
+
+    All waveforms live in one contiguous sample file that is opened with `np.memmap`,
+    so several processes on the same host share the same page-cache pages.
+    A small JSON index maps each resource name to its offset, length and duration.
+    """
+
+    def __init__(self, samples: npt.NDArray, index: dict):
+        self._samples = samples
+        self._index = index
+        self._resources: dict[str, dict] = index["resources"]
+        self.sample_rate: int = index["sample_rate"]
+
+    @classmethod
+    def open(cls, bin_path: str) -> "VibLibrary":
+        with open(index_path_for(bin_path), "r") as json_file:
+            index = json.load(json_file)
+        if index.get("version") != LIBRARY_VERSION:
+            raise ValueError(f"Unsupported vibration library version: {index.get('version')}")
+
+        dtype = np.dtype(index["dtype"])
+        total_frames = index["total_frames"]
+        if total_frames > 0:
+            samples = np.memmap(bin_path, dtype=dtype, mode="r", shape=(total_frames,))
+        else:
+            samples = np.empty(0, dtype=dtype)
+        logger.debug(f"Opened vibration library {bin_path} with {len(index['resources'])} resources")
+        return cls(samples, index)
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._resources
+
+    def __len__(self) -> int:
+        return len(self._resources)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._resources)
+
+    def __getitem__(self, name: str) -> npt.NDArray[np.float32]:
+        """Return a zero-copy view of the samples of a resource."""
+        entry = self._resources[name]
+        return self._samples[entry["offset"]:entry["offset"] + entry["num_frames"]]
+
+    @property
+    def tags(self) -> Optional[list]:
+        """Tag metadata stored next to the waveforms by the library build."""
+        return self._index.get("tags")
+
+    def entry(self, name: str) -> dict:
+        return self._resources[name]
+
+    def num_frames(self, name: str) -> int:
+        return self._resources[name]["num_frames"]
+
+    def duration(self, name: str) -> float:
+        return self._resources[name]["duration"]
+
+    def frame_rate(self, name: str) -> int:
+        return self._resources[name]["frame_rate"]
+
+
+def write_library(bin_path: str, wave_files: Mapping[str, Mapping], sample_rate: int, extra_index: Optional[dict] = None) -> None:
+    """Pack waveforms into a contiguous sample file plus its index.
+
+    `wave_files` follows the layout of `VibViz_files.json`:
+    `{name: {"data": [...], "frame_rate": ..., "num_frames": ..., "duration": ...}}`.
+    Both files are written to temporary paths first and then renamed, so readers never see a partial library.
+    """
+    index_path = index_path_for(bin_path)
+    resources = {}
+    offset = 0
+
+    tmp_bin_path = f"{bin_path}.{os.getpid()}.tmp"
+    with open(tmp_bin_path, "wb") as bin_file:
+        for name, entry in wave_files.items():
+            data = np.ascontiguousarray(entry["data"], dtype=LIBRARY_DTYPE)
+            bin_file.write(data.tobytes())
+            resources[name] = {
+                **{key: value for key, value in entry.items() if key != "data"},
+                "offset": offset,
+                "num_frames": len(data),
+                "duration": entry.get("duration", len(data) / sample_rate),
+                "frame_rate": entry.get("frame_rate", sample_rate),
+            }
+            offset += len(data)
+
+    index = {
+        **(extra_index or {}),
+        "version": LIBRARY_VERSION,
+        "dtype": LIBRARY_DTYPE.str,
+        "sample_rate": sample_rate,
+        "total_frames": offset,
+        "resources": resources,
+    }
+    tmp_index_path = f"{index_path}.{os.getpid()}.tmp"
+    with open(tmp_index_path, "w") as json_file:
+        json.dump(index, json_file)
+
+    os.replace(tmp_bin_path, bin_path)
+    os.replace(tmp_index_path, index_path)
+    logger.info(f"Vibration library with {len(resources)} resources saved to {bin_path}")
+
+
+def convert_json_library(json_path: str, bin_path: str) -> None:
+    """Convert the legacy `VibViz_files.json` library into the packed format."""
+    with open(json_path, "r") as json_file:
+        wave_files = json.load(json_file)
+    sample_rates = {entry["frame_rate"] for entry in wave_files.values()}
+    if len(sample_rates) > 1:
+        raise ValueError(f"Vibration library has mixed sample rates: {sample_rates}")
+    write_library(bin_path, wave_files, sample_rates.pop() if sample_rates else 0)
+
+
+def open_library(bin_path: str, legacy_json_path: Optional[str] = None) -> VibLibrary:
+    """Open the packed library, converting the legacy JSON library first if only that exists."""
+    if not os.path.exists(index_path_for(bin_path)) and legacy_json_path and os.path.exists(legacy_json_path):
+        logger.info(f"Packed vibration library not found, converting {legacy_json_path}")
+        convert_json_library(legacy_json_path, bin_path)
+    return VibLibrary.open(bin_path)
+
+
+class LazyVibLibrary:
+    """Library accessor that only touches the samples of resources that are actually requested.
+
+    The packed library (or the legacy JSON conversion) is opened on first use, and decoded
+    waveforms are kept in a byte-bounded LRU so frequently navigated resources stay in memory.
+    """
+
+    def __init__(self, bin_path: str, legacy_json_path: Optional[str] = None, max_bytes: int = 64 * 2**20, dtype: npt.DTypeLike = np.float64):
+        self.bin_path = bin_path
+        self.legacy_json_path = legacy_json_path
+        self.dtype = np.dtype(dtype)
+        self.cache: ByteLRUCache[npt.NDArray[np.floating]] = ByteLRUCache(max_bytes)
+        self._library: Optional[VibLibrary] = None
+        self._lock = threading.Lock()
+
+    @property
+    def library(self) -> VibLibrary:
+        if self._library is None:
+            with self._lock:
+                if self._library is None:
+                    self._library = open_library(self.bin_path, self.legacy_json_path)
+        return self._library
+
+    def __contains__(self, name: object) -> bool:
+        return name in self.library
+
+    def __getitem__(self, name: str) -> npt.NDArray[np.floating]:
+        """Return the decoded samples of a resource as a read-only in-memory array."""
+        return self.cache.get_or_create(name, lambda: self._decode(name))
+
+    def _decode(self, name: str) -> npt.NDArray[np.floating]:
+        samples = np.array(self.library[name], dtype=self.dtype)
+        samples.setflags(write=False)
+        return samples
+
+    def num_frames(self, name: str) -> int:
+        return self.library.num_frames(name)
+
+    def duration(self, name: str) -> float:
+        return self.library.duration(name)
+
+
+if __name__ == "__main__":
+    import sys
+
+    # python -m app.viblib data/VibViz_files.json data/VibViz_files.bin
+    convert_json_library(sys.argv[1], sys.argv[2])
@@ -1,8 +1,10 @@
 import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
 import io
 import sys
 import logging
 from .globalVariable import *
+from .timebase import time_axis
 
 logger = logging.getLogger("ChatHAP")
 
@@ -11,7 +13,7 @@ def visSignal(data, t):
         line_width = 1
         plt.rc('font', size=20)
         plt.figure(figsize=(15, 10))
-        plt.plot(t, data[0] / GAIN, linewidth=line_width)
+        plt.plot(time_axis(t), data[0] / GAIN, linewidth=line_width)
         plt.xlabel("Time (s)")
         plt.ylabel("Amplitude")
         plt.ylim(-1.1, 1.1)
@@ -23,15 +25,15 @@ def visSignal_st(data, t):
     if len(data) > 0 and len(t) > 0:
         line_width = 1
         plt.rc('font', size=20)
-        fig, ax = plt.subplots(figsize=(15, 10))
-        ax.plot(t, data[0] / GAIN, linewidth=line_width)
+        fig = Figure(figsize=(15, 10)) # not registered with pyplot, so plots can be rendered off the script thread
+        ax = fig.subplots()
+        ax.plot(time_axis(t), data[0] / GAIN, linewidth=line_width)
         ax.set_xlabel("Time (s)")
         ax.set_ylabel("Amplitude")
         ax.set_ylim(-1.1, 1.1)
         buf = io.BytesIO()
         fig.savefig(buf, format='png')
         buf.seek(0)
-        plt.close(fig)
         return buf.getvalue()
     else:
         logger.warning("Data is empty. Cannot display plot.")
@@ -0,0 +1,145 @@
+import atexit
+import copy
+import logging
+import queue
+import threading
+import time
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger("ChatHAP")
+
+
+def _normalize(path: str) -> str:
+    return path.strip("/")
+
+
+def _increment(value: Any) -> Optional[float]:
+    """Amount of a server-side increment sentinel `{".sv": {"increment": n}}`, None for other values."""
+    if isinstance(value, dict) and isinstance(value.get(".sv"), dict) and "increment" in value[".sv"]:
+        return value[".sv"]["increment"]
+    return None
+
+
+def coalesce(pending: dict[str, Any], path: str, value: Any) -> None:
+    """Merge a write of `value` at `path` into `pending`, a map of non-overlapping paths to values.
+
+    A later write wins over earlier writes to the same path or below it, and a write below a pending
+    path is folded into that path's value, so `pending` can be committed as one multi-path update.
+    Increments of the same path add up instead.
+    """
+    path = _normalize(path)
+    if path in pending and _increment(value) is not None and _increment(pending[path]) is not None:
+        pending[path] = {".sv": {"increment": _increment(pending[path]) + _increment(value)}}
+        return
+    for pending_path in pending:
+        if path.startswith(pending_path + "/"):
+            node = pending[pending_path]
+            if not isinstance(node, dict):
+                node = pending[pending_path] = {}
+            keys = path[len(pending_path) + 1:].split("/")
+            for key in keys[:-1]:
+                if not isinstance(node.get(key), dict):
+                    node[key] = {}
+                node = node[key]
+            node[keys[-1]] = value
+            return
+
+    for pending_path in [p for p in pending if p.startswith(path + "/")]:
+        del pending[pending_path]
+    pending[path] = value
+
+
+class WriteBehindQueue:
+    """Per-process background writer for Realtime Database writes.
+
+    Writes are queued (bounded, so callers block instead of growing memory without limit), coalesced
+    by path and handed to `commit` as one multi-path batch. Failed batches are retried with exponential
+    backoff. `flush` waits until everything queued so far has been written.
+    """
+
+    def __init__(self, commit: Callable[[dict[str, Any]], None], maxsize: int = 1000, batch_size: int = 100, max_retries: int = 5, backoff: float = 0.5, max_backoff: float = 30.0):
+        self._commit = commit
+        self._queue: queue.Queue[dict[str, Any]] = queue.Queue(maxsize)
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self._thread: Optional[threading.Thread] = None
+        self._thread_lock = threading.Lock()
+        self.committed_batches = 0
+        self.failed_batches = 0
+
+    def set(self, path: str, value: Any) -> None:
+        self.put({path: value})
+
+    def update(self, path: str, values: dict) -> None:
+        self.put({f"{_normalize(path)}/{key}": value for key, value in values.items()})
+
+    def put(self, writes: dict[str, Any]) -> None:
+        """Queue several path writes that are always committed in the same batch."""
+        self._ensure_thread()
+        self._queue.put(copy.deepcopy(writes))
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Block until all queued writes are committed (or dropped). Returns False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._queue.all_tasks_done.wait(remaining)
+        return True
+
+    @property
+    def pending(self) -> int:
+        return self._queue.unfinished_tasks
+
+    def _ensure_thread(self) -> None:
+        if self._thread is None:
+            with self._thread_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="firebase-write-behind", daemon=True)
+                    self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            items = [self._queue.get()]
+            while len(items) < self.batch_size:
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            batch: dict[str, Any] = {}
+            for writes in items:
+                for path, value in writes.items():
+                    coalesce(batch, path, value)
+
+            self._commit_with_retry(batch)
+            for _ in items:
+                self._queue.task_done()
+
+    def _commit_with_retry(self, batch: dict[str, Any]) -> None:
+        for attempt in range(self.max_retries + 1):
+            try:
+                self._commit(batch)
+                self.committed_batches += 1
+                return
+            except Exception:
+                if attempt == self.max_retries:
+                    self.failed_batches += 1
+                    logger.exception(f"Dropping {len(batch)} database writes after {attempt + 1} attempts")
+                    return
+                delay = min(self.backoff * 2**attempt, self.max_backoff)
+                logger.warning(f"Database write failed, retrying in {delay:.1f}s", exc_info=True)
+                time.sleep(delay)
+
+    def close(self, timeout: Optional[float] = 10.0) -> None:
+        """Graceful shutdown hook: wait for queued writes to be committed."""
+        if self._thread is not None and not self.flush(timeout):
+            logger.error(f"{self.pending} database writes were not committed before shutdown")
+
+
+def register_shutdown_flush(writer: WriteBehindQueue, timeout: float = 10.0) -> None:
+    atexit.register(writer.close, timeout)
@@ -0,0 +1,49 @@
+"""Prompt tokens per turn over a scripted 50-turn session: full history against the context window.
+
+    python -m tests.benchmarks.bench_contextwindow [--turns 50] [--budget 2000]
+"""
+import argparse
+import itertools
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+from app.contextwindow import ContextWindow, message_tokens
+from app.genSignal import GenSignalInput
+from app.globalVariable import CONTEXT_SUMMARY_TOKENS, CONTEXT_TOKEN_BUDGET
+
+SCRIPT = [
+	("Create a vibration that feels like a calm heartbeat.", "I generated a slow, soft heartbeat with two pulses per beat at 80 Hz."),
+	("Make it a bit more urgent.", "I increased the amplitude and shortened the gap between the beats to make it feel more urgent."),
+	("Find me something that feels like walking on gravel.", "I found a few rough, crunchy textures from the library that resemble footsteps on gravel."),
+	("The second one is too rough, make it smoother.", "I lowered the carrier frequency and used a continuous envelope so the texture feels smoother."),
+	("Loop it 3 times and make it slower.", "I looped the vibration three times and stretched it to play more slowly."),
+]
+
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+	parser.add_argument("--turns", type=int, default=50)
+	parser.add_argument("--budget", type=int, default=CONTEXT_TOKEN_BUDGET)
+	parser.add_argument("--summary", type=int, default=CONTEXT_SUMMARY_TOKENS)
+	args = parser.parse_args()
+
+	window = ContextWindow(args.budget, args.summary)
+	params = GenSignalInput(A=0.6, freq_c=80, dur=2, rhythm=2)
+	conversation = []
+	total_full = total_window = 0
+
+	print(f"{'turn':>5}{'full':>10}{'window':>10}{'folded':>10}")
+	for turn, (request, reply) in zip(range(1, args.turns + 1), itertools.cycle(SCRIPT)):
+		conversation.append(HumanMessage(content=f"{request} (turn {turn})"))
+		full = message_tokens(conversation)
+		windowed = message_tokens(window.build(conversation, params))
+		total_full += full
+		total_window += windowed
+		print(f"{turn:>5}{full:>10}{windowed:>10}{window.folded:>10}")
+		conversation.append(AIMessage(content=reply))
+
+	print(f"total prompt tokens: {total_full} full history, {total_window} windowed ({1 - total_window / total_full:.0%} fewer)")
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,58 @@
+"""Tail latency of chat calls with and without hedging, against stub models with lognormal latencies.
+
+    python -m tests.benchmarks.bench_hedging [--calls 500] [--delays 0 0.08 0.15]
+"""
+import argparse
+import asyncio
+import time
+
+from langchain_core.messages import HumanMessage
+
+from app.hedging import LatencyStats, hedged_runnable
+from app.langinterface import LLMResponse
+from tests.stubmodels import StubChatModel, lognormal, stub_chains
+
+INPUTS = {"conversation": [HumanMessage(content="Make the vibration stronger.")]}
+
+
+async def run(chain, calls: int, concurrency: int, stats: LatencyStats, record: bool) -> None:
+	async def worker(n):
+		for _ in range(n):
+			start = time.perf_counter()
+			await chain.ainvoke(INPUTS)
+			if record:
+				stats.record(time.perf_counter() - start, "primary", False)
+
+	await asyncio.gather(*(worker(len(range(i, calls, concurrency))) for i in range(concurrency)))
+
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+	parser.add_argument("--calls", type=int, default=500)
+	parser.add_argument("--concurrency", type=int, default=8, help="calls in flight at the same time")
+	parser.add_argument("--delays", type=float, nargs="+", default=[0, 0.08, 0.15], help="seconds until the secondary is asked")
+	parser.add_argument("--median", type=float, nargs=2, default=[0.05, 0.06], help="median latency of the primary and secondary model")
+	parser.add_argument("--sigma", type=float, nargs=2, default=[0.8, 0.5], help="lognormal spread of the primary and secondary model")
+	args = parser.parse_args()
+
+	def chains(seed):
+		primary = StubChatModel(name="primary", latency=lognormal(args.median[0], args.sigma[0], seed))
+		secondary = StubChatModel(name="secondary", latency=lognormal(args.median[1], args.sigma[1], seed + 1))
+		return stub_chains(primary).base_chain, stub_chains(secondary).base_chain, secondary
+
+	print(f"{'mode':<16}{'p50':>8}{'p95':>8}{'p99':>8}{'secondary calls':>18}")
+	primary, _, _ = chains(0)
+	stats = LatencyStats(window=args.calls, report_every=0)
+	asyncio.run(run(primary, args.calls, args.concurrency, stats, record=True))
+	print(f"{'primary only':<16}" + "".join(f"{p:>8.3f}" for p in stats.percentiles(50, 95, 99)) + f"{0:>18}")
+
+	for delay in args.delays:
+		primary, secondary, secondary_model = chains(0)
+		stats = LatencyStats(window=args.calls, report_every=0)
+		hedged = hedged_runnable(primary, secondary, LLMResponse, delay, stats)
+		asyncio.run(run(hedged, args.calls, args.concurrency, stats, record=False))
+		print(f"{f'hedged {delay:g}s':<16}" + "".join(f"{p:>8.3f}" for p in stats.percentiles(50, 95, 99)) + f"{secondary_model.calls:>18}")
+
+
+if __name__ == "__main__":
+	main()
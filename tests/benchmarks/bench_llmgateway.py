@@ -0,0 +1,75 @@
+"""Load test of the LLM gateway: a burst of sessions against a rate limited stub model.
+
+Interactive chat turns, background evaluation calls and duplicate navigation queries arrive at the
+same time. Without the gateway (no cap, no retries) requests beyond the provider's capacity fail;
+with it they queue, interactive turns first, and duplicates are sent once.
+
+    python -m tests.benchmarks.bench_llmgateway [--sessions 60] [--capacity 6] [--latency 0.2]
+"""
+import argparse
+import asyncio
+import logging
+import time
+
+import numpy as np
+from langchain_core.messages import HumanMessage
+
+import app.langinterface as langinterface
+from app.asyncloop import run_coroutine
+from app.langinterface import achat_chatgpt, anav_chatgpt
+from app.llmgateway import LLMGateway, Priority
+from tests.stubmodels import StubChatModel, lognormal, stub_chains
+
+
+async def burst(chains, sessions: int, background: int) -> dict[str, list]:
+	results: dict[str, list] = {"interactive": [], "navigation": [], "background": [], "errors": []}
+
+	async def timed(kind, coroutine):
+		start = time.perf_counter()
+		try:
+			await coroutine
+			results[kind].append(time.perf_counter() - start)
+		except Exception as e:
+			results["errors"].append(type(e).__name__)
+
+	tasks = []
+	for i in range(sessions):
+		tasks.append(timed("interactive", achat_chatgpt([HumanMessage(content=f"Session {i}: make it stronger.")], chains)))
+		tasks.append(timed("navigation", anav_chatgpt(f"rain on a window {i % 5}", "0|rain,soft\n1|tap,sharp", chains)))
+	for i in range(background):
+		tasks.append(timed("background", achat_chatgpt([HumanMessage(content=f"Evaluation prompt {i}")], chains, Priority.BACKGROUND)))
+	await asyncio.gather(*tasks)
+	return results
+
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+	parser.add_argument("--sessions", type=int, default=60)
+	parser.add_argument("--background", type=int, default=40)
+	parser.add_argument("--capacity", type=int, default=6, help="requests the stub provider accepts at once")
+	parser.add_argument("--latency", type=float, default=0.2, help="median seconds per model call")
+	parser.add_argument("--concurrency", type=int, default=8, help="initial gateway limit")
+	args = parser.parse_args()
+
+	langinterface.llm_cache.mode = "off" # measure the gateway, not the cache
+	logging.getLogger("ChatHAP").setLevel(logging.ERROR) # no retry warnings
+	print(f"{'mode':<10}{'ok':>6}{'errors':>8}{'provider calls':>16}{'interactive p50/p95':>22}{'background p50/p95':>21}{'coalesced':>11}{'max queue':>11}{'limit':>7}")
+	for name, gateway in [("direct", LLMGateway(10**6, max_retries=0, report_every=0)), ("gateway", LLMGateway(args.concurrency, backoff=0.05, report_every=0))]:
+		model = StubChatModel(name="stub", latency=lognormal(args.latency, 0.3, seed=1), max_concurrent=args.capacity)
+		chains = stub_chains(model)
+		langinterface.llm_gateway = gateway
+		start = time.perf_counter()
+		results = run_coroutine(burst(chains, args.sessions, args.background))
+		elapsed = time.perf_counter() - start
+
+		def p(kind):
+			values = results[kind] or [0.0]
+			return "/".join(f"{x:.2f}" for x in np.percentile(values, [50, 95]))
+
+		ok = sum(len(results[k]) for k in ("interactive", "navigation", "background"))
+		provider_calls = model.calls + chains.nav_chain.steps[1].calls # type: ignore
+		print(f"{name:<10}{ok:>6}{len(results['errors']):>8}{provider_calls:>16}{p('interactive'):>22}{p('background'):>21}{gateway.stats.coalesced:>11}{gateway.stats.max_queue_depth:>11}{gateway.limit if name == 'gateway' else float('inf'):>7.1f}  ({elapsed:.1f}s)")
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,39 @@
+"""Encode time and upload size of the signal codec compared to zlib'd JSON float lists.
+
+    python -m tests.benchmarks.bench_signalcodec
+"""
+import timeit
+
+import numpy as np
+
+from app import signalcodec
+from app.firebase_users import compress_data
+from app.globalVariable import SAMPLE_RATE
+
+DURATION = 5.0 # seconds of signal
+REPEAT = 20
+
+
+def main():
+	t = np.arange(int(DURATION * SAMPLE_RATE)) / SAMPLE_RATE
+	signal = (2.7 * np.sin(2 * np.pi * 200 * t) * (0.5 + 0.5 * np.sin(2 * np.pi * 3 * t))).astype(np.float32)
+
+	candidates = {
+		"json+zlib (legacy)": lambda: compress_data({"signal": signal.tolist()}),
+		"float32+zlib": lambda: signalcodec.to_text(signalcodec.encode_signal("signal", signal, SAMPLE_RATE, "float32", "zlib")),
+		"int16+zlib": lambda: signalcodec.to_text(signalcodec.encode_signal("signal", signal, SAMPLE_RATE, "int16", "zlib")),
+	}
+	if signalcodec.zstandard is not None:
+		candidates["float32+zstd"] = lambda: signalcodec.to_text(signalcodec.encode_signal("signal", signal, SAMPLE_RATE, "float32", "zstd"))
+		candidates["int16+zstd"] = lambda: signalcodec.to_text(signalcodec.encode_signal("signal", signal, SAMPLE_RATE, "int16", "zstd"))
+
+	print(f"{DURATION:.0f} s of signal at {SAMPLE_RATE} Hz")
+	print(f"{'encoding':<20}{'encode ms':>12}{'bytes':>12}{'bytes/s':>12}")
+	for name, encode in candidates.items():
+		seconds = min(timeit.repeat(encode, number=1, repeat=REPEAT))
+		size = len(encode())
+		print(f"{name:<20}{seconds * 1e3:>12.2f}{size:>12}{size / DURATION:>12.0f}")
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,73 @@
+"""Recall of the local tag index pre-filter against selections the LLM made from the full tag list.
+
+Record full-list selections once (calls the navigation model for every query, one query per line):
+
+    python -m tests.benchmarks.bench_tagindex record queries.txt selections.jsonl
+
+then measure which share of them survives the top-K pre-filter:
+
+    python -m tests.benchmarks.bench_tagindex recall selections.jsonl --k 10 20 40 80
+"""
+import argparse
+import json
+import time
+
+TAGS_PATH = "./data/VibLib-VibViz-processed.json"
+
+
+def load_tag_files():
+	with open(TAGS_PATH, "r") as json_file:
+		return json.load(json_file)
+
+
+def record(queries_path, selections_path):
+	from app.langinterface import nav_chatgpt
+
+	tag_files = load_tag_files()
+	with open(queries_path, "r") as queries, open(selections_path, "w") as selections:
+		for query in filter(None, (line.strip() for line in queries)):
+			response = nav_chatgpt(query, tag_files)
+			selections.write(json.dumps({"query": query, "resources": [r.resource for r in response.resources]}) + "\n")
+
+
+def recall(selections_path, ks):
+	from app.tagindex import TagIndex
+
+	tag_files = load_tag_files()
+	start = time.perf_counter()
+	index = TagIndex(tag_files)
+	print(f"Indexed {len(index)} entries, {len(index.vocabulary)} terms in {(time.perf_counter() - start) * 1e3:.1f} ms")
+
+	with open(selections_path, "r") as selections:
+		records = [json.loads(line) for line in selections if line.strip()]
+	full_size = len(json.dumps(tag_files))
+
+	print(f"{'K':>6}{'recall':>10}{'prompt bytes':>14}{'search ms':>11}")
+	for k in ks:
+		found = total = 0
+		start = time.perf_counter()
+		for record in records:
+			candidates = set(index.names[i] for i in index.search(record["query"], k))
+			found += sum(resource in candidates for resource in record["resources"])
+			total += len(record["resources"])
+		search_ms = (time.perf_counter() - start) * 1e3 / max(len(records), 1)
+		size = sum(len(json.dumps(index.top_k(record["query"], k))) for record in records) / max(len(records), 1)
+		print(f"{k:>6}{found / max(total, 1):>10.3f}{size:>14.0f}{search_ms:>11.3f}")
+	print(f"{'all':>6}{1:>10.3f}{full_size:>14}")
+
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+	commands = parser.add_subparsers(dest="command", required=True)
+	record_parser = commands.add_parser("record")
+	record_parser.add_argument("queries")
+	record_parser.add_argument("selections")
+	recall_parser = commands.add_parser("recall")
+	recall_parser.add_argument("selections")
+	recall_parser.add_argument("--k", type=int, nargs="+", default=[10, 20, 40, 80])
+	args = parser.parse_args()
+
+	if args.command == "record":
+		record(args.queries, args.selections)
+	else:
+		recall(args.selections, args.k)
@@ -0,0 +1,37 @@
+"""Prompt size of the navigation tag list: JSON against the compact encodings.
+
+    python -m tests.benchmarks.bench_tagprompt [--k 40]
+"""
+import argparse
+import json
+
+from app.tagindex import TagIndex
+from app.tagprompt import CompactTagList, count_tokens
+
+TAGS_PATH = "./data/VibLib-VibViz-processed.json"
+
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+	parser.add_argument("--k", type=int, nargs="+", default=[0, 40], help="entries in the prompt, 0 for the full library")
+	parser.add_argument("--query", default="a calm heartbeat that slowly fades")
+	args = parser.parse_args()
+
+	with open(TAGS_PATH, "r") as json_file:
+		tag_files = json.load(json_file)
+	index = TagIndex(tag_files)
+
+	print(f"{'entries':>8}  {'encoding':<22}{'bytes':>10}{'tokens':>10}")
+	for k in args.k:
+		entries = index.top_k(args.query, k) if k > 0 else tag_files
+		encodings = {
+			"json": json.dumps(entries),
+			"compact": CompactTagList(entries).text,
+			"compact+vocabulary": CompactTagList(entries, tag_ids=True).text,
+		}
+		for name, text in encodings.items():
+			print(f"{len(entries):>8}  {name:<22}{len(text.encode('utf-8')):>10}{count_tokens(text):>10}")
+
+
+if __name__ == "__main__":
+	main()
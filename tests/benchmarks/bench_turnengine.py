@@ -0,0 +1,73 @@
+"""Wall-clock time of a navigation turn: the blocking pipeline against the async turn engine.
+
+The models are stubs with fixed latencies and the vote loading and database write are simulated
+with sleeps; signal generation, plotting and signal encoding are the real ones.
+
+    python -m tests.benchmarks.bench_turnengine [--turns 10] [--llm 0.8] [--votes 0.3] [--write 0.1]
+"""
+import argparse
+import statistics
+import time
+
+from langchain_core.messages import HumanMessage
+
+import app.langinterface as langinterface
+from app.firebase_users import compress_signal
+from app.genSignal import GenSignalInput, genSignal_direct
+from app.langinterface import anav_chatgpt, chat_chatgpt, nav_chatgpt
+from app.turnengine import TurnEngine
+from app.vizSignal import visSignal_st
+from tests.stubmodels import StubChatModel, fixed, stub_chains
+
+CONVERSATION = [HumanMessage(content="Find a vibration that feels like a cat purring.")]
+
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+	parser.add_argument("--turns", type=int, default=10)
+	parser.add_argument("--llm", type=float, default=0.8, help="seconds per model call")
+	parser.add_argument("--votes", type=float, default=0.3, help="seconds to load the vote copy")
+	parser.add_argument("--write", type=float, default=0.1, help="seconds of the database write")
+	args = parser.parse_args()
+
+	langinterface.llm_cache.mode = "off"
+	chains = stub_chains(StubChatModel(latency=fixed(args.llm)))
+	signal, t, _ = genSignal_direct(GenSignalInput(A=0.8, freq_c=150, dur=3, rhythm=4))
+	prepare = lambda: time.sleep(args.votes)
+
+	def persist():
+		compress_signal("vibration", signal)
+		time.sleep(args.write)
+
+	def blocking_turn():
+		chat_chatgpt(CONVERSATION, chains)
+		prepare()
+		nav_chatgpt("cat purring", "0|purr,soft", chains)
+		visSignal_st(signal, t)
+		persist()
+
+	engine = TurnEngine(chains, prepare)
+
+	async def async_turn():
+		await engine.respond(CONVERSATION)
+		await anav_chatgpt("cat purring", "0|purr,soft", chains)
+		await engine.prepared() # the selection needs the votes
+		await engine.render_and_persist(lambda: visSignal_st(signal, t), persist)
+
+	def timed(turn):
+		times = []
+		for _ in range(args.turns):
+			start = time.perf_counter()
+			turn()
+			times.append(time.perf_counter() - start)
+		return statistics.median(times)
+
+	timed(lambda: engine.run(async_turn())) # warm up the loop and the worker threads
+	blocking = timed(blocking_turn)
+	engine_time = timed(lambda: engine.run(async_turn()))
+	print(f"blocking pipeline: {blocking:.3f}s per turn (median of {args.turns})")
+	print(f"async turn engine: {engine_time:.3f}s per turn ({1 - engine_time / blocking:.0%} faster)")
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,85 @@
+"""Local chat models with injected latency, for tests and benchmarks that must not call a provider."""
+import asyncio
+import random
+import time
+from typing import Any, Callable, Optional
+
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.output_parsers import PydanticOutputParser
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from app.langinterface import LLMChains, LLMNavResponse, LLMResponse, base_prompt, nav_prompt
+
+MODIFY_REPLY = '{"response_msg": "Done.", "approach": {"approach_type": "ModifyApproach", "change_amplitude_factor": 1.5}}'
+NAV_REPLY = '{"resources": [], "features": []}'
+
+
+class RateLimitError(Exception):
+    """What a provider client raises for a 429 response."""
+    status_code = 429
+
+
+def lognormal(median: float, sigma: float, seed: Optional[int] = None) -> Callable[[], float]:
+    """Latency sampler with a long right tail, like provider response times."""
+    rng = random.Random(seed)
+    return lambda: median * rng.lognormvariate(0, sigma)
+
+
+def fixed(seconds: float) -> Callable[[], float]:
+    return lambda: seconds
+
+
+class StubChatModel(BaseChatModel):
+    """Answers every prompt with `reply(messages)` after `latency()` seconds.
+
+    With `max_concurrent` > 0 it behaves like a rate limited provider: requests beyond that many in
+    flight fail with `RateLimitError`.
+    """
+
+    name: str = "stub"
+    reply: Callable[[list[BaseMessage]], str] = lambda messages: MODIFY_REPLY
+    latency: Callable[[], float] = fixed(0.0)
+    max_concurrent: int = 0
+    calls: int = 0
+    cancelled: int = 0
+    rate_limited: int = 0
+    active: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "stub"
+
+    def _result(self, messages: list[BaseMessage]) -> ChatResult:
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.reply(messages)))])
+
+    def _generate(self, messages: list[BaseMessage], stop: Optional[list[str]] = None, run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> ChatResult:
+        self.calls += 1
+        time.sleep(self.latency())
+        return self._result(messages)
+
+    async def _agenerate(self, messages: list[BaseMessage], stop: Optional[list[str]] = None, run_manager: Optional[AsyncCallbackManagerForLLMRun] = None, **kwargs: Any) -> ChatResult:
+        self.calls += 1
+        if self.max_concurrent and self.active >= self.max_concurrent:
+            self.rate_limited += 1
+            raise RateLimitError("429 Too Many Requests")
+        self.active += 1
+        try:
+            await asyncio.sleep(self.latency())
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        finally:
+            self.active -= 1
+        return self._result(messages)
+
+
+def stub_chains(model: StubChatModel, nav_reply: str = NAV_REPLY) -> LLMChains:
+    """Chains shaped like the production ones: the stub's JSON reply is parsed into the response models."""
+    nav_model = StubChatModel(name=model.name, latency=model.latency, max_concurrent=model.max_concurrent, reply=lambda messages: nav_reply)
+    return LLMChains(
+        base_chain=base_prompt | model | PydanticOutputParser(pydantic_object=LLMResponse),
+        nav_chain=nav_prompt | nav_model | PydanticOutputParser(pydantic_object=LLMNavResponse),
+        model_name=model.name,
+    )
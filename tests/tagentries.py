@@ -0,0 +1,8 @@
+"""A small tag library shared by the tag index and navigation prompt tests."""
+
+ENTRIES = [
+    {"resource": "v-01", "sensory": ["smooth", "weak"], "emotional": ["calm"], "metaphor": ["purring cat"]},
+    {"resource": "v-02", "sensory": ["rough", "strong"], "emotional": ["alarming"], "usage": ["incoming call"]},
+    {"resource": "v-03", "sensory": ["tapping", "regular"], "metaphor": ["heartbeat"], "usage": ["timer"]},
+    {"resource": "v-04", "sensory": ["tapping", "irregular", "fast"], "metaphor": ["knocking on a door"]},
+]
@@ -0,0 +1,4 @@
+import os
+
+# langinterface refuses to import without an API key; unit tests never call a model
+os.environ.setdefault("OPENAI_API_KEY", "unit-test")
@@ -0,0 +1,56 @@
+import copy
+
+
+class FakeReference:
+	def __init__(self, database, path):
+		self.database = database
+		self.path = [key for key in path.strip("/").split("/") if key]
+
+	def get(self, shallow=False):
+		self.database.reads.append("/".join(self.path))
+		node = self.database.root
+		for key in self.path:
+			if not isinstance(node, dict) or key not in node:
+				return None
+			node = node[key]
+		if shallow and isinstance(node, dict):
+			return {key: True for key in node}
+		return copy.deepcopy(node)
+
+	def set(self, value):
+		self.database.writes.append(("set", "/".join(self.path)))
+		self.database.write(self.path, value)
+
+	def update(self, value):
+		self.database.writes.append(("update", "/".join(self.path)))
+		for key, child in value.items():
+			self.database.write(self.path + key.strip("/").split("/"), child)
+
+	def child(self, key):
+		return FakeReference(self.database, "/".join(self.path + [key]))
+
+
+class FakeDatabase:
+	"""In-memory stand-in for `firebase_admin.db` with Realtime Database path semantics."""
+
+	def __init__(self):
+		self.root = {}
+		self.reads = []
+		self.writes = []
+
+	def reference(self, path="/"):
+		return FakeReference(self, path)
+
+	def write(self, path, value):
+		if isinstance(value, list):
+			value = {str(i): v for i, v in enumerate(value)}
+		value = copy.deepcopy(value)
+		node = self.root
+		for key in path[:-1]:
+			node = node.setdefault(key, {})
+		if isinstance(value, dict) and ".sv" in value:
+			value = (node.get(path[-1]) or 0) + value[".sv"]["increment"]
+		if value is None:
+			node.pop(path[-1], None)
+		else:
+			node[path[-1]] = value
@@ -0,0 +1,66 @@
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+
+import app.tagprompt as tagprompt
+from app.contextwindow import ContextWindow, message_tokens
+from app.genSignal import GenSignalInput
+
+
+@pytest.fixture(autouse=True)
+def offline_token_counts(monkeypatch):
+	monkeypatch.setattr(tagprompt, "_encoding", lambda model: None)
+
+
+def _session(turns):
+	conversation = []
+	for i in range(turns):
+		conversation.append(HumanMessage(content=f"Turn {i}: make the vibration feel a little more like rain on a window, please."))
+		conversation.append(AIMessage(content=f"Reply {i}: I adjusted the frequency and the rhythm so it resembles light rain tapping on glass."))
+	return conversation
+
+
+def test_short_conversations_are_sent_unchanged():
+	conversation = _session(3)
+	assert ContextWindow(budget=1000).build(conversation) == conversation
+
+
+def test_prompt_stays_under_budget_over_a_long_session():
+	window = ContextWindow(budget=400, summary_budget=100)
+	params = GenSignalInput(A=0.5, freq_c=120, dur=2, rhythm=3)
+	sizes = []
+	for turns in range(1, 51):
+		conversation = _session(turns)[:-1] # ends with the user's request
+		messages = window.build(conversation, params)
+		assert messages[-1] == conversation[-1] and messages[1 if window.folded else 0].type == "human"
+		sizes.append(message_tokens(messages))
+
+	assert max(sizes) <= 400 and window.folded > 0
+	assert '"freq_c": 120' in messages[0].content
+
+
+def test_summary_states_where_the_current_vibration_came_from():
+	window = ContextWindow(budget=300, summary_budget=100)
+	conversation = _session(20)[:-1]
+	params = GenSignalInput(A=0.5, freq_c=120, dur=2, rhythm=3)
+
+	summary = window.build(conversation, params, "the library vibration v-07, found by navigation")[0].content
+	assert "The current vibration is the library vibration v-07" in summary
+	assert "The last generated vibration used these parameters" in summary and "current vibration was generated" not in summary
+	assert "current vibration" not in window.build(conversation)[0].content
+
+
+def test_summary_is_reused_until_the_window_moves():
+	calls = []
+
+	def summarize(summary, messages):
+		calls.append(len(messages))
+		return summary + "x"
+
+	window = ContextWindow(budget=300, summary_budget=50, summarize=summarize)
+	conversation = _session(12)
+	first = window.build(conversation[:-1])
+	second = window.build(conversation + [HumanMessage(content="again")])
+	assert len(calls) == 1 and first[0] == second[0]
+
+	window.build([HumanMessage(content="a new session")]) # an unrelated conversation starts over
+	assert window.folded == 0
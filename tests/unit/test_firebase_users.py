@@ -0,0 +1,109 @@
+import numpy as np
+import pytest
+
+import app.firebase_users as firebase_users
+from app.timebase import TimeBase
+from fake_firebase import FakeDatabase
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+	database = FakeDatabase()
+	monkeypatch.setattr(firebase_users, "db", database)
+	monkeypatch.setattr(firebase_users, "CH_DISABLE_FIREBASE", False)
+	monkeypatch.setattr(firebase_users, "CH_FIREBASE_WRITE_BEHIND", False)
+	monkeypatch.setattr(firebase_users, "DB_write", ["study", "all"])
+	monkeypatch.setattr(firebase_users, "_conversation_lengths", {})
+	return database
+
+
+def test_update_conversation_appends(fake_db):
+	fake_db.write(["study", "user", "conversation"], [{"role": "user", "content": "earlier"}])
+
+	for i in range(3):
+		firebase_users.update_conversation("user", {"role": "user", "content": f"message {i}"})
+
+	# one shallow read per conversation, then one multi-path write per message
+	assert len(fake_db.reads) == 2
+	assert fake_db.writes == [("update", "")] * 3
+	assert [m["content"] for m in firebase_users.read_conversation("user", "study")] == ["earlier", "message 0", "message 1", "message 2"]
+	assert [m["content"] for m in firebase_users.read_conversation("user", "all")] == ["message 0", "message 1", "message 2"]
+
+
+def test_read_conversation_defaults_to_the_written_study(fake_db, monkeypatch):
+	monkeypatch.setattr(firebase_users, "DB_read", "previous")
+	fake_db.write(["previous", "user", "conversation"], [{"role": "user", "content": "previous study"}])
+
+	firebase_users.update_conversation("user", {"role": "user", "content": "current study"})
+
+	assert [m["content"] for m in firebase_users.read_conversation("user")] == ["current study"]
+
+
+def test_conversation_messages_orders_entries():
+	assert firebase_users.conversation_messages(None) == []
+	assert firebase_users.conversation_messages([{"i": 0}, None, {"i": 2}]) == [{"i": 0}, {"i": 2}]
+	assert firebase_users.conversation_messages({"10": {"i": 10}, "2": {"i": 2}}) == [{"i": 2}, {"i": 10}]
+	assert firebase_users.conversation_messages({"role": "user"}) == [{"role": "user"}]
+
+
+def test_write_behind_commits_one_batch(fake_db, monkeypatch):
+	monkeypatch.setattr(firebase_users, "CH_FIREBASE_WRITE_BEHIND", True)
+	monkeypatch.setattr(firebase_users, "firebase_writer", firebase_users.WriteBehindQueue(firebase_users._commit_writes))
+
+	firebase_users.update_data("user", "vibration_1", {"rating": 0, "resource": "v-01"})
+	firebase_users.update_rating("user", "vibration_1", {"rating": 1})
+	assert firebase_users.flush_writes(timeout=5)
+
+	assert all(write == ("update", "") for write in fake_db.writes)
+	assert fake_db.root["study"]["user"]["vibration"]["vibration_1"] == {"rating": 1, "resource": "v-01"}
+	assert fake_db.root["all"]["user"]["vibration"]["vibration_1"] == {"rating": 1, "resource": "v-01"}
+
+
+def test_signal_upload_is_one_multi_path_write(fake_db):
+	signal = np.sin(np.linspace(0, 1, 100))
+	t = TimeBase(10000, 100)
+
+	firebase_users.update_signal_data("user", {"resource": "v-01"}, signal, t, 4)
+
+	assert fake_db.writes == [("update", "")]
+	for DB in ["study", "all"]:
+		vibration = fake_db.root[DB]["user"]["vibration"]["vibration_4"]
+		assert vibration["resource"] == "v-01" and vibration["rating"] == 0
+		assert np.allclose(firebase_users.decompress_data(vibration["signal"])["signal"], signal, atol=1e-6)
+		assert "t" not in vibration and TimeBase(**vibration["time_base"]) == t
+
+
+def test_votes_increment_only_their_counters(fake_db):
+	record = {"resource": "v-01", "feature": "['Feature: smooth', 'rough']", "change": "['freq_c', 'increase', 'POSITIVE']"}
+	for DB in ["study", "all"]:
+		fake_db.write([DB, "user", "vibration", "vibration_1"], record)
+	fake_db.write(["vote-feature_study", "smooth", "v-01"], {"THUMBS_UP": 3, "THUMBS_DOWN": 1})
+	fake_db.write(["vote-feature_study", "other", "v-02"], {"THUMBS_UP": 7, "THUMBS_DOWN": 7})
+	fake_db.reads.clear()
+
+	firebase_users.update_vibration_rating("user", "feature", "vibration_1", 1, 1)
+	firebase_users.update_vibration_rating("user", "feature", "vibration_1", 2, -1) # changed to thumbs down
+
+	# only the vibration records are read, never the vote trees
+	assert all("/vibration/" in path for path in fake_db.reads)
+	votes = fake_db.root["vote-feature_study"]
+	assert votes["smooth"]["v-01"] == {"THUMBS_UP": 3, "THUMBS_DOWN": 2}
+	assert votes["rough"]["v-01"] == {"THUMBS_UP": 0, "THUMBS_DOWN": 1}
+	assert votes["other"]["v-02"] == {"THUMBS_UP": 7, "THUMBS_DOWN": 7}
+	assert fake_db.root["vibration_all"]["approach-navigation"]["v-01"]["navigation"] == {"THUMBS_UP": 0, "THUMBS_DOWN": 1}
+	assert fake_db.root["vote-change_study"]["freq_c"]["increase"] == {
+		"POSITIVE": {"THUMBS_UP": 0, "THUMBS_DOWN": 1},
+		"NEGATIVE": {"THUMBS_UP": 0, "THUMBS_DOWN": 0},
+		"NONE": {"THUMBS_UP": 0, "THUMBS_DOWN": 0},
+	}
+
+
+def test_votes_with_the_session_record_skip_the_read_back(fake_db, monkeypatch):
+	flushes = []
+	monkeypatch.setattr(firebase_users, "flush_writes", lambda timeout=None: flushes.append(1))
+	record = {"resource": "v-01", "feature": ["Feature: smooth"]}
+
+	firebase_users.update_vibration_rating("user", "feature", "vibration_1", 1, 1, record)
+
+	assert flushes == [] and fake_db.reads == [] # not even another session's queued writes are waited for
+	assert fake_db.root["vote-feature_study"]["smooth"]["v-01"] == {"THUMBS_UP": 1, "THUMBS_DOWN": 0}
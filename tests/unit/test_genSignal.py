@@ -0,0 +1,98 @@
+import io
+import wave
+
+import numpy as np
+import pytest
+
+from app.exportSignal import write_wav
+from app.genSignal import AmplitudeEnvelopeType, GAIN, GenSignalInput, SAMPLE_RATE, genSignal_batch, genSignal_cached, genSignal_direct, genSignal_stream, signal_cache, signal_length
+from app.timebase import TimeBase
+
+
+def _parameter_sweep():
+	return [
+		GenSignalInput(A=0.3, A_W_option=A_W_option, A_E_option=A_E_option, freq_c=180, freq_e=freq_e, dur=dur, rhythm=rhythm)
+		for A_W_option in AmplitudeEnvelopeType
+		for A_E_option in AmplitudeEnvelopeType
+		for freq_e, dur, rhythm in [(0, 2, 1), (0, 1.2345, 3), (7, 0.5, 7)]
+	]
+
+
+def test_rhythm_envelope():
+	signal, t, dur = genSignal_direct(GenSignalInput(A=1, dur=1, rhythm=4, freq_c=250))
+	pulse_length = SAMPLE_RATE // 8
+
+	assert signal.shape == (1, SAMPLE_RATE) and len(t) == SAMPLE_RATE and dur == 1
+	for pulse in range(4):
+		start = 2 * pulse * pulse_length
+		assert np.any(signal[0, start:start + pulse_length] != 0)
+		assert np.all(signal[0, start + pulse_length:start + 2 * pulse_length] == 0)
+
+
+def test_batch_matches_direct():
+	gsis = _parameter_sweep()
+	data, lengths, durations = genSignal_batch(gsis)
+
+	assert data.shape == (len(gsis), max(lengths))
+	for i, gsi in enumerate(gsis):
+		signal, t, dur = genSignal_direct(gsi)
+		assert lengths[i] == signal.shape[1] and durations[i] == dur
+		assert np.allclose(data[i, :lengths[i]], signal[0])
+		assert not np.any(data[i, lengths[i]:])
+
+
+def test_cached_signals_are_shared_and_read_only():
+	signal_cache.clear()
+	gsi = GenSignalInput(A=0.4, dur=0.5, rhythm=2)
+
+	signal, t, dur = genSignal_cached(gsi)
+	again, _, _ = genSignal_cached(GenSignalInput(A=0.4, dur=0.5, rhythm=2.0, freq_c=200.0))
+
+	assert again is signal and len(signal_cache) == 1
+	assert not signal.flags.writeable and t == TimeBase(SAMPLE_RATE, len(signal[0]))
+	assert np.array_equal(signal, genSignal_direct(gsi)[0])
+
+
+def test_stream_matches_direct():
+	for gsi in _parameter_sweep():
+		signal, _, _ = genSignal_direct(gsi)
+		chunks = list(genSignal_stream(gsi, chunk_size=777))
+
+		assert all(len(chunk) <= 777 for chunk in chunks)
+		assert sum(len(chunk) for chunk in chunks) == signal_length(gsi)
+		assert np.allclose(np.concatenate(chunks), signal[0])
+
+
+def test_write_wav_from_stream():
+	gsi = GenSignalInput(A=1, dur=0.3, rhythm=3)
+	buffer = io.BytesIO()
+
+	assert write_wav(buffer, genSignal_stream(gsi, chunk_size=1000)) == signal_length(gsi)
+
+	buffer.seek(0)
+	with wave.open(buffer, "rb") as wav_file:
+		frames = np.frombuffer(wav_file.readframes(wav_file.getnframes()), dtype=np.int16)
+	assert np.allclose(frames / 32767, genSignal_direct(gsi)[0][0] / GAIN, atol=1e-4)
+
+
+def test_float32_matches_float64():
+	gsis = _parameter_sweep() + [GenSignalInput(A=1, A_W_option="INCREASE", freq_c=500, freq_e=499, dur=30, rhythm=20)]
+	tolerance = 1e-6 * GAIN
+
+	for gsi in gsis:
+		signal32, t32, _ = genSignal_direct(gsi, dtype=np.float32)
+		signal64, t64, _ = genSignal_direct(gsi, dtype=np.float64)
+
+		assert signal32.dtype == np.float32 and t32 == t64
+		assert np.max(np.abs(signal32 - signal64), initial=0) <= tolerance
+
+	data32, _, _ = genSignal_batch(gsis, dtype=np.float32)
+	data64, _, _ = genSignal_batch(gsis, dtype=np.float64)
+	assert data32.dtype == np.float32 and np.max(np.abs(data32 - data64)) <= tolerance
+
+
+def test_time_base_matches_linspace():
+	t = TimeBase.spanning(1.5, 12345)
+	assert np.allclose(t.expand(np.float64), np.linspace(0, 1.5, 12345, endpoint=False))
+	assert t.duration == pytest.approx(1.5) and t.end == pytest.approx(1.5 - 1.5 / 12345)
+	assert len(t.head(100)) == 100 and len(t.head(10**6)) == 12345
@@ -0,0 +1,56 @@
+import asyncio
+
+import pytest
+from langchain_core.messages import HumanMessage
+
+import app.langinterface as langinterface
+from app.hedging import LatencyStats
+from app.langinterface import LLMResponse, chat_chatgpt, hedged_chains, nav_chatgpt
+from tests.stubmodels import StubChatModel, fixed, stub_chains
+
+
+@pytest.fixture(autouse=True)
+def no_cache(monkeypatch):
+	monkeypatch.setattr(langinterface.llm_cache, "mode", "off")
+
+
+def _hedged(primary, secondary, delay):
+	stats = LatencyStats(report_every=0)
+	return hedged_chains(stub_chains(primary), stub_chains(secondary), delay, stats), stats
+
+
+def test_fast_primary_never_sends_the_secondary():
+	primary, secondary = StubChatModel(name="a", latency=fixed(0.01)), StubChatModel(name="b", latency=fixed(0.01))
+	chains, stats = _hedged(primary, secondary, delay=0.5)
+
+	response = chat_chatgpt([HumanMessage(content="Make it stronger.")], chains)
+	assert isinstance(response, LLMResponse) and response.approach.change_amplitude_factor == 1.5
+	assert secondary.calls == 0 and stats.winners == {"a": 1} and stats.hedged == 0
+
+
+def test_slow_primary_loses_and_is_cancelled():
+	primary, secondary = StubChatModel(name="a", latency=fixed(5)), StubChatModel(name="b", latency=fixed(0.01))
+	chains, stats = _hedged(primary, secondary, delay=0.05)
+
+	response = chat_chatgpt([HumanMessage(content="Make it stronger.")], chains)
+	assert response.response_msg == "Done."
+	assert stats.winners == {"b": 1} and stats.hedged == 1 and primary.cancelled == 1
+	assert 0.05 <= stats.percentiles(50)[0] < 1
+
+
+def test_invalid_response_waits_for_the_other_chain():
+	primary = StubChatModel(name="a", latency=fixed(0.01), reply=lambda messages: '{"approach": {"approach_type": "Nope"}}')
+	secondary = StubChatModel(name="b", latency=fixed(0.1))
+	chains, stats = _hedged(primary, secondary, delay=0)
+
+	assert chat_chatgpt([HumanMessage(content="Make it stronger.")], chains).response_msg == "Done."
+	assert stats.winners == {"b": 1}
+	assert nav_chatgpt("calm", "0|smooth", chains).resources == []
+
+
+def test_both_invalid_raises():
+	bad = lambda messages: "not json"
+	chains, stats = _hedged(StubChatModel(name="a", reply=bad), StubChatModel(name="b", reply=bad), delay=0)
+	with pytest.raises(Exception):
+		asyncio.run(chains.base_chain.ainvoke({"conversation": [HumanMessage(content="hi")]}))
+	assert stats.failures == 1
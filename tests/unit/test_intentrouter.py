@@ -0,0 +1,79 @@
+import pytest
+
+from app.intentrouter import IntentRouter, route_modify
+from app.langinterface import LLMResponse
+
+
+@pytest.mark.parametrize("text, field, value", [
+	("Make the vibration stronger.", "change_amplitude_factor", 1.5),
+	("It's too weak", "change_amplitude_factor", 1.8),
+	("Reduce the vibration a bit", "change_amplitude_factor", 0.6),
+	("Too intense!", "change_amplitude_factor", 0.4),
+	("Make it slower", "time_stretch_factor", 1.3),
+	("The tempo is too fast", "time_stretch_factor", 1.5),
+	("Extend the duration two times", "time_stretch_factor", 2.0),
+	("Speed up", "time_stretch_factor", 0.7),
+	("Reduce the duration a bit", "time_stretch_factor", 0.8),
+	("Keep only the first half", "truncate_or_extend_signal_factor", 0.5),
+	("Cut off the last quarter", "truncate_or_extend_signal_factor", 0.75),
+	("Loop it", "truncate_or_extend_signal_factor", 2.0),
+	("Loop the vibration 4 times", "truncate_or_extend_signal_factor", 4.0),
+	("Flip it", "reverse_signal", True),
+	("Can you reverse it", "reverse_signal", True),
+	("Please make the vibration softer a bit", "change_amplitude_factor", 0.6),
+	("Loop it 10 times", "truncate_or_extend_signal_factor", 10.0),
+])
+def test_prompt_examples_are_routed(text, field, value):
+	response = route_modify(text)
+	assert response is not None and response.approach.approach_type == "ModifyApproach" and response.response_msg
+	assert getattr(response.approach, field) == pytest.approx(value)
+	assert [name for name, v in response.approach.dict().items() if v is not None] == ["approach_type", field]
+
+
+@pytest.mark.parametrize("text", [
+	"Create a vibration that feels like walking",
+	"Make it stronger and slower",
+	"Make it stronger, then loop it",
+	"Make it 200 Hz",
+	"Find a vibration like a cat purring",
+	"Loop it and make it stronger",
+	"Hello!",
+	"Don't make it stronger",
+	"Not faster please",
+	"Can you reverse the last change?",
+	"Why is it backwards?",
+	"Can you repeat what you said?",
+	"The first half was better",
+	"Loop it 0 times",
+	"Extend the duration 0 times",
+	"Loop the vibration 4.5.6 times",
+	"Loop it 1000 times",
+	"Can you reverse it?",
+	"Is the first one stronger?",
+	"Which one is stronger?",
+	"I want a slower heartbeat",
+	"I liked the faster one",
+	"Make it harder to notice",
+	"Make the vibration 3 times stronger",
+	"Use the first half of the second vibration",
+	"Slow down the first half",
+	"Stronger than before",
+])
+def test_everything_else_falls_through(text):
+	assert route_modify(text) is None
+
+
+def test_router_counts_hits_and_misses():
+	router = IntentRouter(report_every=0)
+	llm = LLMResponse(response_msg="from the llm")
+	calls = []
+
+	def fallback():
+		calls.append(1)
+		return llm
+
+	assert router.respond("Make it stronger", True, fallback).approach.change_amplitude_factor == 1.5
+	assert router.respond("Make it stronger", False, fallback) is llm # nothing to modify yet
+	assert router.respond("Generate a heartbeat", True, fallback) is llm
+	assert len(calls) == 2 and router.hits == 1 and router.misses == 2 and router.hit_rate == pytest.approx(1 / 3)
+	assert "1/3" in router.report()
@@ -0,0 +1,88 @@
+import asyncio
+import threading
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.runnables import RunnableLambda
+
+import app.langinterface as langinterface
+from app.langinterface import LLMChains, LLMNavResponse, LLMResponse, ModifyApproach, chat_chatgpt, nav_chatgpt
+from app.llmcache import LLMCacheMiss, LLMResponseCache
+
+
+def _stub_chains(calls):
+	def base(inputs):
+		calls.append(inputs)
+		return LLMResponse(response_msg="ok", approach=ModifyApproach(approach_type="ModifyApproach", change_amplitude_factor=2.0))
+
+	def nav(inputs):
+		calls.append(inputs)
+		return LLMNavResponse(resources=[], features=[])
+
+	return LLMChains(RunnableLambda(base), RunnableLambda(nav), model_name="stub")
+
+
+@pytest.fixture
+def cache(monkeypatch, tmp_path):
+	cache = LLMResponseCache("on", str(tmp_path / "llm.sqlite"))
+	monkeypatch.setattr(langinterface, "llm_cache", cache)
+	return cache
+
+
+def test_repeated_requests_hit_the_cache(cache):
+	calls = []
+	chains = _stub_chains(calls)
+
+	first = chat_chatgpt([HumanMessage(content="Make it  stronger.")], chains)
+	first.approach.change_amplitude_factor = 10 # callers may modify their copy
+	again = chat_chatgpt([HumanMessage(content="Make it stronger. ")], chains)
+	chat_chatgpt([HumanMessage(content="Make it stronger."), AIMessage(content="Done."), HumanMessage(content="Again.")], chains)
+	nav_chatgpt("calm  purr", "0|smooth", chains)
+	nav_chatgpt("calm purr", "0|smooth", chains)
+
+	assert len(calls) == 3 and cache.hits == 2
+	assert again.approach.change_amplitude_factor == 2.0
+
+
+def test_disk_tier_replays_without_the_model(cache, tmp_path, monkeypatch):
+	calls = []
+	nav_chatgpt("calm purr", "0|smooth", _stub_chains(calls))
+
+	replay = LLMResponseCache("replay", str(tmp_path / "llm.sqlite"))
+	monkeypatch.setattr(langinterface, "llm_cache", replay)
+	assert isinstance(nav_chatgpt("calm purr", "0|smooth", _stub_chains(calls)), LLMNavResponse)
+	with pytest.raises(LLMCacheMiss):
+		nav_chatgpt("rough buzz", "0|smooth", _stub_chains(calls))
+	assert len(calls) == 1
+
+
+def test_ttl_and_size_limits(tmp_path):
+	cache = LLMResponseCache("on", str(tmp_path / "llm.sqlite"), max_entries=2, max_rows=3, ttl=60)
+	for i in range(5):
+		cache.put(str(i), LLMResponse(response_msg=str(i)))
+
+	assert len(cache._memory) == 2
+	assert cache._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0] == 3
+	assert cache.get("0", LLMResponse) is None and cache.get("4", LLMResponse).response_msg == "4"
+
+	cache.ttl = 1e-9
+	assert cache.get("4", LLMResponse) is None
+
+
+def test_async_lookups_do_not_touch_sqlite_on_the_event_loop(cache, monkeypatch):
+	threads = []
+	for name in ("get", "put"):
+		method = getattr(cache, name)
+		monkeypatch.setattr(cache, name, lambda *args, method=method: (threads.append(threading.current_thread()), method(*args))[1])
+
+	async def call():
+		return LLMResponse(response_msg="ok")
+
+	async def main():
+		first = await cache.aget_or_call("key", LLMResponse, call)
+		second = await cache.aget_or_call("key", LLMResponse, call)
+		return first, second, threading.current_thread()
+
+	first, second, loop_thread = asyncio.run(main())
+	assert first.response_msg == second.response_msg == "ok" and cache.hits == 1
+	assert len(threads) == 3 and loop_thread not in threads
@@ -0,0 +1,73 @@
+import asyncio
+
+import pytest
+
+from app.langinterface import LLMResponse
+from app.llmgateway import LLMGateway, Priority
+from tests.stubmodels import RateLimitError
+
+
+def test_concurrency_is_capped_and_interactive_goes_first():
+	gateway = LLMGateway(max_concurrency=2, report_every=0)
+	running, peak, order = [0], [0], []
+
+	async def call(name):
+		running[0] += 1
+		peak[0] = max(peak[0], running[0])
+		await asyncio.sleep(0.02)
+		running[0] -= 1
+		order.append(name)
+		return name
+
+	async def main():
+		first = [asyncio.ensure_future(gateway.submit(None, lambda i=i: call(f"first{i}"))) for i in range(2)]
+		await asyncio.sleep(0.005) # the first two hold both slots
+		queued = [asyncio.ensure_future(gateway.submit(None, lambda: call("background"), Priority.BACKGROUND))]
+		queued += [asyncio.ensure_future(gateway.submit(None, lambda: call("interactive")))]
+		await asyncio.sleep(0.005)
+		depth = gateway.queue_depth
+		await asyncio.gather(*first, *queued)
+		return depth
+
+	assert asyncio.run(main()) == 2
+	assert peak[0] == 2 and order.index("interactive") < order.index("background")
+	assert gateway.stats.max_queue_depth == 2 and len(gateway.stats.waits) == 4 and gateway.in_flight == 0
+
+
+def test_identical_requests_in_flight_are_sent_once():
+	gateway = LLMGateway(report_every=0)
+	calls = []
+
+	async def call():
+		calls.append(1)
+		await asyncio.sleep(0.02)
+		return LLMResponse(response_msg="shared")
+
+	async def main():
+		return await asyncio.gather(*(gateway.submit("same", call) for _ in range(5)), gateway.submit("other", call))
+
+	responses = asyncio.run(main())
+	assert len(calls) == 2 and gateway.stats.coalesced == 4
+	assert all(r.response_msg == "shared" for r in responses) and len({id(r) for r in responses}) == 6 # copies
+
+
+def test_rate_limits_halve_the_limit_and_are_retried():
+	gateway = LLMGateway(max_concurrency=8, backoff=0.001, report_every=0)
+	attempts = []
+
+	async def call():
+		attempts.append(1)
+		if len(attempts) <= 2:
+			raise RateLimitError()
+		return "ok"
+
+	assert asyncio.run(gateway.submit(None, call)) == "ok"
+	assert len(attempts) == 3 and gateway.stats.rate_limited == 2 and 2 < gateway.limit < 3
+
+	gateway = LLMGateway(max_retries=0, report_every=0)
+	with pytest.raises(RateLimitError):
+		asyncio.run(gateway.submit(None, lambda: _raise(RateLimitError())))
+
+
+async def _raise(error):
+	raise error
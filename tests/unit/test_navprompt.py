@@ -0,0 +1,26 @@
+from app.langinterface import nav_candidates, nav_prompt, nav_prompt_prefix, prompt_prefix_hash
+from app.tagindex import TagIndex
+from app.tagprompt import CompactTagList
+from tests.tagentries import ENTRIES
+
+
+def _messages(index, tag_list, query):
+	return nav_prompt.format_messages(input_query=query, candidates=nav_candidates(sorted(index.search(query, 2))), tag_list=tag_list)
+
+
+def test_prefix_is_the_same_for_different_queries():
+	index = TagIndex(ENTRIES)
+	tag_list = CompactTagList(ENTRIES).text
+	calm, alarm = _messages(index, tag_list, "a calm purr like a cat"), _messages(index, tag_list, "an alarming incoming call")
+
+	assert calm[-1].content != alarm[-1].content # the candidates differ ...
+	assert [m.content for m in calm[:-1]] == [m.content for m in alarm[:-1]] # ... but not the system messages before them
+	assert prompt_prefix_hash(calm[:-1]) == prompt_prefix_hash(nav_prompt_prefix(tag_list))
+
+
+def test_query_comes_last():
+	messages = nav_prompt.format_messages(input_query="a calm purr", candidates=nav_candidates([0, 3]), tag_list="0|smooth")
+	assert [m.type for m in messages] == ["system", "system", "human"]
+	assert messages[:-1] == nav_prompt_prefix("0|smooth")
+	assert messages[-1].content.startswith("Resources that most likely match (TAG_LIST ids): 0,3") and messages[-1].content.endswith("a calm purr")
+	assert nav_candidates([]) == ""
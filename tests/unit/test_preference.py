@@ -0,0 +1,90 @@
+import random
+import timeit
+
+import numpy as np
+import pytest
+
+from app.preference import PreferenceMatrix
+
+
+def _legacy_probabilities(current_data, resourceLists, featureLists, importanceLists, min_clip):
+	"""Scoring of the former dict-based read_nav_rating."""
+	importance = dict(zip(featureLists, importanceLists))
+	p_soft = {}
+	for feature in featureLists:
+		p_soft[feature] = {resource: 0 for resource in resourceLists}
+		if feature not in current_data:
+			continue
+		p_clip = {}
+		for resource in resourceLists:
+			votes = current_data[feature].get(resource)
+			if votes is None:
+				p_clip[resource] = 0
+				continue
+			total = votes["THUMBS_UP"] + votes["THUMBS_DOWN"]
+			p_org = votes["THUMBS_UP"] / total if total > 0 else 0
+			p_clip[resource] = min_clip if votes["THUMBS_DOWN"] == 0 and total > 0 else p_org
+		total_softs = sum(np.exp(p_clip[resource]) for resource in resourceLists)
+		for resource in resourceLists:
+			p_soft[feature][resource] = np.exp(p_clip[resource]) / total_softs
+	scores = {resource: 0 for resource in resourceLists}
+	for feature in featureLists:
+		for resource in resourceLists:
+			scores[resource] += importance[feature] * p_soft[feature][resource]
+	total = sum(scores.values())
+	return {resource: score / total for resource, score in scores.items()}
+
+
+def _random_votes(rng, features, resources):
+	return {
+		feature: {resource: {"THUMBS_UP": rng.randint(0, 3), "THUMBS_DOWN": rng.randint(0, 3)} for resource in resources if rng.random() < 0.7}
+		for feature in features
+	}
+
+
+def test_matches_legacy_scoring():
+	rng = random.Random(0)
+	features = [f"feature_{i}" for i in range(8)]
+	resources = [f"v-{i:02d}" for i in range(30)]
+	votes = _random_votes(rng, features, resources)
+	matrix = PreferenceMatrix("vote-feature_study")
+	matrix.load(votes)
+
+	for _ in range(20):
+		queried_resources = rng.sample(resources, 5)
+		queried_features = rng.sample(features + ["unvoted"], 3)
+		importances = [rng.random() for _ in queried_features]
+
+		expected = _legacy_probabilities(votes, queried_resources, queried_features, importances, 0.01)
+		actual = matrix.resource_probabilities(queried_resources, queried_features, importances, 0.01)
+		assert actual == pytest.approx(expected)
+
+
+def test_listener_events_update_counts():
+	matrix = PreferenceMatrix("vote-feature_study")
+	matrix.apply("put", "/", {"smooth": {"v-01": {"THUMBS_UP": 1, "THUMBS_DOWN": 0}}})
+	matrix.apply("put", "/smooth/v-01/THUMBS_DOWN", 2)
+	matrix.apply("patch", "/", {"rough/v-02/THUMBS_UP": 5, "rough/v-02/THUMBS_DOWN": 0})
+	matrix.apply("put", "/smooth/v-03", {"THUMBS_UP": 4, "THUMBS_DOWN": 4})
+
+	up, down, present = matrix.counts(["smooth", "rough", "unknown"], ["v-01", "v-02", "v-03", "v-99"])
+	assert up.tolist() == [[1, 0, 4, 0], [0, 5, 0, 0], [0, 0, 0, 0]]
+	assert down.tolist() == [[2, 0, 4, 0], [0, 0, 0, 0], [0, 0, 0, 0]]
+	assert present.tolist() == [True, True, False]
+
+	matrix.apply("put", "/rough", None)
+	assert matrix.counts(["rough"], ["v-02"])[2].tolist() == [False]
+
+
+def test_scoring_does_not_read_the_database():
+	matrix = PreferenceMatrix("vote-feature_study")
+	matrix.load(_random_votes(random.Random(1), [f"feature_{i}" for i in range(50)], [f"v-{i:03d}" for i in range(300)]))
+	matrix._listener = object() # a listener keeps the copy current
+
+	class NoDatabase:
+		def reference(self, path):
+			raise AssertionError("navigation must not read the database")
+
+	matrix.ensure_current(NoDatabase())
+	seconds = min(timeit.repeat(lambda: matrix.resource_probabilities(["v-001", "v-002", "v-003"], ["feature_1", "feature_2"], [0.7, 0.3]), number=100, repeat=5)) / 100
+	assert seconds < 1e-3
@@ -0,0 +1,67 @@
+import asyncio
+
+import pytest
+from langchain_core.exceptions import OutputParserException
+from langchain_core.messages import AIMessage
+from langchain_core.pydantic_v1 import ValidationError
+from langchain_core.runnables import RunnableLambda
+
+from app.genSignal import AmplitudeEnvelopeType
+from app.langinterface import GenerationApproach, LLMResponse, ModifyApproach
+from app.repair import RepairStats, StructuredOutputRepair, coerce, match_choice
+
+
+def _output(args):
+	"""What `with_structured_output(LLMResponse, include_raw=True)` returns for tool arguments `args`."""
+	raw = AIMessage(content="", tool_calls=[{"name": "LLMResponse", "args": args, "id": "call"}])
+	try:
+		return {"raw": raw, "parsed": LLMResponse.parse_obj(args), "parsing_error": None}
+	except ValidationError as e:
+		return {"raw": raw, "parsed": None, "parsing_error": e}
+
+
+def test_out_of_range_parameters_are_clamped():
+	args = {"approach": {"approach_type": "GenerationApproach", "generation_parameters": {"A": 1.5, "freq_c": 1000, "dur": -1, "rhythm": 25.4, "A_W_option": "increase and decrease"}}}
+	response = LLMResponse.parse_obj(coerce(args, LLMResponse))
+	params = response.approach.generation_parameters
+	assert (params.A, params.freq_c, params.dur, params.rhythm) == (1, 500, 0, 20)
+	assert params.A_W_option == AmplitudeEnvelopeType.INCREASE_DECREASE
+
+
+def test_discriminator_is_filled_in():
+	assert isinstance(LLMResponse.parse_obj(coerce({"approach": {"approach_type": "modify", "reverse_signal": True}}, LLMResponse)).approach, ModifyApproach)
+	assert isinstance(LLMResponse.parse_obj(coerce({"approach": {"generation_parameters": {"dur": 3}}}, LLMResponse)).approach, GenerationApproach)
+	assert match_choice("Generation Approach", ["GenerationApproach", "NavigationApproach"]) == "GenerationApproach"
+	assert match_choice("teleport", ["GenerationApproach", "NavigationApproach"]) is None
+
+
+def test_local_repair_needs_no_model_call():
+	stats = RepairStats(report_every=0)
+	corrector = RunnableLambda(lambda inputs: pytest.fail("no correction prompt expected"))
+	repair = StructuredOutputRepair(LLMResponse, corrector, stats)
+
+	assert repair.repair(_output({"response_msg": "ok"})).response_msg == "ok"
+	response = repair.repair(_output({"approach": {"approach_type": "Generation", "generation_parameters": {"A": 2}}}))
+	assert response.approach.generation_parameters.A == 1
+	assert (stats.responses, stats.invalid, stats.repaired, stats.retried) == (2, 1, 1, 0) and stats.failure_rate == 0.5
+
+
+def test_correction_prompt_with_only_the_invalid_output():
+	stats = RepairStats(report_every=0)
+	prompts = []
+
+	def corrector(inputs):
+		prompts.append(inputs)
+		return _output({"approach": {"approach_type": "NavigationApproach", "natural_language_search_query": "rain on a window"}})
+
+	repair = StructuredOutputRepair(LLMResponse, RunnableLambda(corrector), stats)
+	invalid = _output({"approach": {"approach_type": "NavigationApproach", "query": "rain on a window"}})
+
+	response = asyncio.run(repair.runnable().ainvoke(invalid))
+	assert response.approach.natural_language_search_query == "rain on a window"
+	assert '"query": "rain on a window"' in prompts[0]["output"] and "natural_language_search_query" in prompts[0]["error"]
+	assert stats.retried == 1 and stats.retry_rate == 1 and stats.failed == 0
+
+	with pytest.raises((ValidationError, OutputParserException)):
+		StructuredOutputRepair(LLMResponse, RunnableLambda(lambda inputs: invalid), stats).repair(invalid)
+	assert stats.failed == 1
@@ -0,0 +1,43 @@
+import base64
+import json
+import zlib
+
+import numpy as np
+import pytest
+
+from app import signalcodec
+from app.firebase_users import compress_data, compress_signal, decompress_data
+
+
+def test_float32_round_trip():
+	signal = np.sin(np.linspace(0, 20, 5000)) * 2.7
+	payload = signalcodec.encode_signal("signal", signal, 10000)
+
+	decoded = signalcodec.decode_signal(payload)
+	assert decoded.name == "signal" and decoded.sample_rate == 10000
+	assert decoded.data.dtype == np.float32 and np.allclose(decoded.data, signal, atol=1e-6)
+
+
+def test_int16_round_trip_is_scaled_to_peak():
+	signal = np.sin(np.linspace(0, 20, 5000)) * 2.7
+	payload = signalcodec.encode_signal("signal", signal, 10000, dtype="int16", compression="none")
+
+	assert len(payload) < 5000 * 2 + 64
+	assert np.allclose(signalcodec.decode_signal(payload).data, signal, atol=2.7 / 32767)
+	assert np.all(signalcodec.decode_signal(signalcodec.encode_signal("s", np.zeros(3), 10000, dtype="int16")).data == 0)
+
+
+def test_rejects_unknown_options():
+	with pytest.raises(ValueError):
+		signalcodec.encode_signal("signal", [0.0], 10000, dtype="float16")
+	with pytest.raises(ValueError):
+		signalcodec.decode_signal(b"not a signal payload at all")
+
+
+def test_decompress_data_reads_legacy_and_binary_records():
+	legacy = base64.b64encode(zlib.compress(json.dumps({"signal": [0.5, -0.5]}).encode("utf-8"))).decode("utf-8")
+	assert decompress_data(legacy) == {"signal": [0.5, -0.5]}
+	assert decompress_data(compress_data({"t": [0.0, 0.1]})) == {"t": [0.0, 0.1]}
+
+	decoded = decompress_data(compress_signal("signal", np.array([0.5, -0.5])))
+	assert list(decoded) == ["signal"] and decoded["signal"].tolist() == [0.5, -0.5]
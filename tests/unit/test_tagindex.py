@@ -0,0 +1,17 @@
+from app.tagindex import TagIndex, resource_name, tokenize
+from tests.tagentries import ENTRIES
+
+
+def test_tokenize_matches_word_forms():
+	assert tokenize("Tapping, taps, TAP") == ["tap", "tap", "tap"]
+	assert tokenize("slowly") == tokenize("slow")
+
+
+def test_top_k_ranks_matching_entries_first():
+	index = TagIndex(ENTRIES)
+
+	assert [index.names[i] for i in index.search("a calm purr like a cat", 2)][0] == "v-01"
+	assert set(resource_name(entry) for entry in index.top_k("regular taps like a heartbeat", 2)) == {"v-03", "v-04"}
+	assert resource_name(index.top_k("regular taps like a heartbeat", 1)[0]) == "v-03"
+	# unknown words keep the library order
+	assert index.search("xylophone", 3) == [0, 1, 2]
@@ -0,0 +1,26 @@
+import json
+
+from app.tagprompt import CompactTagList
+
+ENTRIES = [
+	{"resource": "v-09-10-12-16", "sensory": ["smooth", "weak"], "emotional": ["calm"]},
+	{"resource": "v-09-10-4-23", "sensory": ["rough", "weak"], "usage": ["incoming\ncall"]},
+]
+
+
+def test_compact_lines_and_reverse_map():
+	tag_list = CompactTagList(ENTRIES)
+	lines = tag_list.text.split("\n")
+
+	assert tag_list.columns == ["sensory", "emotional", "usage"]
+	assert lines[1:] == ["0|smooth,weak|calm", "1|rough,weak||incoming call"]
+	assert len(CompactTagList(ENTRIES * 20).text) < len(json.dumps(ENTRIES * 20)) / 2
+	assert tag_list.resource("1") == "v-09-10-4-23" and tag_list.resource(" 0 ") == "v-09-10-12-16"
+	assert tag_list.resource("v-09-10-4-23") == "v-09-10-4-23" and tag_list.resource("7") == "7"
+
+
+def test_repeated_tags_use_the_vocabulary():
+	tag_list = CompactTagList(ENTRIES, tag_ids=True)
+
+	assert tag_list.vocabulary == {"weak": 0}
+	assert tag_list.text.split("\n")[-2:] == ["0|smooth,0|calm", "1|rough,0||incoming call"]
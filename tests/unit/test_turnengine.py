@@ -0,0 +1,71 @@
+import time
+
+import numpy as np
+import pytest
+from langchain_core.messages import HumanMessage
+
+import app.langinterface as langinterface
+from app.timebase import TimeBase
+from app.turnengine import TurnEngine
+from app.vizSignal import visSignal_st
+from tests.stubmodels import StubChatModel, fixed, stub_chains
+
+
+@pytest.fixture(autouse=True)
+def no_cache(monkeypatch):
+	monkeypatch.setattr(langinterface.llm_cache, "mode", "off")
+
+
+def test_votes_are_loaded_while_the_model_answers():
+	prepared = []
+	engine = TurnEngine(stub_chains(StubChatModel(latency=fixed(0.2))), prepare=lambda: (time.sleep(0.2), prepared.append(1)))
+
+	engine.run(engine.respond([HumanMessage(content="Warm up.")])) # first use creates the loop and the worker threads
+	while len(prepared) < 1:
+		time.sleep(0.01)
+	prepared.clear()
+
+	start = time.perf_counter()
+	response = engine.run(engine.respond([HumanMessage(content="Make it stronger.")]))
+	elapsed = time.perf_counter() - start
+	while not prepared and time.perf_counter() - start < 2:
+		time.sleep(0.01)
+
+	assert response.approach.change_amplitude_factor == 1.5
+	assert prepared == [1] and elapsed < 0.35
+
+
+def test_plot_is_returned_without_waiting_for_persisting():
+	persisted = []
+	signal, t = np.sin(np.linspace(0, 20, 1000))[np.newaxis], TimeBase(1000, 1000)
+	engine = TurnEngine(prepare=lambda: None)
+
+	start = time.perf_counter()
+	rendered = engine.run(engine.render_and_persist(lambda: (time.sleep(0.1), "plot")[1], lambda: (time.sleep(0.4), persisted.append(1))))
+	elapsed = time.perf_counter() - start
+	assert rendered == "plot" and persisted == [] and elapsed < 0.3
+	engine.run(engine.persisted())
+	assert persisted == [1]
+
+	plot = engine.run(engine.render_and_persist(lambda: visSignal_st(signal, t), lambda: None)) # off the script thread
+	assert plot[:8] == b"\x89PNG\r\n\x1a\n"
+
+
+def test_persisting_errors_are_logged(caplog):
+	engine = TurnEngine(prepare=lambda: None)
+
+	assert engine.run(engine.render_and_persist(lambda: "plot", lambda: 1 / 0)) == "plot"
+	engine.run(engine.persisted())
+	assert "Persisting the signal failed" in caplog.text
+
+
+def test_run_refuses_to_block_the_shared_loop():
+	engine = TurnEngine(prepare=lambda: None)
+
+	async def nested():
+		async def inner():
+			return 1
+		return engine.run(inner())
+
+	with pytest.raises(RuntimeError):
+		engine.run(nested())
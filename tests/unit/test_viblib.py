@@ -0,0 +1,93 @@
+import json
+import wave
+
+import numpy as np
+import pytest
+
+from app.buildlibrary import build_library
+from app.viblib import LazyVibLibrary, VibLibrary, convert_json_library, index_path_for, open_library
+
+
+def test_convert_and_open(tmp_path):
+	wave_files = {
+		"v-01": {"frame_rate": 10000, "num_frames": 3, "duration": 0.0003, "data": [0.1, -0.2, 0.3]},
+		"v-02": {"frame_rate": 10000, "num_frames": 2, "duration": 0.0002, "data": [0.5, -0.5]},
+	}
+	json_path = tmp_path / "lib.json"
+	json_path.write_text(json.dumps(wave_files))
+	bin_path = str(tmp_path / "lib.bin")
+
+	convert_json_library(str(json_path), bin_path)
+	library = VibLibrary.open(bin_path)
+
+	assert len(library) == 2
+	assert "v-01" in library and "v-03" not in library
+	assert np.allclose(library["v-01"], [0.1, -0.2, 0.3])
+	assert np.allclose(library["v-02"], [0.5, -0.5])
+	assert library.duration("v-02") == 0.0002
+	assert library.num_frames("v-01") == 3
+
+	# views must not be writable, the file is shared between processes
+	assert not library["v-01"].flags.writeable
+
+
+def test_open_library_converts_legacy_json(tmp_path):
+	json_path = tmp_path / "lib.json"
+	json_path.write_text(json.dumps({"v-01": {"frame_rate": 10000, "num_frames": 1, "duration": 0.0001, "data": [1.0]}}))
+	bin_path = str(tmp_path / "lib.bin")
+
+	library = open_library(bin_path, legacy_json_path=str(json_path))
+
+	assert (tmp_path / "lib.index.json").exists() and index_path_for(bin_path).endswith("lib.index.json")
+	assert library["v-01"].tolist() == [1.0]
+
+
+def test_lazy_library_caches_by_bytes(tmp_path):
+	json_path = tmp_path / "lib.json"
+	json_path.write_text(json.dumps({
+		name: {"frame_rate": 10000, "num_frames": 100, "duration": 0.01, "data": [0.25] * 100}
+		for name in ["v-01", "v-02", "v-03"]
+	}))
+	bin_path = str(tmp_path / "lib.bin")
+
+	# room for two decoded float64 waveforms of 100 samples
+	library = LazyVibLibrary(bin_path, legacy_json_path=str(json_path), max_bytes=1600)
+	assert not (tmp_path / "lib.index.json").exists() # nothing is opened before first use
+
+	assert library["v-01"].dtype == np.float64 and np.all(library["v-01"] == 0.25)
+	library["v-02"]
+	library["v-01"]
+	library["v-03"]
+
+	assert "v-01" in library.cache and "v-03" in library.cache and "v-02" not in library.cache
+	assert library.cache.total_bytes == 1600
+
+
+def _write_wave(path, frame_rate, data, num_channels=1):
+	with wave.open(str(path), "wb") as wf:
+		wf.setnchannels(num_channels)
+		wf.setsampwidth(2)
+		wf.setframerate(frame_rate)
+		wf.writeframes((np.asarray(data) * 2**15).astype(np.int16).tobytes())
+
+
+def test_build_library_is_incremental(tmp_path):
+	source_dir = tmp_path / "wav"
+	source_dir.mkdir()
+	t = np.arange(44100) / 44100
+	_write_wave(source_dir / "v-01.wav", 44100, 0.5 * np.sin(2 * np.pi * 100 * t))
+	_write_wave(source_dir / "v-02.wav", 22050, np.repeat(0.25 * np.sin(2 * np.pi * 50 * t[:22050]), 2), num_channels=2)
+	bin_path = str(tmp_path / "lib.bin")
+
+	assert build_library(str(source_dir), bin_path, workers=2) == {"decoded": 2, "reused": 0, "removed": 0}
+	library = VibLibrary.open(bin_path)
+	assert library.num_frames("v-01") == 10000 and library.num_frames("v-02") == 10000
+	assert library.duration("v-02") == 1.0
+	assert np.max(np.abs(library["v-01"])) == pytest.approx(0.5, abs=0.01)
+	del library
+
+	_write_wave(source_dir / "v-03.wav", 10000, np.zeros(5000))
+	assert build_library(str(source_dir), bin_path, workers=2) == {"decoded": 1, "reused": 2, "removed": 0}
+	library = VibLibrary.open(bin_path)
+	assert list(library) == ["v-01", "v-02", "v-03"]
+	assert np.max(np.abs(library["v-01"])) == pytest.approx(0.5, abs=0.01)
@@ -0,0 +1,64 @@
+import threading
+
+from app.writebehind import WriteBehindQueue, coalesce
+
+
+def test_coalesce_last_write_wins():
+	pending = {}
+	coalesce(pending, "a/b", 1)
+	coalesce(pending, "a/b", 2)
+	coalesce(pending, "a/c/d", 3)
+	coalesce(pending, "/a/c/", {"e": 4}) # replaces the pending write below it
+	coalesce(pending, "a/c/f/g", 5) # folded into the pending write above it
+	coalesce(pending, "x", "scalar")
+	coalesce(pending, "x/y", 6)
+
+	assert pending == {"a/b": 2, "a/c": {"e": 4, "f": {"g": 5}}, "x": {"y": 6}}
+
+
+def test_coalesce_adds_up_increments():
+	pending = {}
+	coalesce(pending, "votes/up", {".sv": {"increment": 1}})
+	coalesce(pending, "votes/up", {".sv": {"increment": 1}})
+	coalesce(pending, "votes/down", {".sv": {"increment": -1}})
+
+	assert pending == {"votes/up": {".sv": {"increment": 2}}, "votes/down": {".sv": {"increment": -1}}}
+
+
+def test_queue_batches_and_flushes():
+	batches = []
+	release = threading.Event()
+
+	def commit(batch):
+		release.wait(5)
+		batches.append(batch)
+
+	writer = WriteBehindQueue(commit)
+	writer.set("db/u/conversation/0", {"content": "first"})
+	writer.update("db/u/vibration/v1", {"rating": 0, "resource": "v-01"})
+	writer.update("db/u/vibration/v1", {"rating": 1})
+	assert writer.pending > 0
+	release.set()
+
+	assert writer.flush(timeout=5)
+	assert writer.pending == 0
+	merged = {}
+	for batch in batches:
+		merged.update(batch)
+	assert merged["db/u/vibration/v1/rating"] == 1 and merged["db/u/vibration/v1/resource"] == "v-01"
+	assert len(batches) <= 2 # the first write may be committed alone while the rest queue up
+
+
+def test_queue_retries_with_backoff():
+	attempts = []
+
+	def commit(batch):
+		attempts.append(batch)
+		if len(attempts) < 3:
+			raise ConnectionError("unavailable")
+
+	writer = WriteBehindQueue(commit, backoff=0.001)
+	writer.set("db/u/value", 1)
+
+	assert writer.flush(timeout=5)
+	assert len(attempts) == 3 and writer.committed_batches == 1 and writer.failed_batches == 0